@@ -0,0 +1,51 @@
+from player_state import NO_ANSWER
+
+
+class AnswerHistogram:
+    """Répartition des réponses à une question (une case par option).
+
+    Mise à jour en O(1) à chaque réponse ; les non-réponses sont lues dans
+    l'AnswerBitmap de la room au moment de l'envoi.
+    """
+
+    __slots__ = ('question_index', 'counts', 'correct_index', 'correct', 'incorrect')
+
+    def __init__(self, question_index, option_count, correct_index=None):
+        self.question_index = question_index
+        self.counts = [0] * option_count
+        self.correct_index = correct_index
+        self.correct = 0
+        self.incorrect = 0
+
+    def record(self, choice):
+        self.counts[choice] += 1
+        if self.correct_index is not None:
+            if choice == self.correct_index:
+                self.correct += 1
+            else:
+                self.incorrect += 1
+
+    def to_dict(self, no_answer=0):
+        return {
+            'question_index': self.question_index,
+            'counts': self.counts,
+            'no_answer': no_answer,
+            'correct': self.correct,
+            'incorrect': self.incorrect,
+            'total_answers': sum(self.counts)
+        }
+
+
+def histogram_for(room, question_index, packet):
+    """Histogramme de la question, reconstruit depuis les réponses si besoin (réhydratation)"""
+    histograms = room.setdefault('_histograms', {})
+    histogram = histograms.get(question_index)
+    if histogram is None:
+        histogram = AnswerHistogram(
+            question_index, len(packet.options or ()), packet.correct_index)
+        for player in room['players'].values():
+            choice = player.answers[question_index]
+            if choice != NO_ANSWER:
+                histogram.record(choice)
+        histograms[question_index] = histogram
+    return histogram
@@ -2,11 +2,13 @@ from werkzeug.utils import secure_filename
 from flask import request, jsonify
 import logging
 import re
-from flask import Flask, request, jsonify, session
+from flask import Flask, request, jsonify, session, copy_current_request_context
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
 import json
 import time
+import functools
+import secrets
 from datetime import datetime
 import sqlite3
 import requests
@@ -24,7 +26,9 @@ import tempfile
 from db import (
     init_db, get_quizzes_by_user, get_quiz_by_id, create_quiz, update_quiz,
     delete_quiz, create_room, get_room_by_code, save_score, get_leaderboard,
-    get_db_connection
+    get_db_connection, get_read_connection, save_game_results, admit_players,
+    get_game_question_stats,
+    pool as write_pool, read_pool, quiz_cache
 )
 from rag_wiki import generate_quiz_from_wikipedia
 from motcle import init_kbert, extract_kw
@@ -32,6 +36,25 @@ from images import search_and_display_images, filtrer
 from trad import init_traduction, traduire
 from moteur_rech import correction_mot, init_model_recherche, charger_mots, chercher_bert, init_speller
 from bs import convertir_ascii, binary_search
+from room_store import create_room_store
+from scoreboard import scoreboard_for
+from question_packets import compile_question_packets
+from event_log import EventLogWriter, replay_since_snapshot
+from scheduler import TimingWheel
+from room_lifecycle import RoomReaper
+from player_state import AnswerBitmap, NO_ANSWER, add_player, remove_player, rekey_player
+from join_admission import JoinAdmission
+from answer_histogram import histogram_for
+from dispatcher import OutboundDispatcher
+from room_actor import RoomActors
+from cluster import worker_for
+from latency import LatencyTracker
+from deferred_scoring import QuestionWindow
+from open_grading import grade_answers
+from open_answers import normalize_answer, tally_for
+from rate_limit import SocketRateLimiter
+from room_sync import deltas_for, parse_version
+import wire
 
 
 from rag_doc import generate_quiz, init_vectorstore, load_mistral_from_ollama
@@ -41,9 +64,20 @@ from rag_doc import generate_quiz, init_vectorstore, load_mistral_from_ollama
 app = Flask(__name__)
 app.secret_key = 'quiz_app_secret_key'  # Change this in production
 CORS(app, supports_credentials=True)
-socketio = SocketIO(app, cors_allowed_origins="*")
 
 load_dotenv()
+# Sérialiseur Socket.IO : 'json' (défaut) ou 'msgpack' (client socket.io-msgpack-parser)
+SOCKETIO_SERIALIZER = os.environ.get('SOCKETIO_SERIALIZER', 'json')
+# Mode multi-worker (voir cluster.py) : émissions entre workers via un broker Redis
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE') or None
+socketio = SocketIO(app, cors_allowed_origins="*", json=wire,
+                    serializer=wire.packet_class(SOCKETIO_SERIALIZER),
+                    message_queue=SOCKETIO_MESSAGE_QUEUE)
+# Chaque room appartient au worker worker_for(room_code, WORKER_COUNT)
+WORKER_ID = int(os.environ.get('WORKER_ID', 0))
+WORKER_URLS = [url for url in os.environ.get('WORKER_URLS', '').split(',') if url]
+WORKER_COUNT = max(1, len(WORKER_URLS))
+PORT = int(os.environ.get('PORT', 5000))
 # llm_rag_doc= init_rag()
 # Configuration Unsplash
 # UNSPLASH_KEY = os.environ['UNSPLASH_KEY']
@@ -61,10 +95,73 @@ mots = charger_mots()
 model_mr = init_model_recherche()
 liste_mots_ascii = charger_mots()
 spell = init_speller()
-# Active quiz rooms
-active_rooms = {}
-user_rooms = {}
-timers = {}  # Pour stocker les timers de chaque room
+# Active quiz rooms (backend choisi via ROOM_STORE_BACKEND : memory, redis, local)
+room_store = create_room_store()
+active_rooms = room_store.rooms
+user_rooms = room_store.user_rooms
+user_sessions = room_store.user_sessions  # Associe request.sid à username
+timers = room_store.timers  # Échéance en attente de chaque room (TimerHandle)
+# Une seule roue temporelle pour les échéances de toutes les rooms
+scheduler = TimingWheel(tick=float(os.environ.get('SCHEDULER_TICK', 0.1)))
+PREPARATION_DELAY = 5  # secondes entre preparing_next et new_question
+# Éviction des rooms inactives (ROOM_IDLE_TTL) ou terminées (ROOM_FINISHED_TTL), en secondes
+ROOM_IDLE_TTL = float(os.environ.get('ROOM_IDLE_TTL', 1800))
+ROOM_FINISHED_TTL = float(os.environ.get('ROOM_FINISHED_TTL', 300))
+ROOM_SWEEP_INTERVAL = float(os.environ.get('ROOM_SWEEP_INTERVAL', 60))
+SNAPSHOT_INTERVAL = float(os.environ.get('ROOM_SNAPSHOT_INTERVAL', 10))
+SCOREBOARD_TOP_K = int(os.environ.get('SCOREBOARD_TOP_K', 10))
+# Événements groupés par room et envoyés en une trame 'batch' toutes les OUTBOUND_TICK s,
+# chaque trame par l'acteur de sa room (seul à lire et modifier l'état de la room)
+outbound = OutboundDispatcher(socketio.emit, float(
+    os.environ.get('OUTBOUND_TICK', 0.1)),
+    defer=lambda target, send: room_actors.submit(room_of_target(target), send))
+# Un acteur (file + tâche) par room : ses événements sont traités un par un, dans l'ordre
+room_actors = RoomActors(socketio.start_background_task,
+                         socketio.server.eio.create_queue,
+                         socketio.server.eio.get_queue_empty_exception(),
+                         idle_timeout=float(os.environ.get('ROOM_ACTOR_IDLE', 60)))
+# RTT de chaque socket (ping/pong toutes les RTT_PING_INTERVAL s), retiré du temps de réponse
+latency = LatencyTracker(max_compensation=float(
+    os.environ.get('LATENCY_COMPENSATION_MAX', 0.5)))
+RTT_PING_INTERVAL = float(os.environ.get('RTT_PING_INTERVAL', 5))
+# Événements diffusés gardés par room pour resynchroniser un client reconnecté
+ROOM_DELTA_BUFFER = int(os.environ.get('ROOM_DELTA_BUFFER', 256))
+# 'immediate' : score calculé à chaque réponse ; 'deferred' : en une passe NumPy à la clôture
+SCORING_MODE = os.environ.get('SCORING_MODE', 'immediate')
+if SCORING_MODE not in ('immediate', 'deferred'):
+    raise ValueError(f"Unknown scoring mode: {SCORING_MODE}")
+SPEED_BONUS_COEFF = 1.0  # Tu peux ajuster cette valeur
+# Correction automatique des questions ouvertes (similarité cosinus à la référence)
+OPEN_ANSWER_THRESHOLD = float(os.environ.get('OPEN_ANSWER_THRESHOLD', '0.7'))
+OPEN_DUPLICATE_THRESHOLD = float(os.environ.get('OPEN_DUPLICATE_THRESHOLD', '0.9'))
+# Réponses ouvertes acceptées par socket : OPEN_ANSWER_BURST d'affilée, puis OPEN_ANSWER_RATE/s
+open_answer_limiter = SocketRateLimiter(
+    float(os.environ.get('OPEN_ANSWER_RATE', 1)),
+    float(os.environ.get('OPEN_ANSWER_BURST', 3)))
+# Au plus un answer_histogram par room toutes les HISTOGRAM_INTERVAL s
+HISTOGRAM_INTERVAL = float(os.environ.get('HISTOGRAM_INTERVAL', 0.5))
+# Journal des événements de partie, vidé dans SQLite toutes les EVENT_FLUSH_INTERVAL s
+event_logs = EventLogWriter(get_db_connection, float(
+    os.environ.get('EVENT_FLUSH_INTERVAL', 0.25)))
+# Inscriptions des joueurs écrites par lots et player_joined groupés toutes les JOIN_FLUSH_INTERVAL s
+join_admission = JoinAdmission(admit_players, float(
+    os.environ.get('JOIN_FLUSH_INTERVAL', 0.1)))
+
+
+def owns_room(room_code):
+    return worker_for(room_code, WORKER_COUNT) == WORKER_ID
+
+
+def room_worker_url(room_code):
+    return WORKER_URLS[worker_for(room_code, WORKER_COUNT)] if WORKER_URLS else None
+
+
+# Réhydrater les rooms sauvegardées avant un redémarrage, puis rejouer
+# les événements journalisés après chaque instantané
+_conn = get_db_connection()
+print(f"[INFO] {room_store.restore(_conn, owns=owns_room, replay=replay_since_snapshot)} "
+      "room(s) restored from snapshot")
+_conn.close()
 llm = load_mistral_from_ollama()
 # Routes
 
@@ -191,6 +288,8 @@ def api_generate_quiz_doc():
                 questions.append({
                     "question": match.group(1).strip(),
                     "propositions": [],
+                    # Réponse attendue : référence de la correction automatique
+                    "correct_answer": (match.group(2) or "").strip() or None,
                     "image": None,
                     "type": "open_question"
                 })
@@ -249,7 +348,7 @@ def api_generate_quiz_doc():
             quiz_id = cursor.lastrowid
             print(f"🆔 Quiz inséré avec ID : {quiz_id}")
 
-            for qst in questions:
+            for position, qst in enumerate(questions):
                 propositions = qst["propositions"]
                 option_a = propositions[0] if len(propositions) > 0 else None
                 option_b = propositions[1] if len(propositions) > 1 else None
@@ -265,6 +364,9 @@ def api_generate_quiz_doc():
                 elif qst["type"] == "true_false":
                     correct_text = "Vrai" if qst["correct_answer"].lower(
                     ) == "true" else "Faux"
+                elif qst["type"] == "open_question":
+                    # Référence de la correction automatique des réponses libres
+                    correct_text = qst.get("correct_answer")
                 else:
                     correct_text = None
 
@@ -273,8 +375,8 @@ def api_generate_quiz_doc():
                 cursor.execute('''
                     INSERT INTO questions (
                         quiz_id, question, option_a, option_b, option_c, option_d,
-                        correct_answer, type, image_url, image_source
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        correct_answer, type, image_url, image_source, position
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     quiz_id,
                     qst["question"],
@@ -285,11 +387,13 @@ def api_generate_quiz_doc():
                     correct_text,
                     qst["type"],
                     qst["image"]["url"] if qst["image"] else None,
-                    qst["image"]["source"] if qst["image"] else "none"
+                    qst["image"]["source"] if qst["image"] else "none",
+                    position
                 ))
 
             conn.commit()
             conn.close()
+            quiz_cache.invalidate(quiz_id)
             print("✅ Quiz et questions enregistrés avec succès")
 
         except Exception as db_err:
@@ -399,6 +503,8 @@ def api_generate_quiz():
                 questions.append({
                     "question": match.group(1).strip(),
                     "propositions": [],
+                    # Réponse attendue : référence de la correction automatique
+                    "correct_answer": (match.group(2) or "").strip() or None,
                     "image": None,
                     "type": "open_question"
                 })
@@ -459,7 +565,7 @@ def api_generate_quiz():
             quiz_id = cursor.lastrowid
             print(f"🆔 Quiz inséré avec ID : {quiz_id}")
 
-            for qst in questions:
+            for position, qst in enumerate(questions):
                 propositions = qst["propositions"]
                 option_a = propositions[0] if len(propositions) > 0 else None
                 option_b = propositions[1] if len(propositions) > 1 else None
@@ -475,6 +581,9 @@ def api_generate_quiz():
                 elif qst["type"] == "true_false":
                     correct_text = "Vrai" if qst["correct_answer"].lower(
                     ) == "true" else "Faux"
+                elif qst["type"] == "open_question":
+                    # Référence de la correction automatique des réponses libres
+                    correct_text = qst.get("correct_answer")
                 else:
                     correct_text = None
 
@@ -483,8 +592,8 @@ def api_generate_quiz():
                 cursor.execute('''
                     INSERT INTO questions (
                         quiz_id, question, option_a, option_b, option_c, option_d,
-                        correct_answer, type, image_url, image_source
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        correct_answer, type, image_url, image_source, position
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     quiz_id,
                     qst["question"],
@@ -495,12 +604,13 @@ def api_generate_quiz():
                     correct_text,
                     qst["type"],
                     qst["image"]["url"] if qst["image"] else None,
-                    qst["image"]["source"] if qst["image"] else "none"
-
+                    qst["image"]["source"] if qst["image"] else "none",
+                    position
                 ))
 
             conn.commit()
             conn.close()
+            quiz_cache.invalidate(quiz_id)
             print("✅ Quiz et questions enregistrés avec succès")
 
         except Exception as db_err:
@@ -528,7 +638,7 @@ def api_traduction():
             print("❗ [ERREUR] quiz_id manquant dans les données envoyées.")
             return jsonify({"error": "quiz_id manquant"}), 400
 
-        conn = sqlite3.connect("quiz.db")
+        conn = get_db_connection()
         cursor = conn.cursor()
 
         print("🔎 [INFO] Recherche du quiz original dans la base...")
@@ -563,7 +673,8 @@ def api_traduction():
         cursor.execute('''
             SELECT question, option_a, option_b, option_c, option_d, correct_answer,
                    type, points, time_limit, image_url, image_source
-            FROM questions WHERE quiz_id = ?
+            FROM questions WHERE quiz_id = ? AND archived = 0
+            ORDER BY position, id
         ''', (quiz_id,))
         questions = cursor.fetchall()
 
@@ -587,6 +698,11 @@ def api_traduction():
                 b = "Faux" if b.lower() == "false" else "Vrai"
                 c = d = None
                 correct = "Vrai" if correct.lower() == "true" else "Faux"
+            elif qtype == "open_question":
+                a = b = c = d = None
+                # La référence de correction suit la langue des réponses attendues
+                if correct:
+                    correct = traduire(correct, tokenizer_trad, model_trad)
             else:
                 a = b = c = d = correct = None
 
@@ -595,17 +711,19 @@ def api_traduction():
             cursor.execute('''
                 INSERT INTO questions (
                     quiz_id, question, option_a, option_b, option_c, option_d,
-                    correct_answer, type, points, time_limit, image_url, image_source
+                    correct_answer, type, points, time_limit, image_url, image_source,
+                    position
                 )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 new_quiz_id, question_text, a, b, c, d, correct,
-                qtype, points, time_limit, img_url, img_src
+                qtype, points, time_limit, img_url, img_src, idx - 1
             ))
             print(f"📥 Question insérée pour le quiz {new_quiz_id}")
 
         conn.commit()
         conn.close()
+        quiz_cache.invalidate(new_quiz_id)
         print("\n✅✅ Traduction complète et enregistrement réussi.")
 
         response = {
@@ -675,8 +793,8 @@ def moteur_recherche():
         print("🛠️ SQL:", query)
         print("📦 Params:", params)
 
-        # Exécution de la requête SQL
-        conn = sqlite3.connect("quiz.db")
+        # Exécution de la requête SQL (lecture seule : ne bloque pas les parties)
+        conn = get_read_connection()
         cursor = conn.cursor()
         cursor.execute(query, params)
         rows = cursor.fetchall()
@@ -698,7 +816,7 @@ def moteur_recherche():
                 continue  # Éviter les doublons déjà trouvés via SQL
 
             cursor.execute(
-                "SELECT question FROM questions WHERE quiz_id = ?", (quiz_id,))
+                "SELECT question FROM questions WHERE quiz_id = ? AND archived = 0", (quiz_id,))
             questions = [q[0] for q in cursor.fetchall()]
 
             match = False
@@ -962,6 +1080,15 @@ def get_room(room_code):
     return jsonify({"room": room}), 200
 
 
+@app.route('/api/rooms/<room_code>/worker', methods=['GET'])
+def get_room_worker(room_code):
+    """Routeur du mode multi-worker : adresse du worker qui sert la room"""
+    return jsonify({
+        "worker": worker_for(room_code, WORKER_COUNT),
+        "url": room_worker_url(room_code)
+    }), 200
+
+
 @app.route('/api/leaderboard', methods=['GET'])
 def get_leaderboard_route():
     limit = request.args.get('limit', 10, type=int)
@@ -970,13 +1097,33 @@ def get_leaderboard_route():
     return jsonify({"leaderboard": leaderboard}), 200
 
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    return jsonify({
+        "wire": {
+            "serializer": SOCKETIO_SERIALIZER,
+            "events": wire.payload_stats.report()
+        },
+        "rooms": dict(room_reaper.gauges(), pending_timers=len(scheduler)),
+        "outbound": outbound.stats(),
+        "actors": room_actors.stats(),
+        "open_answers": open_answer_limiter.stats(),
+        "db": {"write": write_pool.stats(), "read": read_pool.stats()},
+        "quiz_cache": quiz_cache.stats(),
+        "latency": {
+            room_code: latency.distribution(room['players'])
+            for room_code, room in room_store.owned_rooms(owns_room)
+        }
+    }), 200
+
+
 @app.route('/api/game_history', methods=['GET'])
 def get_game_history():
     user_id = request.args.get('user_id')
     if not user_id:
         return jsonify({"error": "User ID is required"}), 400
 
-    conn = get_db_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
 
     try:
@@ -1003,7 +1150,7 @@ def get_game_history():
 
 @app.route('/api/game_details/<int:game_id>', methods=['GET'])
 def get_game_details(game_id):
-    conn = get_db_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
 
     try:
@@ -1020,17 +1167,32 @@ def get_game_details(game_id):
             return jsonify({"error": "Game not found"}), 404
         game = dict(game)
 
-        # Questions du quiz (sans doublons)
+        # Comptes par question : figés en fin de partie (une seule agrégation sinon)
+        stats = get_game_question_stats(cursor, game_id)
+
+        # Questions du quiz, y compris celles archivées depuis mais jouées dans cette partie
         cursor.execute('''
-            SELECT DISTINCT q.id, q.question, q.type, q.correct_answer
+            SELECT q.id, q.question, q.type, q.correct_answer, q.archived
             FROM questions q
             WHERE q.quiz_id = ?
+            ORDER BY q.position, q.id
         ''', (game['quiz_id'],))
-        questions = [dict(row) for row in cursor.fetchall()]
+        questions = []
+        for row in cursor.fetchall():
+            question = dict(row)
+            if question.pop('archived') and question['id'] not in stats:
+                continue
+            counts = stats.get(question['id'], {})
+            question.update({
+                'correct_count': counts.get('correct_count') or 0,
+                'incorrect_count': counts.get('incorrect_count') or 0,
+                'total_answers': counts.get('total_answers') or 0
+            })
+            questions.append(question)
 
-        # Joueurs (sans l'hôte)
+        # Joueurs (sans l'hôte) : une ligne par joueur (clé unique game_id, user_id)
         cursor.execute('''
-            SELECT DISTINCT u.id as user_id, u.username, gp.score
+            SELECT u.id as user_id, u.username, gp.score
             FROM game_players gp
             JOIN users u ON gp.user_id = u.id
             WHERE gp.game_id = ? AND u.id != ?
@@ -1038,26 +1200,9 @@ def get_game_details(game_id):
         ''', (game_id, game['host_id']))
         players = [dict(row) for row in cursor.fetchall()]
 
-        # Statistiques des réponses
-        for question in questions:
-            cursor.execute('''
-                SELECT 
-                    COUNT(DISTINCT a.user_id) as total_answers,
-                    SUM(CASE WHEN a.is_correct THEN 1 ELSE 0 END) as correct_count,
-                    SUM(CASE WHEN NOT a.is_correct THEN 1 ELSE 0 END) as incorrect_count
-                FROM answers a
-                WHERE a.game_id = ? AND a.question_id = ? AND a.user_id != ?
-            ''', (game_id, question['id'], game['host_id']))
-            stats = cursor.fetchone()
-            question.update({
-                'correct_count': stats['correct_count'] or 0,
-                'incorrect_count': stats['incorrect_count'] or 0,
-                'total_answers': stats['total_answers'] or 0
-            })
-
         # Réponses ouvertes (sans l'hôte)
         cursor.execute('''
-            SELECT DISTINCT a.question_id, u.id as user_id, u.username, a.answer_text, a.is_correct
+            SELECT a.question_id, u.id as user_id, u.username, a.answer_text, a.is_correct
             FROM answers a
             JOIN users u ON a.user_id = u.id
             JOIN questions q ON a.question_id = q.id
@@ -1105,6 +1250,18 @@ def delete_game_history():
             )
         ''', (user_id, user_id))
 
+        # Et leurs statistiques par question figées en fin de partie
+        cursor.execute('''
+            DELETE FROM game_question_stats
+            WHERE game_id IN (
+                SELECT g.id FROM games g
+                WHERE g.host_id = ? OR EXISTS (
+                    SELECT 1 FROM game_players gp
+                    WHERE gp.game_id = g.id AND gp.user_id = ?
+                )
+            )
+        ''', (user_id, user_id))
+
         # Supprimer les joueurs associés aux parties de l'utilisateur
         cursor.execute('''
             DELETE FROM game_players 
@@ -1131,87 +1288,378 @@ def delete_game_history():
         conn.close()
 
 
+def question_packets(room):
+    """Paquets précompilés de la room (recompilés après une réhydratation)"""
+    if '_packets' not in room:
+        conn = get_db_connection()
+        room['_packets'] = compile_question_packets(room['questions'], conn)
+        conn.close()
+    return room['_packets']
+
+
+def log_event(room_code, event_type, **payload):
+    """Ajoute un événement au journal de la room (rouvert après une réhydratation)"""
+    room = active_rooms[room_code]
+    room['last_activity'] = time.time()  # Tout événement journalisé compte comme activité
+
+    log = event_logs.get(room_code)
+    if log is None:
+        conn = get_db_connection()
+        last_seq = conn.execute(
+            'SELECT MAX(seq) FROM game_events WHERE room_code = ?', (room_code,)).fetchone()[0]
+        conn.close()
+        log = event_logs.open(room_code, room['game_id'],
+                              start_seq=0 if last_seq is None else last_seq + 1)
+    # Position du journal gardée dans la room : l'instantané sait d'où reprendre le rejeu
+    room['log_seq'] = log.append(event_type, **payload) + 1
+
+
+def host_room(room_code):
+    """Sous-room ne contenant que le(s) socket(s) de l'hôte"""
+    return f"{room_code}:host"
+
+
+def room_of_target(target):
+    """Code de la room de jeu d'un destinataire (room ou sous-room de l'hôte)"""
+    return target.split(':', 1)[0]
+
+
+def room_broadcast(room_code, event, data=None):
+    """Diffuse un changement d'état à toute la room.
+
+    La version de la room accompagne l'événement en second argument ; il
+    est gardé dans l'anneau de deltas pour resynchroniser un client qui se
+    reconnecte (resume_room).
+    """
+    room = active_rooms[room_code]
+    version = room['version'] = deltas_for(room, ROOM_DELTA_BUFFER).record(event, data)
+    socketio.emit(event, (data, version), to=room_code)
+
+
+def open_session(room_code, sid):
+    """Jeton de reprise du socket : le client le présente à resume_room après une coupure"""
+    token = secrets.token_urlsafe(16)
+    room = active_rooms[room_code]
+    room.setdefault('sessions', {})[token] = sid
+    socketio.emit('room_session', {
+        'token': token, 'version': room.get('version', 0)}, to=sid)
+    return token
+
+
+def roster_entry(player_id, player):
+    return {'id': player_id, 'username': player.username, 'score': player.score}
+
+
+def broadcast_roster(deltas):
+    """Un player_joined par room et par tick, envoyé par l'acteur de la room
+    (room_broadcast fait avancer sa version et son anneau de deltas)"""
+    for room_code, delta in deltas.items():
+        room_actors.submit(room_code, send_roster, room_code, delta)
+
+
+def send_roster(room_code, delta):
+    """Liste complète aux arrivants, delta aux autres"""
+    room = active_rooms.get(room_code)
+    if room is None:
+        return
+    players = room['players']
+
+    if delta.welcome:
+        # Encodée une seule fois pour tous les arrivants du tick
+        snapshot = wire.PreEncoded({'players': [
+            roster_entry(pid, player)
+            for pid, player in players.items() if not player.is_host
+        ]})
+        for sid in delta.welcome:
+            socketio.emit('player_joined', snapshot, to=sid)
+
+    if delta.added or delta.removed:
+        room_broadcast(room_code, 'player_joined', {
+            'added': [roster_entry(pid, players[pid])
+                      for pid in delta.added if pid in players],
+            'removed': list(delta.removed),
+            'total_players': len(players)
+        })
+
+
 def send_preparation(room_code):
     """Envoyer une notification de préparation avant la question"""
     room = active_rooms[room_code]
-    current_q = room['current_question']
+    packet = question_packets(room)[room['current_question']]
 
-    socketio.emit('preparing_next', {
-        'question_number': current_q + 1,
-        'total_questions': len(room['questions']),
-        'questions': room['questions']
-    }, room=room_code)
+    # Seulement le numéro et l'indice de préchargement, jamais le quiz complet
+    room_broadcast(room_code, 'preparing_next', packet.preparation)
+    # RTT frais juste avant la question
+    socketio.emit('rtt_ping', latency.ping(room_code), to=room_code)
 
 
 def send_question(room_code):
     room = active_rooms[room_code]
     current_q = room['current_question']
-    question = room['questions'][current_q]
+    packet = question_packets(room)[current_q]
 
     # ✅ Stocke le timestamp pour calcul des points
     room['question_start_time'] = time.time()
+    room['asked_question'] = current_q
 
     print(f"[DEBUG] Sending question {current_q + 1} to room {room_code}")
 
-    # Récupérer les métadonnées Unsplash si besoin
-    unsplash_data = None
-    if question.get('image_source') == 'unsplash':
-        conn = get_db_connection()
-        unsplash_data = conn.execute('''
-        SELECT regular_url, thumb_url, author_name, author_url 
-        FROM unsplash_photos 
-        WHERE question_id = ?
-        ''', (question['id'],)).fetchone()
-        conn.close()
-
     # Réinitialiser les réponses ouvertes pour cette question
     if 'open_answers' in room:
-        room['open_answers'][current_q] = []  # Utiliser current_q comme clé
-
-    # Préparer les options en fonction du type de question
-    options = None
-    if question['type'] == 'true_false':
-        options = ['Vrai', 'Faux']
-    elif question['type'] == 'qcm':
-        options = [
-            question.get('option_a'),
-            question.get('option_b'),
-            question.get('option_c'),
-            question.get('option_d')
-        ]
-
-     # Préparer l'objet image pour l'envoi
-    image_data = None
-    if question.get('image_url'):
-        image_data = {
-            'url': question['image_url'],
-            'source': question.get('image_source', 'none'),
-            'unsplash_data': dict(unsplash_data) if unsplash_data else None
-        }
+        room['open_answers'][current_q] = {}  # Réponses indexées par joueur
+
+    log_event(room_code, 'question', index=current_q)
+    room_store.save_room(room_code)
+
+    # Envoyer la question (déjà sérialisée) à tous les joueurs
+    room_broadcast(room_code, 'new_question', packet.payload)
+
+    # Planifier la fin du temps (mais ne pas passer automatiquement à la suivante)
+    timers[room_code] = scheduler.schedule(
+        packet.time_limit, room_actors.submit, room_code, time_up, room_code, current_q)
+
+
+def question_open(room):
+    """La question en cours a été envoyée et n'est pas encore close
+    (time_up ou question suivante) : elle accepte encore des réponses"""
+    current_q = room['current_question']
+    return (room.get('asked_question') == current_q
+            and room.get('closed_question') != current_q)
+
+
+def close_question(room_code, question_index):
+    """Plus aucune réponse acceptée : score différé et correction des réponses ouvertes"""
+    active_rooms[room_code]['closed_question'] = question_index
+    log_event(room_code, 'close', question=question_index)
+    settle_question(room_code)
+    grade_open_question(room_code, question_index)
+
+
+def thinking_time(room, user_id):
+    """Temps de réflexion du joueur : sans l'attente réseau (RTT plafonné)"""
+    received_at = getattr(request, 'received_at', time.time())
+    time_used = received_at - room.get('question_start_time', received_at)
+    return max(0, time_used - latency.compensation(user_id))
+
+
+def settle_question(room_code):
+    """Mode différé : score de toutes les réponses de la question en une passe vectorisée"""
+    room = active_rooms.get(room_code)
+    window = room.pop('score_window', None) if room else None
+    if window is None:
+        return
+
+    packet = question_packets(room)[window.question_index]
+    points, correct = window.score(packet.correct_index, packet.points,
+                                   packet.time_limit, SPEED_BONUS_COEFF)
+    scoreboard = scoreboard_for(room)
+
+    results = []
+    for sid, player in room['players'].items():
+        slot = player.slot
+        if slot >= len(points) or window.choices[slot] == NO_ANSWER:
+            continue
+        awarded = int(points[slot])
+        if awarded:
+            player.score += awarded
+            log_event(room_code, 'score', sid=sid, score=player.score)
+            scoreboard.update(sid, player.score)
+        results.append((sid, player, bool(correct[slot]), awarded))
+    room_store.save_room(room_code)
+
+    # Rangs lus une fois tous les scores de la question appliqués
+    for sid, player, is_correct, awarded in results:
+        socketio.emit('answer_result', {
+            'is_correct': is_correct,
+            'correct_answer': packet.correct_answer,
+            'points': awarded,
+            'new_score': player.score
+        }, to=sid)
+        socketio.emit('player_rank', {
+            'rank': scoreboard.rank(sid),
+            'score': player.score,
+            'total_players': len(scoreboard)
+        }, to=sid)
+
+    outbound.push(host_room(room_code), 'update_scores',
+                  lambda: score_update(room), replace=True)
+
+
+def grade_open_question(room_code, question_index):
+    """Lance la correction en un lot des réponses d'une question ouverte.
+
+    L'encodage tourne hors de l'acteur (tâche de fond, puis thread système) ;
+    le résultat revient à l'acteur de la room par apply_open_grades.
+    """
+    room = active_rooms.get(room_code)
+    if not room or question_index >= len(room['questions']):
+        return
+    packet = question_packets(room)[question_index]
+    by_user = room.get('open_answers', {}).get(question_index)
+    if packet.type != 'open_question' or not by_user or room.get('_graded') == question_index:
+        return
+    room['_graded'] = question_index
+    room['_grading'] = room.get('_grading', 0) + 1  # corrections en cours
+
+    # Une seule entrée par réponse distincte (normalisée) dans le lot à encoder ;
+    # copie figée : la question est close, le décompte ne bouge plus
+    tally = tally_for(room, question_index)
+    keys = list(tally.entries)
+    answers = [tuple(tally.entries[key]) for key in keys]
+    socketio.start_background_task(encode_open_answers, room_code, question_index,
+                                   packet.correct_answer, keys, answers)
+
+
+def run_blocking(fn, *args):
+    """Exécute fn(*args) sur un thread système.
+
+    Avec eventlet ou gevent, une tâche de fond est une greenlet : un calcul
+    long (encodage du modèle) y bloquerait toute la boucle du serveur.
+    """
+    if socketio.async_mode == 'eventlet':
+        from eventlet import tpool
+        return tpool.execute(fn, *args)
+    if socketio.async_mode in ('gevent', 'gevent_uwsgi'):
+        import gevent
+        return gevent.get_hub().threadpool.apply(fn, args)
+    return fn(*args)
+
+
+def encode_open_answers(room_code, question_index, reference, keys, answers):
+    try:
+        grades = run_blocking(grade_answers, model_mr, reference,
+                              [answer for answer, _ in answers],
+                              OPEN_ANSWER_THRESHOLD, OPEN_DUPLICATE_THRESHOLD)
+    except Exception as e:
+        print(f"Error grading open answers in room {room_code}: {str(e)}")
+        grades = None
+    room_actors.submit(room_code, apply_open_grades,
+                       room_code, question_index, keys, answers, grades)
+
+
+def apply_open_grades(room_code, question_index, keys, answers, grades):
+    """Reporte les notes sur les réponses des joueurs (dans l'acteur de la room)
+    et envoie à l'hôte les groupes de réponses quasi identiques"""
+    room = active_rooms.get(room_code)
+    if not room:
+        return
+    room['_grading'] -= 1
+
+    if grades is not None:
+        by_user = room['open_answers'].get(question_index, {})
+        if grades.correct is not None:
+            by_key = {key: (similarity, is_correct) for key, similarity, is_correct
+                      in zip(keys, grades.similarities, grades.correct)}
+            for entry in by_user.values():
+                entry['similarity'], entry['is_correct'] = by_key.get(
+                    normalize_answer(entry['answer']), (None, None))
+            log_event(room_code, 'open_grades', question=question_index, grades={
+                entry['username']: [entry['similarity'], entry['is_correct']]
+                for entry in by_user.values()})
+            room_store.save_room(room_code)
+
+        outbound.push(host_room(room_code), 'open_answer_clusters', {
+            'question_index': question_index,
+            'clusters': [{
+                'answer': answers[members[0]][0],
+                'count': sum(answers[m][1] for m in members),
+                'answers': [answers[m][0] for m in members],
+                'is_correct': None if grades.correct is None else grades.correct[members[0]]
+            } for members in grades.clusters]
+        })
+
+    if room['state'] == 'finished':
+        event_logs.close(room_code)
+        # La partie attendait ces notes pour être enregistrée
+        if not room['_grading'] and not room.get('results_saved'):
+            save_finished_game(room_code)
+
+
+def time_up(room_code, question_index):
+    room = active_rooms.get(room_code)
+    if not room or room['current_question'] != question_index:
+        return
+    print(
+        f"[DEBUG] Timer expired for question {question_index + 1} in room {room_code}")
+    timers.pop(room_code, None)
+    close_question(room_code, question_index)
+    # Juste notifier que le temps est écoulé
+    room_broadcast(room_code, 'time_up')
+    # Répartition finale de la question pour l'hôte, sans attendre le prochain tick
+    send_histogram(room_code)
+    outbound.flush(host_room(room_code))
+
+
+def histogram_payload(room, question_index):
+    packet = question_packets(room)[question_index]
+    return histogram_for(room, question_index, packet).to_dict(
+        no_answer=room['answered'].unanswered_count(question_index))
+
+
+def schedule_histogram(room_code):
+    """Regroupe les réponses d'une fenêtre HISTOGRAM_INTERVAL en un seul envoi à l'hôte"""
+    room = active_rooms[room_code]
+    if room.get('_histogram_timer') is None:
+        room['_histogram_timer'] = scheduler.schedule(
+            HISTOGRAM_INTERVAL, room_actors.submit, room_code, send_histogram, room_code)
+
+
+def send_histogram(room_code):
+    room = active_rooms.get(room_code)
+    if not room:
+        return
+    scheduler.cancel(room.pop('_histogram_timer', None))
+    current_q = room['current_question']
+    if current_q < len(room['questions']):
+        outbound.push(host_room(room_code), 'answer_histogram',
+                      histogram_payload(room, current_q), replace=True)
+
+
+def score_update(room):
+    """Top K et joueurs modifiés depuis le dernier envoi (calculé une fois par tick)"""
+    scoreboard = scoreboard_for(room)
+    return {
+        'top': scoreboard.top(SCOREBOARD_TOP_K),
+        'deltas': scoreboard.pop_deltas(),
+        'total_players': len(scoreboard)
+    }
+
+
+def room_event(room_of=None):
+    """Fait traiter un événement Socket.IO par l'acteur de sa room.
 
-    # Envoyer la question à tous les joueurs
-    socketio.emit('new_question', {
-        'question_number': current_q + 1,
-        'total_questions': len(room['questions']),
-        'question': question['question'],
-        'type': question['type'],
-        'image': image_data,
-        'options': options,
-        'time_limit': question.get('time_limit', 15)
-    }, room=room_code)
-
-    # Démarrer un timer pour la question (mais ne pas passer automatiquement à la suivante)
-    def start_timer(room_code, time_limit):
-        print(
-            f"[DEBUG] Starting timer for question {current_q + 1} in room {room_code}")
-        socketio.sleep(time_limit)
-        print(
-            f"[DEBUG] Timer expired for question {current_q + 1} in room {room_code}")
-        # Juste notifier que le temps est écoulé
-        socketio.emit('time_up', to=room_code)
-
-    timers[room_code] = socketio.start_background_task(
-        start_timer, room_code, question.get('time_limit', 15))
+    La room est celle de l'émetteur, ou room_of(data) pour les événements
+    qui la désignent eux-mêmes (create_room, join_room...). Le handler
+    s'exécute dans la tâche de l'acteur avec une copie du contexte de la
+    requête (request.sid, emit() sans destinataire).
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(*args):
+            # Heure d'arrivée, avant l'éventuelle attente dans la file de l'acteur
+            request.received_at = time.time()
+            room_code = room_of(*args) if room_of else user_rooms.get(request.sid)
+            if not room_code:
+                return handler(*args)
+            room_actors.submit(
+                room_code, copy_current_request_context(handler), *args)
+        return wrapper
+    return decorator
+
+
+def rate_limited(limiter):
+    """Écarte, avant la file de l'acteur, les événements d'un socket trop bavard"""
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(*args):
+            if limiter.allow(request.sid):
+                return handler(*args)
+        return wrapper
+    return decorator
+
+
+def room_in_data(data=None):
+    return (data or {}).get('room_code')
 
 
 # Socket events
@@ -1221,32 +1669,47 @@ def handle_connect():
 
 
 @socketio.on('disconnect')
-def handle_disconnect():
+@room_event()
+def handle_disconnect(reason=None):
     print('Client disconnected')
     user_id = request.sid
     if user_id in user_rooms:
         room_id = user_rooms[user_id]
         leave_room(room_id)
-        if room_id in active_rooms:
-            active_rooms[room_id]['players'].pop(user_id, None)
-            emit('player_left', {'user_id': user_id}, to=room_id)
+        # En cours de partie le joueur garde sa place (score, réponses) :
+        # resume_room la rattache à son nouveau socket
+        if room_id in active_rooms and active_rooms[room_id]['state'] == 'waiting':
+            remove_player(active_rooms[room_id], user_id)
+            scoreboard_for(active_rooms[room_id]).remove(user_id)
+            log_event(room_id, 'leave', sid=user_id)
+            join_admission.leave(room_id, user_id)
 
             # If room is empty, remove it
             if not active_rooms[room_id]['players']:
                 active_rooms.pop(room_id, None)
+                scheduler.cancel(timers.pop(room_id, None))
+                join_admission.discard_room(room_id)
+                room_actors.stop(room_id)
+            else:
+                room_store.save_room(room_id)
         user_rooms.pop(user_id, None)
-
-
-user_sessions = {}  # Associe request.sid à username
+    latency.forget(user_id)
+    open_answer_limiter.forget(user_id)
 
 
 @socketio.on('create_room')
+@room_event(room_in_data)
 def handle_create_room(data):
     user_id = request.sid
     username = data.get('username')
     quiz_id = data.get('quiz_id')
     room_code = data.get('room_code')
 
+    if not owns_room(room_code):
+        emit('error', {'message': 'Room is served by another worker',
+                       'worker_url': room_worker_url(room_code)})
+        return
+
     # Vérifier que l'hôte est connecté
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -1258,24 +1721,27 @@ def handle_create_room(data):
         emit('error', {'message': 'Host not logged in'})
         return
 
-    # Vérifier si une partie avec ce room_code existe déjà
-    cursor.execute('SELECT id FROM games WHERE room_code = ?', (room_code,))
-    existing_game = cursor.fetchone()
-
-    if existing_game:
-        game_id = existing_game['id']
-    else:
-        # Créer l'entrée de jeu seulement si elle n'existe pas déjà
-        cursor.execute('''
-            INSERT INTO games (quiz_id, room_code, host_id)
-            VALUES (?, ?, ?)
-        ''', (quiz_id, room_code, host['id']))
-        game_id = cursor.lastrowid
-        conn.commit()
-
+    # Une partie par room_code (clé unique) : créée seulement si elle n'existe pas déjà
+    cursor.execute('''
+        INSERT INTO games (quiz_id, room_code, host_id)
+        VALUES (?, ?, ?)
+        ON CONFLICT (room_code) DO NOTHING
+    ''', (quiz_id, room_code, host['id']))
+    created = cursor.rowcount == 1
+    conn.commit()
+    game_id = cursor.execute(
+        'SELECT id FROM games WHERE room_code = ?', (room_code,)).fetchone()['id']
+    if created:
+        # Nouvelle partie : journal vide (sinon rouvert à la suite par log_event)
+        event_logs.open(room_code, game_id)
+
+    # Compiler une fois pour toutes les paquets des questions
+    questions = get_quiz_by_id(quiz_id)['questions']
+    packets = compile_question_packets(questions, conn)
     conn.close()
 
     join_room(room_code)
+    join_room(host_room(room_code))
     user_rooms[user_id] = room_code
     user_sessions[user_id] = username
 
@@ -1286,23 +1752,35 @@ def handle_create_room(data):
         'host_id': str(user_id),
         'quiz_id': quiz_id,
         'players': {},
-        'questions': get_quiz_by_id(quiz_id)['questions'],
+        'answered': AnswerBitmap(len(questions)),  # qui a répondu à chaque question
+        'questions': questions,
+        '_packets': packets,
         'current_question': 0,
         'state': 'waiting',
-        'start_time': None
+        'start_time': None,
+        'last_activity': time.time(),
+        'version': 0,    # incrémentée à chaque room_broadcast
+        'sessions': {}   # jeton de reprise -> socket
     }
 
     emit('room_created', {'room_code': room_code, 'is_host': True})
+    open_session(room_code, user_id)
     emit('player_joined', {'players': []}, to=room_code)
 
 
 @socketio.on('join_room')
+@room_event(room_in_data)
 def handle_join_room(data):
     user_id = request.sid
     username = data.get('username')
     room_code = data.get('room_code')
     is_host = data.get('is_host', False)
 
+    if not owns_room(room_code):
+        emit('error', {'message': 'Room is served by another worker',
+                       'worker_url': room_worker_url(room_code)})
+        return
+
     if room_code not in active_rooms:
         emit('error', {'message': 'Room not found'})
         return
@@ -1315,66 +1793,104 @@ def handle_join_room(data):
     user_rooms[user_id] = room_code
     user_sessions[user_id] = username
 
-    # Enregistrer le joueur dans la base de données si ce n'est pas l'hôte
-    if not is_host:
-        conn = get_db_connection()
-        try:
-            # Vérifier si l'utilisateur existe déjà
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT id FROM users WHERE username = ?", (username,))
-            user = cursor.fetchone()
-
-            if not user:
-                # Créer un utilisateur temporaire
-                cursor.execute(
-                    "INSERT INTO users (username, password) VALUES (?, 'anonymous')",
-                    (username,)
-                )
-                conn.commit()
-                user_id_db = cursor.lastrowid
-            else:
-                user_id_db = user['id']
+    if is_host and active_rooms[room_code]['host'] == username:
+        join_room(host_room(room_code))
+
+    # Le joueur joue tout de suite ; son inscription en base part avec le lot du tick
+    if not is_host and user_id not in active_rooms[room_code]['players']:
+        add_player(active_rooms[room_code], user_id, username)
+        scoreboard_for(active_rooms[room_code]).update(user_id, 0, username)
+        token = open_session(room_code, user_id)
+        log_event(room_code, 'join', sid=user_id, username=username, token=token)
+        room_store.save_room(room_code)
+        join_admission.admit(
+            room_code, active_rooms[room_code]['game_id'], user_id, username)
+    elif is_host and active_rooms[room_code]['host'] == username:
+        open_session(room_code, user_id)
+
+    # Liste complète pour le nouvel arrivant, delta pour les autres (au prochain tick)
+    join_admission.greet(room_code, user_id)
+
+
+def room_snapshot(room_code, room):
+    """État compact de la room pour un client trop en retard sur l'anneau de deltas"""
+    snapshot = {
+        'state': room['state'],
+        'players': [roster_entry(pid, player)
+                    for pid, player in room['players'].items() if not player.is_host],
+        'question': None
+    }
+    current_q = room['current_question']
+    if room['state'] == 'playing' and room.get('asked_question') == current_q:
+        packet = question_packets(room)[current_q]
+        elapsed = time.time() - room.get('question_start_time', time.time())
+        snapshot['question'] = packet.payload
+        snapshot['time_left'] = max(0, int(packet.time_limit - elapsed))
+        snapshot['time_up'] = room_code not in timers
+    return snapshot
+
+
+@socketio.on('resume_room')
+@room_event(room_in_data)
+def handle_resume_room(data):
+    """Reprise après une coupure : le socket retrouve la place du jeton
+    et ne reçoit que les événements manqués depuis sa dernière version"""
+    user_id = request.sid
+    room_code = data.get('room_code')
+    room = active_rooms.get(room_code)
+    old_sid = room.get('sessions', {}).get(data.get('token')) if room else None
+    # Jeton inconnu, ou joueur retiré de la salle d'attente : nouvelle inscription
+    player = room['players'].get(old_sid) if old_sid is not None else None
+    if player is None and (old_sid is None or room['host_id'] != str(old_sid)):
+        emit('resume_failed', {'room_code': room_code})
+        return
 
-            # Vérifier si le joueur est déjà enregistré pour cette partie
-            cursor.execute('''
-                SELECT 1 FROM game_players 
-                WHERE game_id = ? AND user_id = ?
-            ''', (active_rooms[room_code]['game_id'], user_id_db))
-            exists = cursor.fetchone()
+    if old_sid != user_id:
+        if player is not None:
+            rekey_player(room, old_sid, user_id)
+            scoreboard_for(room).rename(old_sid, user_id)
+            log_event(room_code, 'resume', old=old_sid, sid=user_id)
+        else:
+            room['host_id'] = str(user_id)
+        room['sessions'][data['token']] = user_id
+        user_rooms.pop(old_sid, None)
+        user_sessions.pop(old_sid, None)
+        room_store.save_room(room_code)
 
-            if not exists:
-                # Enregistrer le joueur
-                cursor.execute('''
-                    INSERT INTO game_players (game_id, user_id, score)
-                    VALUES (?, ?, 0)
-                ''', (active_rooms[room_code]['game_id'], user_id_db))
-                conn.commit()
-        except Exception as e:
-            print(f"Error saving player: {str(e)}")
-            conn.rollback()
-        finally:
-            conn.close()
+    join_room(room_code)
+    user_rooms[user_id] = room_code
+    user_sessions[user_id] = player.username if player is not None else room['host']
+    if player is None:
+        join_room(host_room(room_code))
+    elif old_sid != user_id:
+        # Les autres clients remplacent l'ancien identifiant dans leur liste
+        room_broadcast(room_code, 'player_joined', {
+            'added': [roster_entry(user_id, player)],
+            'removed': [old_sid],
+            'total_players': len(room['players'])
+        })
 
-    if not is_host:
-        active_rooms[room_code]['players'][user_id] = {
-            'username': username,
-            'score': 0,
-            'answers': {},
-            'is_host': False
+    deltas_log = deltas_for(room, ROOM_DELTA_BUFFER)
+    reply = {'version': deltas_log.version}
+    missed = deltas_log.since(parse_version(data.get('version')))
+    if missed is None:
+        reply['snapshot'] = room_snapshot(room_code, room)
+    else:
+        reply['deltas'] = missed
+    if player is not None:
+        current_q = room['current_question']
+        reply['me'] = {
+            'id': user_id,
+            'score': player.score,
+            'rank': scoreboard_for(room).rank(user_id),
+            'answered': current_q < len(room['questions'])
+            and room['answered'].has_answered(current_q, player.slot)
         }
-
-    # Mettre à jour la liste des joueurs
-    players_list = [
-        {'id': pid, 'username': player['username'], 'score': player['score']}
-        for pid, player in active_rooms[room_code]['players'].items()
-        if not player.get('is_host', False)
-    ]
-
-    emit('player_joined', {'players': players_list}, to=room_code)
+    emit('room_sync', reply)
 
 
 @socketio.on('start_game')
+@room_event()
 def handle_start_game(data):
     user_id = request.sid
     room_code = user_rooms.get(user_id)
@@ -1395,12 +1911,15 @@ def handle_start_game(data):
     active_rooms[room_code]['state'] = 'playing'
     active_rooms[room_code]['start_time'] = datetime.now().timestamp()
     active_rooms[room_code]['current_question'] = 0
+    room_store.save_room(room_code)
 
-    emit('game_started', to=room_code)
+    room_broadcast(room_code, 'game_started')
+    emit('rtt_ping', latency.ping(room_code), to=room_code)
     send_question(room_code)
 
 
 @socketio.on('submit_answer')
+@room_event()
 def handle_submit_answer(data):
     user_id = request.sid
     room_code = user_rooms.get(user_id)
@@ -1415,60 +1934,85 @@ def handle_submit_answer(data):
         emit('error', {'message': 'Game not in progress'})
         return
 
-    if hasattr(room, 'time_elapsed') and room.time_elapsed:
+    if not question_open(room):
         emit('error', {'message': 'Time has elapsed, cannot submit answer'})
         return
 
+    player = room['players'].get(user_id)
+    if player is None:
+        emit('error', {'message': 'Player not found in room'})
+        return
+
     current_q = room['current_question']
-    question = room['questions'][current_q]
+    packet = question_packets(room)[current_q]
 
-    # Enregistrer la réponse
-    room['players'][user_id]['answers'][current_q] = answer
+    if not isinstance(answer, int) or not packet.options or not 0 <= answer < len(packet.options):
+        emit('error', {'message': 'Invalid answer'})
+        return
 
-    # Préparer les options en fonction du type de question
-    if question['type'] == 'true_false':
-        options = ['Vrai', 'Faux']
-    else:
-        options = [question['option_a'], question['option_b'],
-                   question['option_c'], question['option_d']]
+    # Une seule réponse par question : rejet en O(1) via le bitmap
+    if not room['answered'].mark(current_q, player.slot):
+        emit('error', {'message': 'Answer already submitted'})
+        return
+
+    # Enregistrer la réponse (histogramme d'abord : sa reconstruction relit les réponses)
+    histogram_for(room, current_q, packet).record(answer)
+    player.answers[current_q] = answer
+    schedule_histogram(room_code)
+    log_event(room_code, 'answer', sid=user_id, question=current_q, answer=answer)
+
+    if SCORING_MODE == 'deferred':
+        # Score, résultat et rang calculés pour tous à la clôture (settle_question)
+        window = room.get('score_window')
+        if window is None or window.question_index != current_q:
+            window = room['score_window'] = QuestionWindow(
+                current_q, capacity=room['answered'].next_slot)
+        window.record(player.slot, answer, thinking_time(room, user_id))
+        room_store.save_room(room_code)
+        return
 
     # Vérifier si la réponse est correcte
-    is_correct = options[answer] == question['correct_answer']
+    is_correct = packet.correct_index is not None and answer == packet.correct_index
 
     points = 0
 
     if is_correct:
-        base_points = question.get('points', 10)
-        total_time = question.get('time_limit', 15)
-        time_used = time.time() - room.get('question_start_time', time.time())
-        time_left = max(0, total_time - time_used)
+        base_points = packet.points
+        total_time = packet.time_limit
+        time_left = max(0, total_time - thinking_time(room, user_id))
 
         # Appliquer un bonus basé sur la vitesse de réponse
-        bonus_coeff = 1.0  # Tu peux ajuster cette valeur
-        bonus_multiplier = 1 + (time_left / total_time) * bonus_coeff
+        bonus_multiplier = 1 + (time_left / total_time) * SPEED_BONUS_COEFF
         points = round(base_points * bonus_multiplier)
 
-        room['players'][user_id]['score'] += points
+        player.score += points
+        log_event(room_code, 'score', sid=user_id, score=player.score)
+
+    scoreboard = scoreboard_for(room)
+    scoreboard.update(user_id, player.score)
+    room_store.save_room(room_code)
 
     # Envoyer le résultat au joueur
     emit('answer_result', {
         'is_correct': is_correct,
-        'correct_answer': question['correct_answer'],
+        'correct_answer': packet.correct_answer,
         'points': points,
-        'new_score': room['players'][user_id]['score']
+        'new_score': player.score
     }, to=user_id)
 
-    # Envoyer tous les scores à l'hôte
-    players_list = [
-        {'id': pid, 'username': player['username'], 'score': player['score']}
-        for pid, player in room['players'].items()
-        if str(pid) != str(room['host_id'])
-    ]
+    # L'hôte reçoit au prochain tick le top K et les joueurs modifiés, le joueur seulement son rang
+    outbound.push(host_room(room_code), 'update_scores',
+                  lambda: score_update(room), replace=True)
 
-    emit('update_scores', {'players': players_list}, to=room_code)
+    emit('player_rank', {
+        'rank': scoreboard.rank(user_id),
+        'score': player.score,
+        'total_players': len(scoreboard)
+    }, to=user_id)
 
 
 @socketio.on('next_question')
+@room_event()
 def handle_next_question(data):
     user_id = request.sid
     room_code = user_rooms.get(user_id)
@@ -1488,144 +2032,121 @@ def handle_next_question(data):
 
     room = active_rooms[room_code]
     current_q = room['current_question']
+    # next_question reçu après la dernière question : partie déjà close et enregistrée
+    if room['state'] == 'finished' or current_q >= len(room['questions']):
+        return
+
+    # Les joueurs sans réponse gardent NO_ANSWER dans leur vecteur de réponses
+    print(f"[DEBUG] {room['answered'].unanswered_count(current_q)} player(s) "
+          f"did not answer question {current_q + 1} in room {room_code}")
 
-    # Submit automatic answers for players who didn't answer
-    for player_id, player in room['players'].items():
-        if current_q not in player['answers']:
-            player['answers'][current_q] = -1  # Indicate no answer
+    # La question en cours est close : annuler son time_up et son histogramme en attente
+    scheduler.cancel(timers.pop(room_code, None))
+    scheduler.cancel(room.pop('_histogram_timer', None))
+    # L'hôte a pu avancer avant time_up : les réponses en attente sont notées maintenant
+    close_question(room_code, current_q)
 
     # Move to next question or end game
     room['current_question'] += 1
+    room_store.save_room(room_code)
 
     if room['current_question'] < len(room['questions']):
         # Envoyer d'abord la notification de préparation
         send_preparation(room_code)
 
-        # Démarrer un timer pour envoyer la vraie question après 5 secondes
-        def delayed_question():
-            socketio.sleep(5)
-            send_question(room_code)
-
-        if room_code in timers:
-            timers[room_code].join()
-
-        timers[room_code] = socketio.start_background_task(delayed_question)
+        # Envoyer la vraie question après le délai de préparation
+        timers[room_code] = scheduler.schedule(
+            PREPARATION_DELAY, room_actors.submit, room_code, send_question, room_code)
     else:
         # End game
         room['state'] = 'finished'
+        room['finished_at'] = time.time()
+        log_event(room_code, 'finish')
+        event_logs.close(room_code)
+        room_store.save_room(room_code)
+        # Sinon enregistrée par apply_open_grades, avec les notes de la dernière question
+        if not room.get('_grading'):
+            save_finished_game(room_code)
 
-        # Enregistrer la partie dans la base de données
-        conn = get_db_connection()
-        cursor = conn.cursor()
 
-        try:
-            # Utiliser l'ID de jeu existant au lieu d'en créer un nouveau
-            game_id = room['game_id']
-
-            # Enregistrer les joueurs et leurs réponses
-            for pid, player in room['players'].items():
-                # Trouver l'ID utilisateur
-                cursor.execute(
-                    'SELECT id FROM users WHERE username = ?', (player['username'],))
-                user_result = cursor.fetchone()
-                if user_result:
-                    db_user_id = user_result['id']
-
-                    # Vérifier si le joueur est déjà enregistré
-                    cursor.execute('''
-                        SELECT id FROM game_players 
-                        WHERE game_id = ? AND user_id = ?
-                    ''', (game_id, db_user_id))
-                    exists = cursor.fetchone()
-
-                    if not exists:
-                        # Enregistrer le joueur s'il n'existe pas déjà
-                        cursor.execute('''
-                            INSERT INTO game_players (game_id, user_id, score)
-                            VALUES (?, ?, ?)
-                        ''', (game_id, db_user_id, player['score']))
-                    else:
-                        # Mettre à jour le score si le joueur existe déjà
-                        cursor.execute('''
-                            UPDATE game_players 
-                            SET score = ?
-                            WHERE game_id = ? AND user_id = ?
-                        ''', (player['score'], game_id, db_user_id))
-
-                        # Enregistrer les réponses des joueurs
-                        for q_idx, answer in player['answers'].items():
-                            question = room['questions'][q_idx]
-
-                            cursor.execute('''
-                                SELECT id FROM answers 
-                                WHERE game_id = ? AND question_id = ? AND user_id = ?
-                            ''', (game_id, question['id'], db_user_id))
-                            existing_answer = cursor.fetchone()
-
-                            if not existing_answer:
-                                # Gestion spéciale des questions ouvertes
-                                if question['type'] == 'open_question':
-                                    # Récupérer la réponse textuelle depuis room['open_answers']
-                                    open_answers = room.get(
-                                        'open_answers', {}).get(q_idx, [])
-                                    player_open_answer = next(
-                                        (entry for entry in open_answers if entry['username'] == player['username']), None)
-                                    answer_text = player_open_answer['answer'] if player_open_answer else 'No answer'
-                                    is_correct = None  # pas applicable
-                                else:
-                                    answer_text = str(
-                                        answer) if answer != -1 else 'No answer'
-                                    options = []
-                                    if question['type'] == 'true_false':
-                                        options = ['Vrai', 'Faux']
-                                    else:
-                                        options = [
-                                            question.get('option_a'),
-                                            question.get('option_b'),
-                                            question.get('option_c'),
-                                            question.get('option_d')
-                                        ]
-                                    is_correct = (
-                                        options[answer] == question['correct_answer']) if answer != -1 and answer < len(options) else False
-
-                                cursor.execute('''
-                                    INSERT INTO answers (game_id, question_id, user_id, answer_text, is_correct)
-                                    VALUES (?, ?, ?, ?, ?)
-                                ''', (
-                                    game_id,
-                                    question['id'],
-                                    db_user_id,
-                                    answer_text,
-                                    is_correct
-                                ))
+def save_finished_game(room_code):
+    """Enregistre la partie dans la base de données (une seule transaction)"""
+    room = active_rooms[room_code]
+    room['results_saved'] = True
+    game_id = room['game_id']
+    try:
+        # Les inscriptions encore en attente doivent précéder les résultats
+        join_admission.write_pending()
+        save_game_results(game_id, build_game_results(room))
+
+        # Envoyer l'ID de la partie aux clients (classement complet, hôte exclu)
+        players_list = scoreboard_for(room).top()
+        room_broadcast(room_code, 'game_over', {
+            'players': players_list,
+            'quiz_id': room['quiz_id'],
+            'game_id': game_id
+        })
 
-            conn.commit()
+    except Exception as e:
+        print(f"Error saving game results: {str(e)}")
 
-            # Envoyer l'ID de la partie aux clients
-            players_list = [
-                {'id': pid,
-                    'username': player['username'], 'score': player['score']}
-                for pid, player in room['players'].items()
-                if str(pid) != str(room['host_id'])  # Exclure l'hôte
-            ]
-            socketio.emit('game_over', {
-                'players': players_list,
-                'quiz_id': room['quiz_id'],
-                'game_id': game_id
-            }, to=room_code)
+    # Clean up
+    scheduler.cancel(timers.pop(room_code, None))
 
-        except Exception as e:
-            conn.rollback()
-            print(f"Error saving game results: {str(e)}")
-        finally:
-            conn.close()
 
-        # Clean up
-        if room_code in timers:
-            del timers[room_code]
+def build_game_results(room):
+    """Scores et réponses de chaque joueur au format de save_game_results"""
+    packets = question_packets(room)
+
+    # Réponses ouvertes déjà indexées par question puis par joueur
+    open_answers = room.get('open_answers', {})
+
+    results = []
+    for player in room['players'].values():
+        answers = []
+        for q_idx, answer in enumerate(player.answers):
+            packet = packets[q_idx]
+            if packet.type == 'open_question':
+                entry = open_answers.get(q_idx, {}).get(player.username)
+                answer_text = entry['answer'] if entry else 'No answer'
+                # None sans réponse ou sans référence pour la correction
+                is_correct = entry.get('is_correct') if entry else None
+            else:
+                answer_text = str(answer) if answer != NO_ANSWER else 'No answer'
+                is_correct = answer != NO_ANSWER and answer == packet.correct_index
+            answers.append((packet.question_id, answer_text, is_correct))
+        results.append((player.username, player.score, answers))
+    return results
+
+
+def release_room(room_code):
+    """Libère ce qui vit hors du store pour une room évincée"""
+    scheduler.cancel(timers.pop(room_code, None))
+    event_logs.close(room_code)
+    join_admission.discard_room(room_code)
+    room_actors.stop(room_code)
+    latency.forget_room(room_code)
+    outbound.discard(room_code)
+    outbound.discard(host_room(room_code))
+    socketio.close_room(room_code)
+    socketio.close_room(host_room(room_code))
+
+
+room_reaper = RoomReaper(room_store, idle_ttl=ROOM_IDLE_TTL,
+                         finished_ttl=ROOM_FINISHED_TTL, on_evict=release_room,
+                         owns=owns_room)
+
+
+def sweep_rooms():
+    evicted = room_reaper.sweep()
+    if evicted:
+        print(f"[INFO] Evicted {len(evicted)} room(s): {', '.join(evicted)}")
+    scheduler.schedule(ROOM_SWEEP_INTERVAL, sweep_rooms)
 
 
 @socketio.on('submit_open_answer')
+@rate_limited(open_answer_limiter)
+@room_event()
 def handle_submit_open_answer(data):
     user_id = request.sid
     room_code = user_rooms.get(user_id)
@@ -1635,32 +2156,43 @@ def handle_submit_open_answer(data):
 
     room = active_rooms[room_code]
     current_q = room['current_question']  # Utiliser toujours current_question
+    # Réponses déjà corrigées à la clôture : une réponse tardive ne compterait pas
+    if not question_open(room):
+        return
 
     # Initialisation du stockage des réponses
     if 'open_answers' not in room:
         room['open_answers'] = {}
-    if current_q not in room['open_answers']:
-        room['open_answers'][current_q] = []
+    by_user = room['open_answers'].setdefault(current_q, {})
 
-    # Enregistrement de la réponse
+    # Enregistrement de la réponse : une seule par joueur, la première compte
+    username = user_sessions.get(user_id, "Anonymous")
+    answer = data.get('answer_text', '').strip()
+    if username in by_user or not normalize_answer(answer):
+        return
     answer_data = {
-        'username': user_sessions.get(user_id, "Anonymous"),
-        'answer': data.get('answer_text', '').strip(),
+        'username': username,
+        'answer': answer,
         'timestamp': datetime.now().timestamp()
     }
 
-    room['open_answers'][current_q].append(answer_data)
+    # Décompte obtenu (ou reconstruit) avant d'enregistrer la réponse : sinon
+    # une reconstruction la compterait, puis tally.add une seconde fois
+    tally = tally_for(room, current_q)
+    by_user[username] = answer_data
+    log_event(room_code, 'open_answer', sid=user_id, question=current_q,
+              username=answer_data['username'], answer=answer_data['answer'])
+    room_store.save_room(room_code)
 
-    # Envoyer à toute la room
-    emit('new_open_answer', {
-        'username': answer_data['username'],
-        'answer': answer_data['answer'],
-        'question_index': current_q,  # Envoyer l'index actuel
-        'timestamp': answer_data['timestamp']
-    }, room=room_code)
+    # Seul l'hôte reçoit les réponses ouvertes : dédoublonnées et comptées, seules
+    # celles modifiées depuis le tick précédent partent dans sa prochaine trame
+    tally.add(answer)
+    outbound.push(host_room(room_code), 'open_answer_tally',
+                  tally.take_changes, replace=True)
 
 
 @socketio.on('get_player_answers')
+@room_event(room_in_data)
 def handle_get_player_answers(data):
     room_code = data.get('room_code')
     if not room_code or room_code not in active_rooms:
@@ -1668,17 +2200,53 @@ def handle_get_player_answers(data):
 
     room = active_rooms[room_code]
     current_q = room['current_question']
-    answers = {}
+    if current_q >= len(room['questions']):
+        return
 
-    for player_id, player in room['players'].items():
-        if current_q in player['answers']:
-            answers[player_id] = {
-                'username': player['username'],
-                'answer': player['answers'][current_q]
-            }
+    # Répartition tenue à jour à chaque réponse : rien à parcourir, envoyée au seul demandeur
+    emit('answer_histogram', histogram_payload(room, current_q))
 
-    emit('player_answers', {'answers': answers}, room=room_code)
+
+@socketio.on('rtt_pong')
+def handle_rtt_pong(data):
+    # Traité hors de l'acteur de la room : la file fausserait la mesure
+    room_code = user_rooms.get(request.sid)
+    if room_code and isinstance(data, dict):
+        latency.pong(request.sid, room_code, data.get('id'))
+
+
+def rtt_ping_loop():
+    """Un rtt_ping par room active toutes les RTT_PING_INTERVAL s (une trame par room)"""
+    while True:
+        socketio.sleep(RTT_PING_INTERVAL)
+        for room_code, room in room_store.owned_rooms(owns_room):
+            if room.get('state') != 'finished':
+                socketio.emit('rtt_ping', latency.ping(room_code), to=room_code)
+
+
+def snapshot_rooms_loop():
+    """Sauvegarde périodique des rooms actives dans SQLite"""
+    while True:
+        socketio.sleep(SNAPSHOT_INTERVAL)
+        conn = get_db_connection()
+        try:
+            room_store.snapshot(conn, owns=owns_room)
+        except Exception as e:
+            conn.rollback()
+            print(f"Error saving room snapshots: {str(e)}")
+        finally:
+            conn.close()
 
 
 if __name__ == '__main__':
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True)
+    socketio.start_background_task(snapshot_rooms_loop)
+    socketio.start_background_task(rtt_ping_loop)
+    socketio.start_background_task(event_logs.run, socketio.sleep)
+    socketio.start_background_task(scheduler.run, socketio.sleep)
+    socketio.start_background_task(outbound.run, socketio.sleep)
+    socketio.start_background_task(
+        join_admission.run, socketio.sleep, broadcast_roster)
+    scheduler.schedule(ROOM_SWEEP_INTERVAL, sweep_rooms)
+    # Pas de reloader en multi-worker : cluster.py gère les processus
+    socketio.run(app, host='0.0.0.0', port=PORT, debug=True,
+                 use_reloader=WORKER_COUNT == 1)
@@ -0,0 +1,79 @@
+"""Benchmark de save_game_results : P joueurs x Q questions sur une base jetable.
+
+Usage : python bench/bench_persist.py [--players 500] [--questions 50]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+def seed(players, questions):
+    conn = db.get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO users (username, password) VALUES ('host', 'x')")
+    host_id = cursor.lastrowid
+    cursor.execute(
+        "INSERT INTO quizzes (title, user_id) VALUES ('bench', ?)", (host_id,))
+    quiz_id = cursor.lastrowid
+    cursor.executemany('''
+        INSERT INTO questions (quiz_id, question, option_a, option_b, option_c, option_d,
+                               correct_answer, type, position)
+        VALUES (?, ?, 'a', 'b', 'c', 'd', 'a', 'qcm', ?)
+    ''', [(quiz_id, f'Q{i}', i) for i in range(questions)])
+    question_ids = [row[0] for row in cursor.execute(
+        'SELECT id FROM questions WHERE quiz_id = ?', (quiz_id,))]
+    cursor.executemany(
+        "INSERT INTO users (username, password) VALUES (?, 'anonymous')",
+        [(f'player{i}',) for i in range(players)])
+    cursor.execute(
+        "INSERT INTO games (quiz_id, room_code, host_id) VALUES (?, '000000', ?)",
+        (quiz_id, host_id))
+    game_id = cursor.lastrowid
+    # Comme handle_join_room, chaque joueur est déjà inscrit à la partie
+    cursor.execute('''
+        INSERT INTO game_players (game_id, user_id, score)
+        SELECT ?, id, 0 FROM users WHERE username LIKE 'player%'
+    ''', (game_id,))
+    conn.commit()
+    conn.close()
+    return game_id, question_ids
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=500)
+    parser.add_argument('--questions', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.use_database(os.path.join(tmp, 'bench.db'))
+        db.init_db()
+        game_id, question_ids = seed(args.players, args.questions)
+
+        results = []
+        for i in range(args.players):
+            answers = []
+            for question_id in question_ids:
+                answer = random.randint(-1, 3)
+                answers.append((question_id, str(answer) if answer != -1 else 'No answer',
+                                answer == 0))
+            results.append((f'player{i}', random.randint(0, 1000), answers))
+
+        start = time.perf_counter()
+        inserted = db.save_game_results(game_id, results)
+        elapsed = time.perf_counter() - start
+
+    print(f"{args.players} players x {args.questions} questions: "
+          f"{inserted} answers persisted in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
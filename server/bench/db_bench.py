@@ -0,0 +1,146 @@
+"""Microbenchmark SQLite : écritures de partie concurrentes avec des lectures de rapport.
+
+W threads enregistrent des réponses (une transaction par lot, comme
+save_game_results) pendant que R threads lisent les statistiques d'une
+partie (comme /api/game_details). Deux modes sur des bases jetables :
+  - legacy : sqlite3.connect à chaque opération, journal par défaut
+  - pooled : pools de db.py (WAL, busy_timeout, pragmas, lectures seules)
+Le rapport JSON donne les opérations par seconde et les erreurs
+"database is locked" de chaque mode.
+
+Usage : python bench/db_bench.py [--writers 4] [--readers 4] [--duration 5]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+REPORT_QUERY = '''
+    SELECT question_id, COUNT(DISTINCT user_id) AS total_answers,
+           SUM(CASE WHEN is_correct THEN 1 ELSE 0 END) AS correct_count
+    FROM answers
+    WHERE game_id = ?
+    GROUP BY question_id
+'''
+
+
+def seed(path, players, questions):
+    db.use_database(path)
+    db.init_db()
+    with db.connection() as conn:
+        host_id = conn.execute(
+            "INSERT INTO users (username, password) VALUES ('host', 'x')").lastrowid
+        quiz_id = conn.execute(
+            "INSERT INTO quizzes (title, user_id) VALUES ('bench', ?)", (host_id,)).lastrowid
+        conn.executemany(
+            "INSERT INTO questions (quiz_id, question, type, position) VALUES (?, ?, 'qcm', ?)",
+            [(quiz_id, f'Q{i}', i) for i in range(questions)])
+        game_id = conn.execute(
+            "INSERT INTO games (quiz_id, room_code, host_id) VALUES (?, '000000', ?)",
+            (quiz_id, host_id)).lastrowid
+    db.pool.close_all()
+    return game_id
+
+
+def legacy_connect(path):
+    def connect(readonly=False):
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        return conn
+    return connect
+
+
+def pooled_connect(readonly=False):
+    return db.get_read_connection() if readonly else db.get_db_connection()
+
+
+def run(connect, game_id, args):
+    stop = time.perf_counter() + args.duration
+    counts = {'writes': 0, 'reads': 0, 'locked': 0}
+    lock = threading.Lock()
+
+    def count(key):
+        with lock:
+            counts[key] += 1
+
+    def writer(worker):
+        user = worker * 1_000_000
+        while time.perf_counter() < stop:
+            rows = [(game_id, q, user + i, 'a', i % 2 == 0)
+                    for i in range(args.batch) for q in (1, 2)]
+            user += args.batch
+            conn = connect()
+            try:
+                conn.executemany('''
+                    INSERT INTO answers (game_id, question_id, user_id, answer_text, is_correct)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', rows)
+                conn.commit()
+                count('writes')
+            except sqlite3.OperationalError:
+                conn.rollback()
+                count('locked')
+            finally:
+                conn.close()
+
+    def reader():
+        while time.perf_counter() < stop:
+            conn = connect(readonly=True)
+            try:
+                conn.execute(REPORT_QUERY, (game_id,)).fetchall()
+                count('reads')
+            except sqlite3.OperationalError:
+                count('locked')
+            finally:
+                conn.close()
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'writes_per_s': round(counts['writes'] / args.duration, 1),
+        'reads_per_s': round(counts['reads'] / args.duration, 1),
+        'locked_errors': counts['locked']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--batch', type=int, default=20, help='joueurs par transaction')
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Le mode WAL est persistant : une base distincte par mode
+        legacy_path = os.path.join(tmp, 'legacy.db')
+        game_id = seed(legacy_path, 1, 2)
+        with sqlite3.connect(legacy_path) as conn:
+            conn.execute('PRAGMA journal_mode=DELETE')
+        report['legacy'] = run(legacy_connect(legacy_path), game_id, args)
+
+        game_id = seed(os.path.join(tmp, 'pooled.db'), 1, 2)
+        report['pooled'] = run(pooled_connect, game_id, args)
+        report['pooled']['pool'] = {'write': db.pool.stats(), 'read': db.read_pool.stats()}
+        db.pool.close_all()
+        db.read_pool.close_all()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,399 @@
+"""Test de charge Socket.IO : un hôte et N joueurs par room jouent une partie complète.
+
+Scénario par room : create_room -> N x join_room -> start_game -> rafale de
+submit_answer -> next_question ... -> game_over. Le rapport JSON donne les
+p50/p95/p99 (ms) de :
+  - answer_result : submit_answer -> réponse au joueur
+  - update_scores : submit_answer -> delta du joueur reçu par l'hôte
+  - new_question  : start_game / next_question (+ délai de préparation) -> réception
+ainsi que le CPU et la RSS du serveur (somme de tous ses processus).
+
+Usage :
+  python bench/loadtest.py --players 300 --output report.json
+  python bench/loadtest.py --spawn --rooms 2 --players 200   # démarre app.py
+  python bench/loadtest.py --spawn --workers 4 --rooms 8      # démarre cluster.py
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+import requests
+import socketio
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HOST_USERNAME = 'loadtest-host'
+HOST_PASSWORD = 'loadtest'
+
+
+def percentiles(samples):
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def pick(p):
+        # Rang le plus proche
+        index = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))
+        return round(ordered[index] * 1000, 3)
+
+    return {
+        'count': len(ordered),
+        'p50': pick(50),
+        'p95': pick(95),
+        'p99': pick(99),
+        'max': round(ordered[-1] * 1000, 3)
+    }
+
+
+class ServerSampler:
+    """Échantillonne CPU (%) et RSS du serveur et de ses processus enfants
+    (reloader, workers de cluster.py) en tâche de fond"""
+
+    def __init__(self, pid, interval=0.5):
+        self.process = psutil.Process(pid) if pid else None
+        self.interval = interval
+        self.cpu = []
+        self.rss = []
+        self._tracked = {}  # pid -> Process (cpu_percent mesure depuis l'appel précédent)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        if self.process is not None:
+            self._sample()
+            self._thread.start()
+
+    def _sample(self):
+        processes = [self.process] + self.process.children(recursive=True)
+        cpu = rss = 0
+        for process in processes:
+            tracked = self._tracked.setdefault(process.pid, process)
+            try:
+                with tracked.oneshot():
+                    cpu += tracked.cpu_percent(None)
+                    rss += tracked.memory_info().rss
+            except psutil.NoSuchProcess:
+                self._tracked.pop(process.pid, None)
+        return cpu, rss
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                cpu, rss = self._sample()
+            except psutil.NoSuchProcess:
+                return
+            self.cpu.append(cpu)
+            self.rss.append(rss)
+
+    def report(self):
+        if self.process is None:
+            return None
+        return {
+            'pid': self.process.pid,
+            'processes': len(self._tracked),
+            'samples': len(self.cpu),
+            'cpu_percent_avg': round(sum(self.cpu) / len(self.cpu), 1) if self.cpu else None,
+            'cpu_percent_max': max(self.cpu) if self.cpu else None,
+            'rss_mb_max': round(max(self.rss) / 2**20, 1) if self.rss else None,
+            'rss_mb_last': round(self.rss[-1] / 2**20, 1) if self.rss else None
+        }
+
+
+class Latencies:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {'answer_result': [], 'update_scores': [], 'new_question': []}
+        self.errors = {}
+
+    def add(self, name, value):
+        with self._lock:
+            self.samples[name].append(value)
+
+    def error(self, message):
+        with self._lock:
+            self.errors[message] = self.errors.get(message, 0) + 1
+
+
+class RoomRun:
+    """Une room : un client hôte et N clients joueurs pilotés depuis un thread"""
+
+    def __init__(self, args, quiz_id, latencies):
+        self.args = args
+        self.quiz_id = quiz_id
+        self.latencies = latencies
+        self.room_code = f'{random.randint(0, 999999):06d}'
+        self.url = args.url  # worker qui sert la room (résolu dans setup)
+        self.host = self._client()
+        self.players = []
+        self.sent_at = {}        # sid -> instant du submit_answer pour la question courante
+        self.question_due = 0.0  # instant où new_question est attendu
+        self.question = None
+        self.cond = threading.Condition()
+        self.counts = {}
+
+    def _client(self):
+        client = socketio.Client(reconnection=False)
+        client.on('error', lambda data: self.latencies.error(
+            (data or {}).get('message', 'unknown')))
+        return client
+
+    def _count(self, name):
+        with self.cond:
+            self.counts[name] = self.counts.get(name, 0) + 1
+            self.cond.notify_all()
+
+    def _wait(self, name, expected):
+        deadline = time.monotonic() + self.args.timeout
+        with self.cond:
+            while self.counts.get(name, 0) < expected:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f'{self.room_code}: {name} {self.counts.get(name, 0)}/{expected}')
+                self.cond.wait(remaining)
+            self.counts[name] = 0
+
+    def _connect(self, client):
+        client.connect(self.url, transports=['websocket'])
+
+    def setup(self):
+        # En multi-worker, la room n'est servie que par son worker
+        response = requests.get(f'{self.args.url}/api/rooms/{self.room_code}/worker')
+        response.raise_for_status()
+        self.url = response.json().get('url') or self.args.url
+
+        host = self.host
+        host.on('room_created', lambda data: self._count('room_created'))
+        host.on('player_joined', lambda data, *version: self._on_player_joined(data))
+        host.on('batch', self._on_batch)
+        host.on('game_over', lambda data, *version: self._count('game_over'))
+        self._connect(host)
+        host.emit('create_room', {
+            'username': HOST_USERNAME,
+            'quiz_id': self.quiz_id,
+            'room_code': self.room_code
+        })
+        self._wait('room_created', 1)
+
+        with ThreadPoolExecutor(max_workers=self.args.connect_concurrency) as pool:
+            self.players = list(pool.map(self._join, range(self.args.players)))
+        self._wait('all_joined', 1)
+
+    def _join(self, index):
+        client = self._client()
+        # Événements diffusés à la room : (data, version)
+        client.on('new_question', lambda data, *version: self._on_new_question(data))
+        client.on('answer_result', lambda data: self._on_answer_result(client))
+        client.on('game_over', lambda data, *version: self._count('game_over'))
+        client.on('rtt_ping', lambda data: client.emit('rtt_pong', data))
+        self._connect(client)
+        client.emit('join_room', {
+            'username': f'lt-{self.room_code}-{index}',
+            'room_code': self.room_code
+        })
+        return client
+
+    def _on_player_joined(self, data):
+        # Liste complète ou delta groupé (added/removed + total_players)
+        total = data.get('total_players', len(data.get('players', [])))
+        if total >= self.args.players:
+            self._count('all_joined')
+
+    def _on_new_question(self, data):
+        self.latencies.add('new_question', time.perf_counter() - self.question_due)
+        self.question = data
+        self._count('new_question')
+
+    def _on_answer_result(self, client):
+        sent = self.sent_at.get(client.get_sid())
+        if sent is not None:
+            self.latencies.add('answer_result', time.perf_counter() - sent)
+        self._count('answer_result')
+
+    def _on_batch(self, data):
+        # Événements regroupés par le serveur : une trame par room et par tick
+        for event, payload in data.get('events', []):
+            if event == 'update_scores':
+                self._on_update_scores(payload)
+
+    def _on_update_scores(self, data):
+        now = time.perf_counter()
+        for delta in data.get('deltas', []):
+            sent = self.sent_at.get(delta['id'])
+            if sent is not None:
+                self.latencies.add('update_scores', now - sent)
+
+    def _answer(self, client, options):
+        if self.args.think_max:
+            time.sleep(random.uniform(0, self.args.think_max))
+        self.sent_at[client.get_sid()] = time.perf_counter()
+        client.emit('submit_answer', {'answer': random.randrange(len(options))})
+
+    def play(self):
+        self.question_due = time.perf_counter()
+        self.host.emit('start_game', {})
+
+        while True:
+            self._wait('new_question', len(self.players))
+            options = self.question.get('options')
+            last = self.question['question_number'] >= self.question['total_questions']
+
+            self.sent_at.clear()
+            if options:
+                with ThreadPoolExecutor(max_workers=self.args.connect_concurrency) as pool:
+                    list(pool.map(lambda c: self._answer(c, options), self.players))
+                self._wait('answer_result', len(self.players))
+
+            if last:
+                self.host.emit('next_question', {})
+                self._wait('game_over', len(self.players) + 1)
+                return
+
+            self.question_due = time.perf_counter() + self.args.preparation_delay
+            self.host.emit('next_question', {})
+
+    def close(self):
+        for client in [self.host] + self.players:
+            try:
+                client.disconnect()
+            except Exception:
+                pass
+
+
+def seed_quiz(url, questions):
+    """Crée l'hôte (s'il n'existe pas) et un quiz QCM de 'questions' questions"""
+    requests.post(f'{url}/api/register', json={
+        'username': HOST_USERNAME, 'password': HOST_PASSWORD})
+    response = requests.post(f'{url}/api/login', json={
+        'username': HOST_USERNAME, 'password': HOST_PASSWORD})
+    response.raise_for_status()
+    user_id = response.json()['user']['id']
+
+    response = requests.post(f'{url}/api/quizzes', json={
+        'title': 'Load test',
+        'user_id': user_id,
+        'questions': [{
+            'question': f'Question {i + 1}',
+            'type': 'qcm',
+            'option_a': 'A', 'option_b': 'B', 'option_c': 'C', 'option_d': 'D',
+            'correct_answer': 'A',
+            'time_limit': 30,
+            'points': 10
+        } for i in range(questions)]
+    })
+    response.raise_for_status()
+    return response.json()['quiz_id']
+
+
+def spawn_server(url, workers=1, timeout=120):
+    """Démarre app.py (ou cluster.py avec plusieurs workers) et attend que l'API réponde"""
+    command = [sys.executable, 'app.py'] if workers <= 1 else [
+        sys.executable, 'cluster.py', '--workers', str(workers)]
+    process = subprocess.Popen(command, cwd=SERVER_DIR)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'app.py exited with code {process.returncode}')
+        try:
+            requests.get(f'{url}/api/metrics', timeout=1)
+            return process
+        except requests.RequestException:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError('server did not start in time')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--spawn', action='store_true',
+                        help='démarrer app.py au lieu de viser un serveur existant')
+    parser.add_argument('--server-pid', type=int,
+                        help='PID du serveur à échantillonner (sans --spawn)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='avec --spawn : nombre de workers (cluster.py au-delà de 1)')
+    parser.add_argument('--rooms', type=int, default=1)
+    parser.add_argument('--players', type=int, default=200, help='joueurs par room')
+    parser.add_argument('--questions', type=int, default=5)
+    parser.add_argument('--think-max', type=float, default=0.0,
+                        help='délai aléatoire max (s) avant chaque réponse ; 0 = rafale')
+    parser.add_argument('--preparation-delay', type=float, default=5.0,
+                        help='PREPARATION_DELAY du serveur, retiré des latences new_question')
+    parser.add_argument('--connect-concurrency', type=int, default=50)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--output', help='fichier JSON (stdout par défaut)')
+    args = parser.parse_args()
+
+    server = spawn_server(args.url, args.workers) if args.spawn else None
+    sampler = ServerSampler(server.pid if server else args.server_pid)
+    latencies = Latencies()
+    runs = []
+    failures = []
+
+    try:
+        quiz_id = seed_quiz(args.url, args.questions)
+        runs = [RoomRun(args, quiz_id, latencies) for _ in range(args.rooms)]
+
+        sampler.start()
+        started = time.perf_counter()
+
+        def run(room):
+            try:
+                room.setup()
+                room.play()
+            except Exception as e:
+                failures.append(f'{room.room_code}: {e}')
+
+        threads = [threading.Thread(target=run, args=(room,)) for room in runs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - started
+    finally:
+        sampler.stop()
+        for room in runs:
+            room.close()
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        'config': {
+            'rooms': args.rooms,
+            'workers': args.workers,
+            'players_per_room': args.players,
+            'questions': args.questions,
+            'think_max_s': args.think_max
+        },
+        'duration_s': round(duration, 3),
+        'latency_ms': {name: percentiles(samples)
+                       for name, samples in latencies.samples.items()},
+        'errors': latencies.errors,
+        'failures': failures,
+        'server': sampler.report()
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
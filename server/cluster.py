@@ -0,0 +1,84 @@
+"""Lance le serveur de jeu sur plusieurs processus (un cœur CPU chacun).
+
+Chaque room appartient au worker worker_for(room_code) ; les clients
+demandent son adresse à GET /api/rooms/<code>/worker avant d'ouvrir leur
+socket. Les émissions entre workers passent par le message_queue de
+Flask-SocketIO : un broker RESP local est démarré si --broker n'est pas
+fourni.
+
+Usage : python cluster.py --workers 4 [--base-port 5000] [--broker redis://host:6379/0]
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import zlib
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def worker_for(room_code, worker_count):
+    """Worker propriétaire d'une room (hachage stable entre processus)"""
+    if worker_count <= 1:
+        return 0
+    return zlib.crc32(str(room_code).encode('utf-8')) % worker_count
+
+
+def worker_env(worker_id, worker_urls, port, message_queue):
+    env = dict(os.environ)
+    env.update({
+        'WORKER_ID': str(worker_id),
+        'WORKER_URLS': ','.join(worker_urls),
+        'PORT': str(port),
+        'SOCKETIO_MESSAGE_QUEUE': message_queue
+    })
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serveur de jeu multi-worker')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--base-port', type=int, default=5000)
+    parser.add_argument('--public-host', default='localhost',
+                        help='hôte des URL de workers données aux clients')
+    parser.add_argument('--broker', help='URL Redis du message_queue (broker local sinon)')
+    parser.add_argument('--broker-port', type=int, default=6379)
+    args = parser.parse_args()
+
+    broker = None
+    message_queue = args.broker
+    if message_queue is None:
+        from resp_broker import start_broker
+        broker = start_broker(port=args.broker_port)
+        message_queue = f'redis://127.0.0.1:{args.broker_port}/0'
+        print(f"[INFO] Local RESP broker on port {args.broker_port}")
+
+    ports = [args.base_port + i for i in range(args.workers)]
+    worker_urls = [f'http://{args.public_host}:{port}' for port in ports]
+    workers = [
+        subprocess.Popen([sys.executable, 'app.py'], cwd=SERVER_DIR,
+                         env=worker_env(i, worker_urls, port, message_queue))
+        for i, port in enumerate(ports)
+    ]
+    print(f"[INFO] {args.workers} worker(s): {', '.join(worker_urls)}")
+
+    def stop(*_):
+        for worker in workers:
+            worker.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for worker in workers:
+            worker.wait()
+    except KeyboardInterrupt:
+        stop()
+        for worker in workers:
+            worker.wait()
+    finally:
+        if broker is not None:
+            broker.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,13 +3,49 @@ import sqlite3
 import os
 from datetime import datetime
 
+from db_pool import ConnectionPool
+from migrations import migrate
+from quiz_cache import QuizCache
+
 DB_PATH = 'quiz.db'
 
+# Un pool pour toute l'application : écritures (WAL) et lectures seules
+# des rapports et de la recherche
+pool = ConnectionPool(DB_PATH)
+read_pool = ConnectionPool(DB_PATH, readonly=True)
+
+# Quiz assemblés, relus à chaque création de room et GET /api/quizzes/<id>
+quiz_cache = QuizCache(int(os.environ.get('QUIZ_CACHE_SIZE', 128)),
+                       float(os.environ.get('QUIZ_CACHE_TTL', 600)))
+
 
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Connexion du pool ; conn.close() la rend au pool"""
+    return pool.acquire()
+
+
+def get_read_connection():
+    """Connexion en lecture seule (rapports, recherche), qui ne bloque pas les écritures"""
+    return read_pool.acquire()
+
+
+def connection():
+    """with connection() as conn : commit en sortie, rollback sur exception"""
+    return pool.connection()
+
+
+def read_connection():
+    return read_pool.connection()
+
+
+def use_database(path):
+    """Change de fichier de base (bancs d'essai, base jetable)"""
+    global DB_PATH
+    DB_PATH = path
+    for p in (pool, read_pool):
+        p.close_all()
+        p.path = path
+    quiz_cache.clear()
 
 
 def init_db():
@@ -135,6 +171,40 @@ def init_db():
     )
     ''')
 
+    # Journal append-only des événements de partie (écrit par lots pendant le jeu)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS game_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        game_id INTEGER NOT NULL,
+        room_code TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        type TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        FOREIGN KEY (game_id) REFERENCES games (id)
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_game_events_room_seq
+    ON game_events (room_code, seq)
+    ''')
+
+    # Instantanés compressés des rooms actives (réhydratation après redémarrage)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS room_snapshots (
+        room_code TEXT PRIMARY KEY,
+        payload BLOB NOT NULL,
+        updated_at REAL NOT NULL
+    )
+    ''')
+    conn.commit()
+
+    # Index et clés uniques ajoutés depuis : bases existantes mises à niveau sur place
+    applied = migrate(conn)
+    if applied:
+        print(f"[INFO] Schema migrated to version {applied[-1]}")
+    conn.close()
+
 
 def get_quizzes_by_user(user_id):
     conn = get_db_connection()
@@ -148,6 +218,12 @@ def get_quizzes_by_user(user_id):
     return [dict(quiz) for quiz in quizzes]
 
 
+def _copy_quiz(quiz):
+    """Copie rendue à l'appelant : le quiz et ses questions peuvent être modifiés,
+    les dictionnaires d'image restent partagés avec le cache"""
+    return {**quiz, 'questions': [dict(q) for q in quiz['questions']]}
+
+
 def get_quiz_by_id(quiz_id):
     conn = get_db_connection()
     quiz = conn.execute('''
@@ -157,6 +233,12 @@ def get_quiz_by_id(quiz_id):
     ''', (quiz_id,)).fetchone()
 
     if quiz:
+        # Seule la ligne du quiz (clé primaire) est relue si la version en cache est à jour
+        cached = quiz_cache.get(quiz_id, quiz['updated_at'])
+        if cached is not None:
+            conn.close()
+            return _copy_quiz(cached)
+
         quiz_dict = dict(quiz)
         questions = conn.execute('''
         SELECT q.id, q.question, q.option_a, q.option_b, q.option_c, q.option_d, 
@@ -164,7 +246,8 @@ def get_quiz_by_id(quiz_id):
                u.id as unsplash_id, u.regular_url, u.thumb_url, u.author_name, u.author_url
         FROM questions q
         LEFT JOIN unsplash_photos u ON q.id = u.question_id
-        WHERE q.quiz_id = ?
+        WHERE q.quiz_id = ? AND q.archived = 0
+        ORDER BY q.position, q.id
         ''', (quiz_id,)).fetchall()
 
         quiz_dict['questions'] = []
@@ -197,7 +280,8 @@ def get_quiz_by_id(quiz_id):
             quiz_dict['questions'].append(question)
 
         conn.close()
-        return quiz_dict
+        quiz_cache.put(quiz_id, quiz_dict['updated_at'], quiz_dict)
+        return _copy_quiz(quiz_dict)
 
     conn.close()
     return None
@@ -214,13 +298,13 @@ def create_quiz(title, description, user_id, questions):
         ''', (title, description, user_id))
         quiz_id = cursor.lastrowid
 
-        for q in questions:
+        for position, q in enumerate(questions):
             # Insert the question
             cursor.execute('''
             INSERT INTO questions 
             (quiz_id, question, option_a, option_b, option_c, option_d, 
-             correct_answer, time_limit, points, type, image_url, image_source)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+             correct_answer, time_limit, points, type, image_url, image_source, position)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 quiz_id,
                 q['question'],
@@ -234,7 +318,8 @@ def create_quiz(title, description, user_id, questions):
                 q['type'],
                 q.get('image', {}).get('urls', {}).get('regular') if q.get('image', {}).get(
                     'source') == 'unsplash' else q.get('image', {}).get('path'),
-                q.get('image', {}).get('source', 'none')
+                q.get('image', {}).get('source', 'none'),
+                position
             ))
 
             question_id = cursor.lastrowid
@@ -280,75 +365,125 @@ def extract_image_info(q):
     return None, "none"
 
 
+# Colonnes comparées pour décider si une question a changé
+QUESTION_FIELDS = ('question', 'option_a', 'option_b', 'option_c', 'option_d',
+                   'correct_answer', 'time_limit', 'points', 'type',
+                   'image_url', 'image_source', 'position')
+
+
+def _question_row(q, position):
+    option_c = q.get('option_c') if q['type'] == 'qcm' else None
+    option_d = q.get('option_d') if q['type'] == 'qcm' else None
+    image_url, image_source = extract_image_info(q)
+    return {
+        'question': q['question'],
+        'option_a': q.get('option_a'),
+        'option_b': q.get('option_b'),
+        'option_c': option_c,
+        'option_d': option_d,
+        'correct_answer': q.get('correct_answer'),
+        'time_limit': q.get('time_limit', 15),
+        'points': q.get('points', 10),
+        'type': q['type'],
+        'image_url': image_url,
+        'image_source': image_source,
+        'position': position
+    }
+
+
+def _insert_unsplash(cursor, question_id, q):
+    unsplash_data = q.get('image', {})
+    try:
+        cursor.execute('''
+            INSERT INTO unsplash_photos 
+            (id, question_id, regular_url, thumb_url, author_name, author_url)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (
+            unsplash_data.get('id'),
+            question_id,
+            unsplash_data.get('urls', {}).get('regular'),
+            unsplash_data.get('urls', {}).get('thumb'),
+            unsplash_data.get('user', {}).get('name'),
+            unsplash_data.get('user', {}).get('links', {}).get(
+                'html') if unsplash_data.get('user', {}).get('links') else None
+        ))
+    except KeyError as e:
+        print(f"Warning: Missing Unsplash metadata - {e}")
+
+
 def update_quiz(quiz_id, title, description, questions):
+    """Applique les différences entre le quiz en base et la version éditée.
 
+    Les questions sont rapprochées par id : seules les lignes modifiées
+    sont réécrites, les nouvelles insérées à leur position. Une question
+    retirée qui a déjà des réponses est archivée (les rapports des parties
+    passées la retrouvent), sinon supprimée. Le tout en une transaction.
+    """
     conn = get_db_connection()
     cursor = conn.cursor()
 
     try:
-        # Update quiz metadata
+        existing = {row['id']: dict(row) for row in cursor.execute(f'''
+            SELECT id, {', '.join(QUESTION_FIELDS)}
+            FROM questions
+            WHERE quiz_id = ? AND archived = 0
+        ''', (quiz_id,))}
+
+        kept = set()
+        changed = False
+        for position, q in enumerate(questions):
+            row = _question_row(q, position)
+            try:
+                question_id = int(q.get('id'))
+            except (TypeError, ValueError):
+                question_id = None
+
+            if question_id in existing and question_id not in kept:
+                kept.add(question_id)
+                old = existing[question_id]
+                updates = {field: value for field, value in row.items() if old[field] != value}
+                if not updates:
+                    continue
+                changed = True
+                cursor.execute(
+                    f"UPDATE questions SET {', '.join(f'{field} = ?' for field in updates)} WHERE id = ?",
+                    (*updates.values(), question_id))
+                if 'image_url' in updates or 'image_source' in updates:
+                    cursor.execute(
+                        'DELETE FROM unsplash_photos WHERE question_id = ?', (question_id,))
+                    if row['image_source'] == 'unsplash':
+                        _insert_unsplash(cursor, question_id, q)
+            else:
+                changed = True
+                cursor.execute(f'''
+                    INSERT INTO questions (quiz_id, {', '.join(QUESTION_FIELDS)})
+                    VALUES (?, {', '.join('?' * len(QUESTION_FIELDS))})
+                ''', (quiz_id, *row.values()))
+                if row['image_source'] == 'unsplash':
+                    _insert_unsplash(cursor, cursor.lastrowid, q)
+
+        removed = [question_id for question_id in existing if question_id not in kept]
+        if removed:
+            changed = True
+            placeholders = ','.join('?' * len(removed))
+            answered = {row[0] for row in cursor.execute(
+                f'SELECT DISTINCT question_id FROM answers WHERE question_id IN ({placeholders})',
+                removed)}
+            cursor.executemany('UPDATE questions SET archived = 1 WHERE id = ?',
+                               [(question_id,) for question_id in answered])
+            deleted = [(question_id,) for question_id in removed if question_id not in answered]
+            cursor.executemany('DELETE FROM unsplash_photos WHERE question_id = ?', deleted)
+            cursor.executemany('DELETE FROM questions WHERE id = ?', deleted)
+
+        # updated_at versionne aussi le quiz dans le cache des autres processus
         cursor.execute('''
         UPDATE quizzes
         SET title = ?, description = ?, updated_at = CURRENT_TIMESTAMP
-        WHERE id = ?
-        ''', (title, description, quiz_id))
-
-        # Delete old questions and associated unsplash photos
-        cursor.execute(
-            'DELETE FROM unsplash_photos WHERE question_id IN (SELECT id FROM questions WHERE quiz_id = ?)', (quiz_id,))
-        cursor.execute('DELETE FROM questions WHERE quiz_id = ?', (quiz_id,))
-
-        # Insert new questions
-        for q in questions:
-            option_a = q.get('option_a')
-            option_b = q.get('option_b')
-            option_c = q.get('option_c') if q['type'] == 'qcm' else None
-            option_d = q.get('option_d') if q['type'] == 'qcm' else None
-            image_url, image_source = extract_image_info(q)
-
-            cursor.execute('''
-                INSERT INTO questions 
-                (quiz_id, question, option_a, option_b, option_c, option_d, 
-                correct_answer, time_limit, points, type, image_url, image_source)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                quiz_id,
-                q['question'],
-                option_a,
-                option_b,
-                option_c,
-                option_d,
-                q.get('correct_answer'),
-                q.get('time_limit', 15),
-                q.get('points', 10),
-                q['type'],
-                image_url,
-                image_source
-            ))
-
-            question_id = cursor.lastrowid
-
-            if image_source == 'unsplash':
-                unsplash_data = q.get('image', {})
-                try:
-                    cursor.execute('''
-                        INSERT INTO unsplash_photos 
-                        (id, question_id, regular_url, thumb_url, author_name, author_url)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (
-                        unsplash_data.get('id'),
-                        question_id,
-                        unsplash_data.get('urls', {}).get('regular'),
-                        unsplash_data.get('urls', {}).get('thumb'),
-                        unsplash_data.get('user', {}).get('name'),
-                        unsplash_data.get('user', {}).get('links', {}).get(
-                            'html') if unsplash_data.get('user', {}).get('links') else None
-                    ))
-                except KeyError as e:
-                    print(f"Warning: Missing Unsplash metadata - {e}")
-                    continue
+        WHERE id = ? AND (title IS NOT ? OR description IS NOT ? OR ?)
+        ''', (title, description, quiz_id, title, description, changed))
 
         conn.commit()
+        quiz_cache.invalidate(quiz_id)
         return True
 
     except Exception as e:
@@ -367,6 +502,7 @@ def delete_quiz(quiz_id):
 
     conn.commit()
     conn.close()
+    quiz_cache.invalidate(quiz_id)
     return True
 
 
@@ -450,3 +586,137 @@ def get_game_players(game_id):
     players = [dict(row) for row in cursor.fetchall()]
     conn.close()
     return players
+
+
+def _user_ids_by_username(cursor, usernames, chunk_size=500):
+    """Résout tous les ids utilisateurs en une requête (par paquets de 500 paramètres)"""
+    user_ids = {}
+    usernames = list(usernames)
+    for i in range(0, len(usernames), chunk_size):
+        chunk = usernames[i:i + chunk_size]
+        placeholders = ','.join('?' * len(chunk))
+        rows = cursor.execute(
+            f'SELECT id, username FROM users WHERE username IN ({placeholders})', chunk).fetchall()
+        user_ids.update({row[1]: row[0] for row in rows})
+    return user_ids
+
+
+# Comptes par question d'une partie en une agrégation (hôte exclu), via
+# l'index unique (game_id, question_id, user_id) de answers
+QUESTION_STATS_QUERY = '''
+    SELECT a.question_id,
+           COUNT(*) AS total_answers,
+           SUM(CASE WHEN a.is_correct THEN 1 ELSE 0 END) AS correct_count,
+           SUM(CASE WHEN NOT a.is_correct THEN 1 ELSE 0 END) AS incorrect_count
+    FROM answers a
+    WHERE a.game_id = ? AND a.user_id != (SELECT host_id FROM games WHERE id = ?)
+    GROUP BY a.question_id
+'''
+
+
+def store_game_question_stats(cursor, game_id):
+    """Fige dans game_question_stats les comptes par question de la partie"""
+    cursor.execute(f'''
+        INSERT INTO game_question_stats
+            (game_id, question_id, total_answers, correct_count, incorrect_count)
+        SELECT ?, question_id, total_answers, correct_count, incorrect_count
+        FROM ({QUESTION_STATS_QUERY})
+        WHERE true
+        ON CONFLICT (game_id, question_id) DO UPDATE SET
+            total_answers = excluded.total_answers,
+            correct_count = excluded.correct_count,
+            incorrect_count = excluded.incorrect_count
+    ''', (game_id, game_id, game_id))
+
+
+def get_game_question_stats(cursor, game_id):
+    """{question_id: comptes} : table figée en fin de partie, sinon une seule agrégation"""
+    rows = cursor.execute('''
+        SELECT question_id, total_answers, correct_count, incorrect_count
+        FROM game_question_stats
+        WHERE game_id = ?
+    ''', (game_id,)).fetchall()
+    if not rows:
+        rows = cursor.execute(QUESTION_STATS_QUERY, (game_id, game_id)).fetchall()
+    return {row['question_id']: dict(row) for row in rows}
+
+
+def save_game_results(game_id, results):
+    """Enregistre les scores et réponses finales d'une partie en une transaction.
+
+    results : liste de (username, score, [(question_id, answer_text, is_correct), ...])
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        user_ids = _user_ids_by_username(
+            cursor, {username for username, _, _ in results})
+
+        player_rows = []
+        answer_rows = []
+        for username, score, answers in results:
+            user_id = user_ids.get(username)
+            if user_id is None:
+                continue
+            player_rows.append((game_id, user_id, score))
+            answer_rows.extend(
+                (game_id, question_id, user_id, answer_text, is_correct)
+                for question_id, answer_text, is_correct in answers)
+
+        # Clés uniques (migration 1) : score mis à jour, première réponse conservée
+        cursor.executemany('''
+            INSERT INTO game_players (game_id, user_id, score)
+            VALUES (?, ?, ?)
+            ON CONFLICT (game_id, user_id) DO UPDATE SET score = excluded.score
+        ''', player_rows)
+        before = conn.total_changes
+        cursor.executemany('''
+            INSERT INTO answers (game_id, question_id, user_id, answer_text, is_correct)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (game_id, question_id, user_id) DO NOTHING
+        ''', answer_rows)
+        inserted = conn.total_changes - before
+        store_game_question_stats(cursor, game_id)
+
+        conn.commit()
+        return inserted
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        conn.close()
+
+
+def admit_players(entries):
+    """Inscrit en une transaction un lot de joueurs [(game_id, username), ...].
+
+    Crée les utilisateurs temporaires manquants puis les lignes game_players
+    absentes. Retourne le nombre d'inscriptions créées.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        usernames = {username for _, username in entries}
+        cursor.executemany('''
+            INSERT INTO users (username, password) VALUES (?, 'anonymous')
+            ON CONFLICT (username) DO NOTHING
+        ''', [(username,) for username in usernames])
+        user_ids = _user_ids_by_username(cursor, usernames)
+
+        before = conn.total_changes
+        cursor.executemany('''
+            INSERT INTO game_players (game_id, user_id, score)
+            VALUES (?, ?, 0)
+            ON CONFLICT (game_id, user_id) DO NOTHING
+        ''', {(game_id, user_ids[username]) for game_id, username in entries})
+        admitted = conn.total_changes - before
+
+        conn.commit()
+        return admitted
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        conn.close()
@@ -0,0 +1,113 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Réglages appliqués à chaque nouvelle connexion
+PRAGMAS = (
+    'PRAGMA synchronous=NORMAL',    # suffisant en WAL : pas de fsync à chaque commit
+    'PRAGMA cache_size=-16000',     # ~16 Mo de cache de pages par connexion
+    'PRAGMA mmap_size=268435456',   # lectures par mmap (256 Mo)
+    'PRAGMA temp_store=MEMORY'
+)
+
+
+class PooledConnection(sqlite3.Connection):
+    """Connexion SQLite qui retourne dans son pool au lieu de se fermer.
+
+    Les appels existants (conn = get_db_connection() ... conn.close())
+    profitent ainsi du pool sans changement ; une transaction laissée
+    ouverte est annulée avant la remise en pool.
+    """
+
+    pool = None
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+    def discard(self):
+        super().close()
+
+
+class ConnectionPool:
+    """Connexions SQLite réutilisées entre requêtes et tâches.
+
+    Une connexion n'est utilisée que par une tâche à la fois (sortie du
+    pool, puis rendue) ; jusqu'à max_idle connexions restent ouvertes avec
+    leur cache de pages et de requêtes préparées. En lecture seule, la
+    base est ouverte en mode ro et query_only : en WAL, ces lectures
+    (rapports, recherche) ne bloquent pas les écritures de partie.
+    """
+
+    def __init__(self, path, readonly=False, max_idle=8, busy_timeout=5.0):
+        self.path = path
+        self.readonly = readonly
+        self.max_idle = max_idle
+        self.busy_timeout = busy_timeout
+        self.opened = 0
+        self.reused = 0
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self.readonly:
+            conn = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True,
+                                   timeout=self.busy_timeout, factory=PooledConnection,
+                                   check_same_thread=False, cached_statements=256)
+            conn.execute('PRAGMA query_only=1')
+        else:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                   factory=PooledConnection,
+                                   check_same_thread=False, cached_statements=256)
+            conn.execute('PRAGMA journal_mode=WAL')
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        conn.row_factory = sqlite3.Row
+        conn.pool = self
+        self.opened += 1
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                self.reused += 1
+                return self._idle.pop()
+        return self._open()
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = sqlite3.Row
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.discard()
+
+    @contextmanager
+    def connection(self):
+        """with pool.connection() as conn : commit en sortie, rollback sur exception"""
+        conn = self.acquire()
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.discard()
+
+    def stats(self):
+        with self._lock:
+            idle = len(self._idle)
+        return {'opened': self.opened, 'reused': self.reused, 'idle': idle}
@@ -0,0 +1,57 @@
+import numpy as np
+
+from player_state import NO_ANSWER
+
+
+class QuestionWindow:
+    """Réponses d'une question en mode de score différé (SCORING_MODE=deferred).
+
+    Pendant la question, une réponse ne coûte que deux écritures dans des
+    tableaux NumPy préalloués, indexés par le slot du joueur. Les points de
+    tous les joueurs sont calculés en une passe vectorisée à la clôture
+    (time_up ou question suivante), avec la même formule que le score
+    immédiat. La fenêtre fait partie de la room sauvegardée (to_dict) :
+    les réponses en attente survivent à une restauration.
+    """
+
+    def __init__(self, question_index, capacity=64):
+        self.question_index = question_index
+        self.choices = np.full(max(capacity, 1), NO_ANSWER, dtype=np.int8)
+        self.elapsed = np.zeros(max(capacity, 1), dtype=np.float64)
+
+    def _grow(self, slot):
+        size = len(self.choices)
+        while size <= slot:
+            size *= 2
+        choices = np.full(size, NO_ANSWER, dtype=np.int8)
+        choices[:len(self.choices)] = self.choices
+        elapsed = np.zeros(size, dtype=np.float64)
+        elapsed[:len(self.elapsed)] = self.elapsed
+        self.choices, self.elapsed = choices, elapsed
+
+    def record(self, slot, choice, elapsed):
+        if slot >= len(self.choices):
+            self._grow(slot)
+        self.choices[slot] = choice
+        self.elapsed[slot] = elapsed
+
+    def to_dict(self):
+        return {'question_index': self.question_index,
+                'choices': self.choices.tolist(), 'elapsed': self.elapsed.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        window = cls(data['question_index'], capacity=len(data['choices']))
+        window.choices[:] = data['choices']
+        window.elapsed[:] = data['elapsed']
+        return window
+
+    def score(self, correct_index, points, time_limit, bonus_coeff=1.0):
+        """Points de chaque slot (0 sans réponse ou réponse fausse) et masque des bonnes réponses"""
+        if correct_index is None:
+            correct = np.zeros(len(self.choices), dtype=bool)
+        else:
+            correct = self.choices == correct_index
+        time_left = np.clip(time_limit - self.elapsed, 0, None)
+        awarded = np.rint(points * (1 + time_left / time_limit * bonus_coeff))
+        return np.where(correct, awarded, 0).astype(np.int64), correct
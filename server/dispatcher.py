@@ -0,0 +1,86 @@
+import functools
+import threading
+
+
+class OutboundDispatcher:
+    """Regroupe les événements sortants d'une room en une trame par tick.
+
+    push() met un événement en attente pour une room Socket.IO (la room de
+    jeu ou la sous-room de l'hôte) ; flush() envoie, pour chaque room, un
+    seul événement 'batch' {'events': [[event, data], ...]}. Avec
+    replace=True, l'événement remplace celui du même nom déjà en attente
+    (seul le dernier état compte : classement, histogramme). data peut être
+    une fonction sans argument, évaluée une seule fois au moment de l'envoi.
+
+    defer(room, send), si fourni, confie l'envoi de chaque trame au
+    propriétaire de la room (son acteur) : les fonctions qui lisent et
+    vident l'état de la room (deltas du classement, décompte) ne
+    s'exécutent alors jamais dans la tâche du dispatcher.
+    """
+
+    def __init__(self, emit, interval=0.1, defer=None):
+        self.emit = emit  # emit(event, data, to=room), ex. socketio.emit
+        self.interval = interval
+        self.defer = defer
+        self.frames_sent = 0
+        self.events_sent = 0
+        self._buffers = {}   # room -> [[event, data], ...]
+        self._replaced = {}  # room -> {event: index dans le buffer}
+        self._lock = threading.Lock()
+
+    def push(self, room, event, data, replace=False):
+        with self._lock:
+            events = self._buffers.setdefault(room, [])
+            if replace:
+                slots = self._replaced.setdefault(room, {})
+                index = slots.get(event)
+                if index is not None:
+                    events[index][1] = data
+                    return
+                slots[event] = len(events)
+            events.append([event, data])
+
+    def discard(self, room):
+        with self._lock:
+            self._buffers.pop(room, None)
+            self._replaced.pop(room, None)
+
+    def flush(self, room=None):
+        """Envoie les trames en attente (d'une seule room si précisée)"""
+        with self._lock:
+            if room is None:
+                buffers, self._buffers, self._replaced = self._buffers, {}, {}
+            else:
+                self._replaced.pop(room, None)
+                events = self._buffers.pop(room, None)
+                buffers = {room: events} if events else {}
+
+        for target, events in buffers.items():
+            if self.defer is None:
+                self._send(target, events)
+            else:
+                self.defer(target, functools.partial(self._send, target, events))
+        return len(buffers)
+
+    def _send(self, target, events):
+        self.emit('batch', {'events': [
+            [event, data() if callable(data) else data] for event, data in events
+        ]}, to=target)
+        self.frames_sent += 1
+        self.events_sent += len(events)
+
+    def stats(self):
+        return {
+            'frames_sent': self.frames_sent,
+            'events_sent': self.events_sent,
+            'pending_rooms': len(self._buffers)
+        }
+
+    def run(self, sleep):
+        """Boucle de fond : sleep est socketio.sleep pour rester coopératif"""
+        while True:
+            sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing outbound events: {str(e)}")
@@ -0,0 +1,187 @@
+import json
+import threading
+import time
+
+from player_state import AnswerBitmap, add_player, rekey_player, remove_player
+
+
+class GameEventLog:
+    """Journal append-only des événements d'une partie.
+
+    Chaque entrée est (seq, horodatage, type, payload). Les entrées ne sont
+    gardées en mémoire que jusqu'à leur écriture en base, par lots, par
+    EventLogWriter ; la room se rejoue ensuite depuis game_events.
+    """
+
+    def __init__(self, room_code, game_id, start_seq=0):
+        self.room_code = room_code
+        self.game_id = game_id
+        self.events = []
+        self.closed = False
+        self._next_seq = start_seq
+
+    def append(self, event_type, **payload):
+        seq = self._next_seq
+        self._next_seq += 1
+        self.events.append((seq, time.time(), event_type, payload))
+        return seq
+
+    def pending(self):
+        return self.events[:]
+
+    def mark_flushed(self, count):
+        # Seules des entrées ont pu s'ajouter en fin de liste pendant l'écriture
+        del self.events[:count]
+
+
+class EventLogWriter:
+    """Écrit les journaux de toutes les rooms dans SQLite par transactions groupées"""
+
+    def __init__(self, connect, interval=0.25):
+        self.connect = connect
+        self.interval = interval
+        self.logs = {}
+        self._lock = threading.Lock()
+
+    def open(self, room_code, game_id, start_seq=0):
+        log = GameEventLog(room_code, game_id, start_seq)
+        self.logs[room_code] = log
+        return log
+
+    def get(self, room_code):
+        return self.logs.get(room_code)
+
+    def close(self, room_code):
+        """Le journal sera retiré une fois ses dernières entrées écrites"""
+        log = self.logs.get(room_code)
+        if log is not None:
+            log.closed = True
+
+    def flush(self):
+        with self._lock:
+            batch = []
+            rows = []
+            for log in list(self.logs.values()):
+                pending = log.pending()
+                if pending:
+                    batch.append((log, len(pending)))
+                    rows.extend(
+                        (log.game_id, log.room_code, seq, ts, event_type,
+                         json.dumps(payload, separators=(',', ':')))
+                        for seq, ts, event_type, payload in pending
+                    )
+
+            if rows:
+                conn = self.connect()
+                try:
+                    conn.executemany('''
+                        INSERT INTO game_events (game_id, room_code, seq, created_at, type, payload)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    ''', rows)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    conn.close()
+
+                for log, count in batch:
+                    log.mark_flushed(count)
+
+            for room_code, log in list(self.logs.items()):
+                if log.closed and not log.pending():
+                    self.logs.pop(room_code, None)
+
+            return len(rows)
+
+    def run(self, sleep):
+        """Boucle de fond : sleep est socketio.sleep pour rester coopératif"""
+        while True:
+            sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing game events: {str(e)}")
+
+
+def load_events(conn, room_code, since=0):
+    """Entrées d'une room déjà écrites en base à partir de since, dans l'ordre"""
+    rows = conn.execute('''
+        SELECT seq, created_at, type, payload
+        FROM game_events
+        WHERE room_code = ? AND seq >= ?
+        ORDER BY seq
+    ''', (room_code, since)).fetchall()
+    return [(row[0], row[1], row[2], json.loads(row[3])) for row in rows]
+
+
+def replay_events(events, room):
+    """Reconstruit joueurs, scores, réponses et progression à partir d'un journal.
+
+    room doit au moins contenir 'questions' (taille des vecteurs de réponses).
+    Rejouer une entrée déjà appliquée ne change rien (scores et réponses
+    sont des valeurs absolues, les arrivées et départs sont vérifiés).
+    """
+    room.setdefault('players', {})
+    room.setdefault('open_answers', {})
+    room.setdefault('answered', AnswerBitmap(len(room['questions'])))
+
+    for seq, ts, event_type, payload in events:
+        if event_type == 'join':
+            if payload['sid'] not in room['players']:
+                add_player(room, payload['sid'], payload['username'])
+            if payload.get('token'):
+                room.setdefault('sessions', {})[payload['token']] = payload['sid']
+        elif event_type == 'resume':
+            rekey_player(room, payload['old'], payload['sid'])
+            for token, sid in room.get('sessions', {}).items():
+                if sid == payload['old']:
+                    room['sessions'][token] = payload['sid']
+        elif event_type == 'leave':
+            remove_player(room, payload['sid'])
+        elif event_type == 'question':
+            room['current_question'] = payload['index']
+            room['asked_question'] = payload['index']
+            room['state'] = 'playing'
+            room['open_answers'][payload['index']] = {}
+        elif event_type == 'answer':
+            player = room['players'].get(payload['sid'])
+            if player is not None:
+                player.answers[payload['question']] = payload['answer']
+                room['answered'].mark(payload['question'], player.slot)
+        elif event_type == 'score':
+            player = room['players'].get(payload['sid'])
+            if player is not None:
+                player.score = payload['score']
+        elif event_type == 'open_answer':
+            room['open_answers'].setdefault(payload['question'], {}).setdefault(
+                payload['username'], {
+                    'username': payload['username'],
+                    'answer': payload['answer'],
+                    'timestamp': ts
+                })
+        elif event_type == 'open_grades':
+            by_user = room['open_answers'].get(payload['question'], {})
+            for username, (similarity, is_correct) in payload['grades'].items():
+                if username in by_user:
+                    by_user[username]['similarity'] = similarity
+                    by_user[username]['is_correct'] = is_correct
+        elif event_type == 'close':
+            room['closed_question'] = payload['question']
+        elif event_type == 'finish':
+            room['state'] = 'finished'
+
+    return room
+
+
+def replay_since_snapshot(conn, room_code, room):
+    """Applique à une room réhydratée les entrées écrites après son instantané.
+
+    room['log_seq'] est la position du journal au moment de l'instantané ;
+    retourne le nombre d'entrées rejouées.
+    """
+    events = load_events(conn, room_code, since=room.get('log_seq', 0))
+    if events:
+        replay_events(events, room)
+        room['log_seq'] = events[-1][0] + 1
+    return len(events)
@@ -0,0 +1,103 @@
+import threading
+
+
+class RosterDeltas:
+    """Arrivées et départs d'une room depuis le dernier envoi.
+
+    Un joueur arrivé puis reparti dans le même tick n'apparaît nulle part.
+    'welcome' contient les sockets (joueurs ou hôte) qui viennent d'entrer
+    et doivent recevoir la liste complète une fois.
+    """
+
+    __slots__ = ('added', 'removed', 'welcome')
+
+    def __init__(self):
+        self.added = {}      # sid -> None (ordre d'arrivée)
+        self.removed = set()
+        self.welcome = set()
+
+    def add(self, sid):
+        self.removed.discard(sid)
+        self.added[sid] = None
+
+    def remove(self, sid):
+        if sid in self.added:
+            del self.added[sid]
+        else:
+            self.removed.add(sid)
+        self.welcome.discard(sid)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.welcome)
+
+
+class JoinAdmission:
+    """Admission groupée des joueurs qui rejoignent une room.
+
+    Le joueur est ajouté à la room en mémoire tout de suite ; son inscription
+    en base (utilisateur temporaire, game_players) est mise en attente et
+    écrite avec toutes les autres en une transaction par tick. Les
+    arrivées/départs sont regroupés par room pour un seul player_joined
+    (delta) par tick au lieu de la liste complète à chaque arrivée.
+    """
+
+    def __init__(self, write, interval=0.1):
+        self.write = write  # write([(game_id, username), ...]) en une transaction
+        self.interval = interval
+        self._pending = []
+        self._deltas = {}
+        self._lock = threading.Lock()
+
+    def _room(self, room_code):
+        return self._deltas.setdefault(room_code, RosterDeltas())
+
+    def admit(self, room_code, game_id, sid, username):
+        with self._lock:
+            self._pending.append((game_id, username))
+            self._room(room_code).add(sid)
+
+    def greet(self, room_code, sid):
+        with self._lock:
+            self._room(room_code).welcome.add(sid)
+
+    def leave(self, room_code, sid):
+        with self._lock:
+            self._room(room_code).remove(sid)
+
+    def discard_room(self, room_code):
+        with self._lock:
+            self._deltas.pop(room_code, None)
+
+    def write_pending(self):
+        """Écrit toutes les inscriptions en attente en une transaction"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        try:
+            self.write(pending)
+        except Exception:
+            # Réessayées au prochain tick
+            with self._lock:
+                self._pending[:0] = pending
+            raise
+        return len(pending)
+
+    def take_deltas(self):
+        """Deltas non vides accumulés depuis le dernier appel, par room"""
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+        return {room_code: delta for room_code, delta in deltas.items() if delta}
+
+    def run(self, sleep, on_deltas):
+        """Boucle de fond : sleep est socketio.sleep pour rester coopératif"""
+        while True:
+            sleep(self.interval)
+            try:
+                self.write_pending()
+            except Exception as e:
+                print(f"Error admitting players: {str(e)}")
+            # Les joueurs sont déjà dans la room : le delta part même si l'écriture a échoué
+            deltas = self.take_deltas()
+            if deltas:
+                on_deltas(deltas)
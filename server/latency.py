@@ -0,0 +1,92 @@
+import statistics
+import threading
+import time
+from collections import deque
+
+
+class RttEstimator:
+    """Médiane glissante des derniers allers-retours (secondes) d'un socket"""
+
+    __slots__ = ('samples',)
+
+    def __init__(self, window=9):
+        self.samples = deque(maxlen=window)
+
+    def add(self, rtt):
+        self.samples.append(rtt)
+
+    def median(self):
+        return statistics.median(self.samples) if self.samples else None
+
+
+class LatencyTracker:
+    """Mesure le RTT de chaque socket par ping/pong applicatif.
+
+    ping(room_code) retourne le payload d'un rtt_ping diffusé à la room ;
+    le client le renvoie tel quel (rtt_pong). Seuls les identifiants de
+    ping réellement émis sont acceptés, un client ne peut donc que retarder
+    sa réponse : la compensation est plafonnée par max_compensation.
+    """
+
+    def __init__(self, window=9, max_compensation=0.5, clock=time.perf_counter):
+        self.window = window
+        self.max_compensation = max_compensation
+        self.clock = clock
+        self._estimators = {}  # sid -> RttEstimator
+        self._pings = {}       # room_code -> deque[(ping_id, envoyé_à)]
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def ping(self, room_code):
+        with self._lock:
+            ping_id = self._next_id
+            self._next_id += 1
+            self._pings.setdefault(room_code, deque(maxlen=4)).append(
+                (ping_id, self.clock()))
+        return {'id': ping_id}
+
+    def pong(self, sid, room_code, ping_id):
+        now = self.clock()
+        with self._lock:
+            for sent_id, sent_at in self._pings.get(room_code, ()):
+                if sent_id == ping_id:
+                    break
+            else:
+                return None
+            estimator = self._estimators.get(sid)
+            if estimator is None:
+                estimator = self._estimators[sid] = RttEstimator(self.window)
+            estimator.add(now - sent_at)
+        return now - sent_at
+
+    def rtt(self, sid):
+        estimator = self._estimators.get(sid)
+        return estimator.median() if estimator is not None else None
+
+    def compensation(self, sid):
+        """Temps réseau à retirer du temps de réponse : un trajet pour recevoir
+        la question, un pour renvoyer la réponse (soit le RTT), plafonné"""
+        rtt = self.rtt(sid)
+        if rtt is None:
+            return 0.0
+        return min(max(rtt, 0.0), self.max_compensation)
+
+    def forget(self, sid):
+        with self._lock:
+            self._estimators.pop(sid, None)
+
+    def forget_room(self, room_code):
+        with self._lock:
+            self._pings.pop(room_code, None)
+
+    def distribution(self, sids):
+        """Répartition (ms) des RTT médians des sockets donnés"""
+        rtts = sorted(rtt for rtt in (self.rtt(sid) for sid in sids) if rtt is not None)
+        if not rtts:
+            return {'measured': 0}
+        return {
+            'measured': len(rtts),
+            'p50_ms': round(rtts[len(rtts) // 2] * 1000, 1),
+            'p95_ms': round(rtts[min(len(rtts) - 1, int(len(rtts) * 0.95))] * 1000, 1),
+            'max_ms': round(rtts[-1] * 1000, 1)
+        }
@@ -0,0 +1,153 @@
+import time
+
+
+def _dedupe(cursor, table, columns):
+    """Garde la plus ancienne ligne de chaque groupe de doublons (avant un index UNIQUE)"""
+    cols = ', '.join(columns)
+    cursor.execute(f'''
+        DELETE FROM {table}
+        WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {cols})
+    ''')
+
+
+def _merge_duplicate_games(cursor):
+    """Une partie par room_code : les doublons sont rattachés à la plus ancienne"""
+    duplicates = cursor.execute('''
+        SELECT g.id, keep.id
+        FROM games g
+        JOIN (SELECT room_code, MIN(id) AS id FROM games GROUP BY room_code) keep
+          ON keep.room_code = g.room_code
+        WHERE g.id != keep.id
+    ''').fetchall()
+    for table in ('game_players', 'answers', 'game_events'):
+        cursor.executemany(f'UPDATE {table} SET game_id = ? WHERE game_id = ?',
+                           [(keep_id, game_id) for game_id, keep_id in duplicates])
+    cursor.executemany('DELETE FROM games WHERE id = ?',
+                       [(game_id,) for game_id, _ in duplicates])
+
+
+def _v1_hot_path_indexes(cursor):
+    # Clés uniques des upserts (ON CONFLICT) : doublons éventuels supprimés d'abord
+    _merge_duplicate_games(cursor)
+    _dedupe(cursor, 'game_players', ('game_id', 'user_id'))
+    _dedupe(cursor, 'answers', ('game_id', 'question_id', 'user_id'))
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS uq_games_room_code ON games (room_code)')
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_game_players_game_user
+        ON game_players (game_id, user_id)
+    ''')
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_answers_game_question_user
+        ON answers (game_id, question_id, user_id)
+    ''')
+    # Parcours par quiz, par utilisateur et par question
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_questions_quiz ON questions (quiz_id)')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_quizzes_user_updated
+        ON quizzes (user_id, updated_at)
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_game_players_user ON game_players (user_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_games_host ON games (host_id)')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_unsplash_photos_question
+        ON unsplash_photos (question_id)
+    ''')
+
+
+def _v2_question_positions(cursor):
+    # Ordre explicite des questions et archivage de celles déjà jouées :
+    # update_quiz ne réécrit plus un quiz entier à chaque modification
+    cursor.execute('ALTER TABLE questions ADD COLUMN position INTEGER')
+    cursor.execute('ALTER TABLE questions ADD COLUMN archived INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('''
+        UPDATE questions SET position = (
+            SELECT COUNT(*) FROM questions q2
+            WHERE q2.quiz_id = questions.quiz_id AND q2.id < questions.id)
+    ''')
+    cursor.execute('DROP INDEX IF EXISTS idx_questions_quiz')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_questions_quiz_position
+        ON questions (quiz_id, archived, position)
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_answers_question ON answers (question_id)')
+
+
+def _v3_game_question_stats(cursor):
+    # Statistiques par question figées en fin de partie (rapport sans agrégation)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS game_question_stats (
+        game_id INTEGER NOT NULL,
+        question_id INTEGER NOT NULL,
+        total_answers INTEGER NOT NULL,
+        correct_count INTEGER NOT NULL,
+        incorrect_count INTEGER NOT NULL,
+        PRIMARY KEY (game_id, question_id)
+    ) WITHOUT ROWID
+    ''')
+    # Parties déjà jouées : mêmes comptes que le rapport (hôte exclu)
+    cursor.execute('''
+        INSERT OR IGNORE INTO game_question_stats
+            (game_id, question_id, total_answers, correct_count, incorrect_count)
+        SELECT a.game_id, a.question_id, COUNT(*),
+               SUM(CASE WHEN a.is_correct THEN 1 ELSE 0 END),
+               SUM(CASE WHEN NOT a.is_correct THEN 1 ELSE 0 END)
+        FROM answers a
+        JOIN games g ON g.id = a.game_id
+        WHERE a.user_id != g.host_id
+        GROUP BY a.game_id, a.question_id
+    ''')
+
+
+# (version, description, fonction(cursor)) ; ne jamais modifier une migration publiée,
+# en ajouter une nouvelle à la suite
+MIGRATIONS = (
+    (1, 'hot-path indexes and unique keys for upserts', _v1_hot_path_indexes),
+    (2, 'question positions and archiving', _v2_question_positions),
+    (3, 'materialized per-question game stats', _v3_game_question_stats),
+)
+
+
+def schema_version(conn):
+    row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    return row[0] or 0
+
+
+def migrate(conn):
+    """Applique les migrations manquantes, chacune dans sa transaction.
+
+    Met à niveau une base existante sur place ; retourne la liste des
+    versions appliquées.
+    """
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at REAL NOT NULL
+    )
+    ''')
+    conn.commit()
+
+    applied = []
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # transactions explicites, DDL compris
+    try:
+        for version, description, upgrade in MIGRATIONS:
+            cursor = conn.cursor()
+            # IMMEDIATE : un seul processus (worker) applique une migration donnée
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                if schema_version(conn) >= version:
+                    cursor.execute('ROLLBACK')
+                    continue
+                upgrade(cursor)
+                cursor.execute(
+                    'INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)',
+                    (version, description, time.time()))
+                cursor.execute('COMMIT')
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+            applied.append(version)
+    finally:
+        conn.isolation_level = isolation_level
+    return applied
@@ -0,0 +1,70 @@
+import re
+import unicodedata
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_answer(text):
+    """Clé de regroupement : sans casse, accents, ponctuation ni espaces superflus"""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = _PUNCTUATION.sub(' ', text.casefold())
+    return _SPACES.sub(' ', text).strip()
+
+
+class OpenAnswerTally:
+    """Réponses distinctes d'une question ouverte et leur nombre.
+
+    Chaque réponse est rangée sous sa forme normalisée ; la première
+    orthographe reçue sert à l'affichage. take_changes() ne rend que les
+    réponses modifiées depuis le dernier envoi à l'hôte.
+    """
+
+    def __init__(self, question_index):
+        self.question_index = question_index
+        self.total = 0
+        self.entries = {}  # clé normalisée -> [réponse affichée, nombre]
+        self._changed = set()
+
+    def add(self, answer):
+        key = normalize_answer(answer)
+        if not key:
+            return None
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = [answer, 0]
+        entry[1] += 1
+        self.total += 1
+        self._changed.add(key)
+        return key
+
+    def take_changes(self):
+        """Payload open_answer_tally des réponses modifiées (à envoyer à l'hôte)"""
+        changed, self._changed = self._changed, set()
+        return {
+            'question_index': self.question_index,
+            'total': self.total,
+            'answers': [{'key': key, 'answer': self.entries[key][0],
+                         'count': self.entries[key][1]} for key in changed]
+        }
+
+    def snapshot(self):
+        """Payload complet, pour un hôte qui (re)demande l'état de la question"""
+        return {
+            'question_index': self.question_index,
+            'total': self.total,
+            'answers': [{'key': key, 'answer': answer, 'count': count}
+                        for key, (answer, count) in self.entries.items()]
+        }
+
+
+def tally_for(room, question_index):
+    """Décompte de la question, reconstruit depuis room['open_answers'] si
+    absent (room restaurée ou rejouée : '_open_tally' n'est pas sauvegardé)"""
+    tally = room.get('_open_tally')
+    if tally is None or tally.question_index != question_index:
+        tally = room['_open_tally'] = OpenAnswerTally(question_index)
+        for entry in room.get('open_answers', {}).get(question_index, {}).values():
+            tally.add(entry['answer'])
+    return tally
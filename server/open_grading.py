@@ -0,0 +1,60 @@
+import numpy as np
+
+
+class OpenGrades:
+    """Notes d'une question ouverte : similarité de chaque réponse à la
+    réponse de référence, verdict et groupes de quasi-doublons"""
+
+    __slots__ = ('similarities', 'correct', 'clusters')
+
+    def __init__(self, similarities, correct, clusters):
+        self.similarities = similarities
+        self.correct = correct
+        self.clusters = clusters
+
+
+def cluster_duplicates(pairwise, threshold):
+    """Groupes d'indices dont la similarité au premier membre dépasse threshold.
+
+    Glouton dans l'ordre d'arrivée : chaque réponse non encore groupée ouvre
+    un groupe et y attire, en une comparaison vectorisée, toutes les réponses
+    restantes assez proches d'elle.
+    """
+    assigned = np.zeros(len(pairwise), dtype=bool)
+    clusters = []
+    for i in range(len(pairwise)):
+        if assigned[i]:
+            continue
+        members = np.flatnonzero((pairwise[i] >= threshold) & ~assigned)
+        members = members if i in members else np.append(i, members)
+        assigned[members] = True
+        clusters.append([int(m) for m in members])
+    return clusters
+
+
+def grade_answers(model, reference, answers, threshold=0.7, duplicate_threshold=0.9):
+    """Note toutes les réponses d'une question en un seul appel à model.encode.
+
+    Les embeddings normalisés de la référence et des réponses sortent d'un
+    même lot ; les similarités cosinus sont alors de simples produits
+    matriciels. Sans référence, seuls les groupes sont calculés
+    (similarities et correct valent None).
+    """
+    if not answers:
+        return OpenGrades([], [], [])
+
+    texts = list(answers) if reference is None else [reference] + list(answers)
+    embeddings = model.encode(texts, batch_size=64, convert_to_numpy=True,
+                              normalize_embeddings=True, show_progress_bar=False)
+    if reference is not None:
+        reference_vec, embeddings = embeddings[0], embeddings[1:]
+        similarities = embeddings @ reference_vec
+        correct = similarities >= threshold
+    else:
+        similarities = correct = None
+
+    clusters = cluster_duplicates(embeddings @ embeddings.T, duplicate_threshold)
+    return OpenGrades(
+        None if similarities is None else [round(float(s), 4) for s in similarities],
+        None if correct is None else [bool(c) for c in correct],
+        clusters)
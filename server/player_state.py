@@ -0,0 +1,112 @@
+from array import array
+
+NO_ANSWER = -1
+
+
+class PlayerRecord:
+    """État compact d'un joueur dans une room.
+
+    Les réponses sont un vecteur array('b') de taille fixe (une case par
+    question, NO_ANSWER par défaut) au lieu d'un dict par joueur ; 'slot' est
+    la position du joueur dans les bitmaps de l'AnswerBitmap de la room.
+    """
+
+    __slots__ = ('slot', 'username', 'score', 'answers', 'is_host')
+
+    def __init__(self, slot, username, question_count, score=0, is_host=False):
+        self.slot = slot
+        self.username = username
+        self.score = score
+        self.answers = array('b', [NO_ANSWER]) * question_count
+        self.is_host = is_host
+
+    def to_dict(self):
+        return {
+            'slot': self.slot,
+            'username': self.username,
+            'score': self.score,
+            'answers': self.answers.tolist(),
+            'is_host': self.is_host
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        player = cls(data['slot'], data['username'], 0,
+                     score=data['score'], is_host=data.get('is_host', False))
+        player.answers = array('b', data['answers'])
+        return player
+
+
+class AnswerBitmap:
+    """Qui a répondu à quoi : un entier Python (bitset) par question.
+
+    Le bit 'slot' d'une question est à 1 quand le joueur de ce slot a
+    répondu ; 'members' a un bit par joueur présent. Rejeter une réponse en
+    double ou compter les absents ne demande qu'une opération de bits.
+    """
+
+    def __init__(self, question_count):
+        self.bits = [0] * question_count
+        self.members = 0
+        self.next_slot = 0
+
+    def add_member(self):
+        slot = self.next_slot
+        self.next_slot += 1
+        self.members |= 1 << slot
+        return slot
+
+    def remove_member(self, slot):
+        self.members &= ~(1 << slot)
+
+    def mark(self, question_index, slot):
+        """Marque la réponse ; False si le joueur avait déjà répondu"""
+        mask = 1 << slot
+        if self.bits[question_index] & mask:
+            return False
+        self.bits[question_index] |= mask
+        return True
+
+    def has_answered(self, question_index, slot):
+        return bool(self.bits[question_index] & (1 << slot))
+
+    def unanswered(self, question_index):
+        """Bitset des joueurs présents qui n'ont pas répondu"""
+        return self.members & ~self.bits[question_index]
+
+    def unanswered_count(self, question_index):
+        return self.unanswered(question_index).bit_count()
+
+    def to_dict(self):
+        return {'bits': self.bits, 'members': self.members, 'next_slot': self.next_slot}
+
+    @classmethod
+    def from_dict(cls, data):
+        bitmap = cls(0)
+        bitmap.bits = list(data['bits'])
+        bitmap.members = data['members']
+        bitmap.next_slot = data['next_slot']
+        return bitmap
+
+
+def add_player(room, sid, username):
+    """Crée le PlayerRecord d'un joueur et lui attribue un slot"""
+    player = PlayerRecord(room['answered'].add_member(), username,
+                          len(room['questions']))
+    room['players'][sid] = player
+    return player
+
+
+def remove_player(room, sid):
+    player = room['players'].pop(sid, None)
+    if player is not None:
+        room['answered'].remove_member(player.slot)
+    return player
+
+
+def rekey_player(room, old_sid, new_sid):
+    """Rattache le joueur d'un ancien socket au nouveau (même slot, score et réponses)"""
+    player = room['players'].pop(old_sid, None)
+    if player is not None:
+        room['players'][new_sid] = player
+    return player
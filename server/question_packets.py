@@ -0,0 +1,107 @@
+from collections import namedtuple
+
+from wire import PreEncoded
+
+
+# Question compilée une fois à la création de la room.
+# 'payload' est l'événement new_question prêt à émettre et 'preparation'
+# l'événement preparing_next qui le précède (numéro + indice de préchargement) ;
+# la bonne réponse (correct_answer / correct_index) ne quitte jamais le serveur.
+QuestionPacket = namedtuple('QuestionPacket', [
+    'question_id', 'type', 'payload', 'preparation', 'options',
+    'correct_answer', 'correct_index', 'points', 'time_limit'
+])
+
+
+def question_options(question):
+    """Options affichées pour une question (None pour une question ouverte)"""
+    if question['type'] == 'true_false':
+        return ('Vrai', 'Faux')
+    if question['type'] == 'qcm':
+        return (
+            question.get('option_a'),
+            question.get('option_b'),
+            question.get('option_c'),
+            question.get('option_d')
+        )
+    return None
+
+
+def _fetch_unsplash(conn, question_ids):
+    """Métadonnées Unsplash de toutes les questions en une seule requête"""
+    if not question_ids:
+        return {}
+    placeholders = ','.join('?' * len(question_ids))
+    rows = conn.execute(f'''
+        SELECT question_id, regular_url, thumb_url, author_name, author_url
+        FROM unsplash_photos
+        WHERE question_id IN ({placeholders})
+    ''', question_ids).fetchall()
+    return {
+        row['question_id']: {
+            'regular_url': row['regular_url'],
+            'thumb_url': row['thumb_url'],
+            'author_name': row['author_name'],
+            'author_url': row['author_url']
+        }
+        for row in rows
+    }
+
+
+def compile_question_packets(questions, conn):
+    """Construit les paquets new_question d'un quiz (une requête SQL au total)"""
+    unsplash = _fetch_unsplash(conn, [
+        q['id'] for q in questions if q.get('image_source') == 'unsplash'
+    ])
+
+    packets = []
+    for index, question in enumerate(questions):
+        options = question_options(question)
+        time_limit = question.get('time_limit') or 15
+
+        image_data = None
+        if question.get('image_url'):
+            image_data = {
+                'url': question['image_url'],
+                'source': question.get('image_source', 'none'),
+                'unsplash_data': unsplash.get(question['id'])
+            }
+
+        payload = PreEncoded({
+            'question_number': index + 1,
+            'total_questions': len(questions),
+            'question': question['question'],
+            'type': question['type'],
+            'image': image_data,
+            'options': list(options) if options else None,
+            'time_limit': time_limit
+        })
+
+        # Le client n'a besoin que de quoi précharger l'image pendant le compte à rebours
+        preparation = PreEncoded({
+            'question_number': index + 1,
+            'total_questions': len(questions),
+            'preload': {
+                'type': question['type'],
+                'time_limit': time_limit,
+                'image_url': image_data['url'] if image_data else None
+            }
+        })
+
+        correct_index = None
+        if options and question.get('correct_answer') in options:
+            correct_index = options.index(question['correct_answer'])
+
+        packets.append(QuestionPacket(
+            question_id=question['id'],
+            type=question['type'],
+            payload=payload,
+            preparation=preparation,
+            options=options,
+            correct_answer=question.get('correct_answer'),
+            correct_index=correct_index,
+            points=question.get('points') or 10,
+            time_limit=time_limit
+        ))
+
+    return tuple(packets)
@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class QuizCache:
+    """Quiz assemblés (questions + images), en LRU bornée en taille et en durée.
+
+    Une entrée n'est valable que pour le updated_at avec lequel elle a été
+    rangée : un quiz modifié par un autre processus n'est donc jamais servi
+    périmé. Les écritures de ce processus l'invalident en plus directement
+    (updated_at n'a qu'une résolution d'une seconde).
+    """
+
+    def __init__(self, maxsize=128, ttl=600, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # quiz_id -> (updated_at, expire_à, quiz)
+        self._lock = threading.Lock()
+
+    def get(self, quiz_id, updated_at):
+        with self._lock:
+            entry = self._entries.get(quiz_id)
+            if entry is None or entry[0] != updated_at or entry[1] <= self.clock():
+                if entry is not None:
+                    del self._entries[quiz_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(quiz_id)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, quiz_id, updated_at, quiz):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[quiz_id] = (updated_at, self.clock() + self.ttl, quiz)
+            self._entries.move_to_end(quiz_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, quiz_id):
+        with self._lock:
+            self._entries.pop(quiz_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
@@ -47,6 +47,7 @@ on the topic '{subject}' with {difficulty} difficulty.
 
 Each question must follow this format:
 Q: [Open-ended question]
+Answer: [Short expected answer]
 
 Context:
 {context}
@@ -0,0 +1,42 @@
+import threading
+import time
+
+
+class SocketRateLimiter:
+    """Seau à jetons par socket : burst événements d'affilée, puis rate par seconde.
+
+    allow(sid) est appelé avant de confier l'événement à l'acteur de la
+    room : un client qui inonde le serveur est écarté sans coût pour la
+    partie.
+    """
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.rejected = 0
+        self._buckets = {}  # sid -> [jetons, dernière mise à jour]
+        self._lock = threading.Lock()
+
+    def allow(self, sid):
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(sid)
+            if bucket is None:
+                bucket = self._buckets[sid] = [float(self.burst), now]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                self.rejected += 1
+                return False
+            bucket[0] = tokens - 1
+            return True
+
+    def forget(self, sid):
+        with self._lock:
+            self._buckets.pop(sid, None)
+
+    def stats(self):
+        with self._lock:
+            return {'sockets': len(self._buckets), 'rejected': self.rejected}
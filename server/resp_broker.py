@@ -0,0 +1,173 @@
+"""Petit serveur compatible Redis (protocole RESP) pour le mode multi-worker.
+
+Remplace un vrai Redis en développement et en test : pub/sub (utilisé par
+le message_queue de Flask-SocketIO entre workers) et les commandes de hash
+de LocalRedis (ROOM_STORE_BACKEND=redis). Ce n'est pas un Redis complet.
+
+Usage : python resp_broker.py [--host 127.0.0.1] [--port 6379]
+"""
+import argparse
+import socketserver
+import threading
+
+from room_store import LocalRedis
+
+
+class SimpleString(str):
+    pass
+
+
+OK = SimpleString('OK')
+
+
+def encode(value):
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, SimpleString):
+        return b'+' + value.encode('utf-8') + b'\r\n'
+    if isinstance(value, Exception):
+        return b'-ERR ' + str(value).encode('utf-8') + b'\r\n'
+    if isinstance(value, (bool, int)):
+        return b':%d\r\n' % int(value)
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    if isinstance(value, bytes):
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+    if isinstance(value, dict):
+        value = [item for pair in value.items() for item in pair]
+    return b'*%d\r\n' % len(value) + b''.join(encode(item) for item in value)
+
+
+def read_command(rfile):
+    """Lit une commande RESP (tableau de bulk strings) ou inline ; None en fin de flux"""
+    line = rfile.readline()
+    if not line:
+        return None
+    if not line.startswith(b'*'):
+        return line.split()
+    args = []
+    for _ in range(int(line[1:])):
+        header = rfile.readline()
+        length = int(header[1:])
+        args.append(rfile.read(length + 2)[:-2])
+    return args
+
+
+class Broker:
+    """État partagé : abonnements pub/sub et hashes"""
+
+    def __init__(self):
+        self.store = LocalRedis()
+        self.channels = {}  # canal -> set de connexions
+        self.lock = threading.Lock()
+
+    def subscribe(self, connection, channel):
+        with self.lock:
+            self.channels.setdefault(channel, set()).add(connection)
+
+    def unsubscribe(self, connection, channel):
+        with self.lock:
+            subscribers = self.channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(connection)
+                if not subscribers:
+                    del self.channels[channel]
+
+    def publish(self, channel, message):
+        with self.lock:
+            subscribers = list(self.channels.get(channel, ()))
+        frame = encode([b'message', channel, message])
+        delivered = 0
+        for connection in subscribers:
+            if connection.send(frame):
+                delivered += 1
+        return delivered
+
+
+class BrokerConnection(socketserver.StreamRequestHandler):
+    HASH_COMMANDS = {
+        b'HGET': 'hget', b'HSET': 'hset', b'HDEL': 'hdel', b'HEXISTS': 'hexists',
+        b'HKEYS': 'hkeys', b'HLEN': 'hlen', b'HGETALL': 'hgetall', b'DEL': 'delete'
+    }
+
+    def setup(self):
+        super().setup()
+        self.broker = self.server.broker
+        self.subscriptions = set()
+        self.write_lock = threading.Lock()
+
+    def send(self, data):
+        try:
+            with self.write_lock:
+                self.wfile.write(data)
+                self.wfile.flush()
+            return True
+        except OSError:
+            return False
+
+    def handle(self):
+        try:
+            while True:
+                args = read_command(self.rfile)
+                if args is None:
+                    return
+                if args:
+                    self.send(self.execute(args[0].upper(), args[1:]))
+        finally:
+            for channel in list(self.subscriptions):
+                self.broker.unsubscribe(self, channel)
+
+    def execute(self, command, args):
+        if command == b'PING':
+            if self.subscriptions:
+                return encode([b'pong', args[0] if args else b''])
+            return encode(args[0] if args else SimpleString('PONG'))
+        if command == b'ECHO':
+            return encode(args[0])
+        if command in (b'SELECT', b'CLIENT', b'AUTH'):
+            return encode(OK)
+        if command == b'PUBLISH':
+            return encode(self.broker.publish(args[0], args[1]))
+        if command == b'SUBSCRIBE':
+            replies = []
+            for channel in args:
+                self.subscriptions.add(channel)
+                self.broker.subscribe(self, channel)
+                replies.append(encode([b'subscribe', channel, len(self.subscriptions)]))
+            return b''.join(replies)
+        if command == b'UNSUBSCRIBE':
+            replies = []
+            for channel in args or list(self.subscriptions):
+                self.subscriptions.discard(channel)
+                self.broker.unsubscribe(self, channel)
+                replies.append(encode([b'unsubscribe', channel, len(self.subscriptions)]))
+            return b''.join(replies)
+        method = self.HASH_COMMANDS.get(command)
+        if method is not None:
+            return encode(getattr(self.broker.store, method)(*args))
+        return encode(Exception(f"unknown command '{command.decode('utf-8', 'replace')}'"))
+
+
+class BrokerServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, BrokerConnection)
+        self.broker = Broker()
+
+
+def start_broker(host='127.0.0.1', port=6379):
+    """Démarre le broker dans un thread ; retourne le serveur (server.shutdown() pour l'arrêter)"""
+    server = BrokerServer((host, port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Broker RESP minimal (pub/sub + hashes)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6379)
+    args = parser.parse_args()
+    print(f"[INFO] RESP broker listening on {args.host}:{args.port}")
+    BrokerServer((args.host, args.port)).serve_forever()
@@ -0,0 +1,103 @@
+import threading
+import time
+
+
+class RoomActor:
+    """Boîte aux lettres d'une room : une file et une tâche qui la dépile.
+
+    Les événements d'une même room sont traités un par un, dans l'ordre
+    d'arrivée, même quand un handler cède la main (accès SQLite, émission) ;
+    les autres rooms avancent en parallèle avec leur propre acteur.
+    """
+
+    def __init__(self, room_code, queue):
+        self.room_code = room_code
+        self.queue = queue
+        self.processed = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self.max_time = 0.0
+        self.max_wait = 0.0
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue.qsize(),
+            'processed': self.processed,
+            'errors': self.errors,
+            'avg_ms': round(self.busy_time / self.processed * 1000, 3) if self.processed else 0.0,
+            'max_ms': round(self.max_time * 1000, 3),
+            'max_wait_ms': round(self.max_wait * 1000, 3)
+        }
+
+
+class RoomActors:
+    """Registre des acteurs de room, créés au premier événement.
+
+    start_task, create_queue et queue_empty viennent du serveur Socket.IO
+    (start_background_task, eio.create_queue, eio.get_queue_empty_exception())
+    pour suivre son modèle d'exécution (threads, eventlet ou gevent). Un
+    acteur inactif pendant idle_timeout secondes s'arrête ; il sera recréé
+    au prochain événement.
+    """
+
+    def __init__(self, start_task, create_queue, queue_empty, idle_timeout=60):
+        self.start_task = start_task
+        self.create_queue = create_queue
+        self.queue_empty = queue_empty
+        self.idle_timeout = idle_timeout
+        self.actors = {}
+        self._lock = threading.Lock()
+
+    def submit(self, room_code, fn, *args):
+        """Met fn(*args) dans la file de la room"""
+        with self._lock:
+            actor = self.actors.get(room_code)
+            if actor is None:
+                actor = self.actors[room_code] = RoomActor(
+                    room_code, self.create_queue())
+                self.start_task(self._run, actor)
+            actor.queue.put((time.perf_counter(), fn, args))
+
+    def stop(self, room_code):
+        """Arrête l'acteur une fois sa file vidée"""
+        with self._lock:
+            actor = self.actors.pop(room_code, None)
+        if actor is not None:
+            actor.queue.put(None)
+
+    def _run(self, actor):
+        while True:
+            try:
+                item = actor.queue.get(timeout=self.idle_timeout)
+            except self.queue_empty:
+                with self._lock:
+                    # Un submit a pu arriver juste après le délai
+                    if actor.queue.qsize():
+                        continue
+                    if self.actors.get(actor.room_code) is actor:
+                        del self.actors[actor.room_code]
+                    return
+            if item is None:
+                return
+
+            queued_at, fn, args = item
+            started = time.perf_counter()
+            try:
+                fn(*args)
+            except Exception as e:
+                actor.errors += 1
+                print(f"Error in room {actor.room_code} actor: {str(e)}")
+            elapsed = time.perf_counter() - started
+            actor.processed += 1
+            actor.busy_time += elapsed
+            actor.max_time = max(actor.max_time, elapsed)
+            actor.max_wait = max(actor.max_wait, started - queued_at)
+
+    def stats(self):
+        with self._lock:
+            actors = list(self.actors.values())
+        return {
+            'rooms': len(actors),
+            'queue_depth_total': sum(actor.queue.qsize() for actor in actors),
+            'by_room': {actor.room_code: actor.stats() for actor in actors}
+        }
@@ -0,0 +1,64 @@
+import time
+
+
+class RoomReaper:
+    """Libère les rooms terminées ou abandonnées et les sessions associées.
+
+    Une room est évincée 'finished_ttl' secondes après la fin de la partie, ou
+    après 'idle_ttl' secondes sans activité (hôte qui ne lance jamais la
+    partie, joueurs partis...). on_evict(room_code) permet à l'application de
+    libérer ce qui vit hors du store (timers, journal, rooms Socket.IO).
+    owns(room_code) limite le balayage aux rooms de ce worker.
+    """
+
+    def __init__(self, store, idle_ttl=1800, finished_ttl=300, on_evict=None, owns=None):
+        self.store = store
+        self.owns = owns
+        self.idle_ttl = idle_ttl
+        self.finished_ttl = finished_ttl
+        self.on_evict = on_evict
+        self.evicted_total = 0
+
+    def is_expired(self, room, now):
+        if room.get('state') == 'finished':
+            finished_at = room.get('finished_at') or room.get('last_activity') or 0
+            if now - finished_at >= self.finished_ttl:
+                return True
+        last_activity = room.get('last_activity') or 0
+        return now - last_activity >= self.idle_ttl
+
+    def sweep(self, now=None):
+        now = now if now is not None else time.time()
+        expired = set()
+        for room_code, room in self.store.owned_rooms(self.owns):
+            if self.is_expired(room, now):
+                expired.add(room_code)
+
+        if not expired:
+            return []
+
+        # Un seul parcours des sessions pour toutes les rooms évincées
+        stale_sids = [sid for sid, room_code in list(self.store.user_rooms.items())
+                      if room_code in expired]
+        for sid in stale_sids:
+            self.store.user_rooms.pop(sid, None)
+            self.store.user_sessions.pop(sid, None)
+
+        for room_code in expired:
+            self.store.rooms.pop(room_code, None)
+            if self.on_evict is not None:
+                self.on_evict(room_code)
+
+        self.evicted_total += len(expired)
+        return sorted(expired)
+
+    def gauges(self):
+        states = {}
+        for _, room in self.store.owned_rooms(self.owns):
+            states[room.get('state')] = states.get(room.get('state'), 0) + 1
+        return {
+            'live_rooms': sum(states.values()),
+            'rooms_by_state': states,
+            'sessions': len(self.store.user_sessions),
+            'evicted_total': self.evicted_total
+        }
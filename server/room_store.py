@@ -0,0 +1,283 @@
+import json
+import os
+import time
+import zlib
+from collections.abc import MutableMapping
+
+from deferred_scoring import QuestionWindow
+from player_state import AnswerBitmap, PlayerRecord
+
+
+# Préfixe des clés Redis partagées par tous les workers
+KEY_PREFIX = 'quiz'
+
+
+def encode_room(room):
+    """Sérialise une room en JSON compact.
+
+    Les clés commençant par '_' sont des objets d'exécution (scoreboard,
+    timers...) propres au worker : elles ne sont jamais sérialisées et sont
+    reconstruites à la réhydratation.
+    """
+    data = {k: v for k, v in room.items() if not k.startswith('_')}
+    return json.dumps(data, separators=(',', ':'), default=_encode_value)
+
+
+def _encode_value(value):
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def decode_room(raw):
+    if isinstance(raw, bytes):
+        raw = raw.decode('utf-8')
+    room = json.loads(raw)
+
+    room['players'] = {
+        sid: PlayerRecord.from_dict(player)
+        for sid, player in room.get('players', {}).items()
+    }
+    if 'answered' in room:
+        room['answered'] = AnswerBitmap.from_dict(room['answered'])
+    if room.get('score_window') is not None:
+        room['score_window'] = QuestionWindow.from_dict(room['score_window'])
+
+    # JSON transforme les clés entières (index de question) en chaînes ;
+    # les anciens instantanés stockaient une liste de réponses par question
+    if isinstance(room.get('open_answers'), dict):
+        room['open_answers'] = {
+            int(k): v if isinstance(v, dict) else {
+                entry['username']: entry for entry in reversed(v)}
+            for k, v in room['open_answers'].items()}
+    return room
+
+
+def _encode_str(value):
+    return value
+
+
+def _decode_str(raw):
+    return raw.decode('utf-8') if isinstance(raw, bytes) else raw
+
+
+class LocalRedis:
+    """Remplaçant en mémoire d'un client redis-py (sous-ensemble des hashes).
+
+    Utilisé pour les tests et le développement quand aucun serveur Redis
+    n'est disponible. Les valeurs sont stockées en bytes comme le ferait Redis.
+    """
+
+    def __init__(self):
+        self._hashes = {}
+
+    @staticmethod
+    def _b(value):
+        return value if isinstance(value, bytes) else str(value).encode('utf-8')
+
+    def hget(self, name, key):
+        return self._hashes.get(name, {}).get(self._b(key))
+
+    def hset(self, name, key, value):
+        h = self._hashes.setdefault(name, {})
+        created = self._b(key) not in h
+        h[self._b(key)] = self._b(value)
+        return int(created)
+
+    def hdel(self, name, *keys):
+        h = self._hashes.get(name, {})
+        return sum(1 for key in keys if h.pop(self._b(key), None) is not None)
+
+    def hexists(self, name, key):
+        return self._b(key) in self._hashes.get(name, {})
+
+    def hkeys(self, name):
+        return list(self._hashes.get(name, {}).keys())
+
+    def hlen(self, name):
+        return len(self._hashes.get(name, {}))
+
+    def hgetall(self, name):
+        return dict(self._hashes.get(name, {}))
+
+    def delete(self, *names):
+        return sum(1 for name in names if self._hashes.pop(name, None) is not None)
+
+    def ping(self):
+        return True
+
+
+class RedisHashMapping(MutableMapping):
+    """Dictionnaire adossé à un hash Redis, avec cache local en écriture directe.
+
+    Les lectures servent d'abord le cache du worker (la room reste le même
+    objet Python entre deux événements) ; les écritures sont poussées
+    immédiatement. Après une mutation en place d'une valeur, appeler
+    flush(key) pour republier l'état.
+    """
+
+    def __init__(self, client, name, encode=_encode_str, decode=_decode_str):
+        self.client = client
+        self.name = name
+        self.encode = encode
+        self.decode = decode
+        self._cache = {}
+
+    def __getitem__(self, key):
+        if key in self._cache:
+            return self._cache[key]
+        raw = self.client.hget(self.name, key)
+        if raw is None:
+            raise KeyError(key)
+        value = self.decode(raw)
+        self._cache[key] = value
+        return value
+
+    def peek(self, key, default=None):
+        """Lecture sans mise en cache (instantanés) : une room d'un autre
+        worker ne doit pas rester figée dans le cache de celui-ci"""
+        if key in self._cache:
+            return self._cache[key]
+        raw = self.client.hget(self.name, key)
+        return default if raw is None else self.decode(raw)
+
+    def __setitem__(self, key, value):
+        self._cache[key] = value
+        self.client.hset(self.name, key, self.encode(value))
+
+    def __delitem__(self, key):
+        cached = self._cache.pop(key, None) is not None
+        removed = self.client.hdel(self.name, key)
+        if not cached and not removed:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._cache or bool(self.client.hexists(self.name, key))
+
+    def __iter__(self):
+        for key in self.client.hkeys(self.name):
+            yield _decode_str(key)
+
+    def __len__(self):
+        return self.client.hlen(self.name)
+
+    def flush(self, key):
+        if key in self._cache:
+            self.client.hset(self.name, key, self.encode(self._cache[key]))
+
+
+class RoomStateStore:
+    """Regroupe l'état de jeu vivant : rooms, sid -> room et sid -> username.
+
+    Les timers restent locaux au worker (ce sont des tâches en cours
+    d'exécution), ils ne sont ni partagés ni sauvegardés.
+    """
+
+    def __init__(self, rooms, user_rooms, user_sessions):
+        self.rooms = rooms
+        self.user_rooms = user_rooms
+        self.user_sessions = user_sessions
+        self.timers = {}
+
+    def save_room(self, room_code):
+        """Publie une room modifiée en place (no-op pour le backend mémoire)."""
+        if hasattr(self.rooms, 'flush'):
+            self.rooms.flush(room_code)
+
+    def owned_rooms(self, owns=None):
+        """(room_code, room) des rooms de ce worker, lues sans remplir le cache.
+
+        Avec un store partagé, parcourir self.rooms chargerait dans le cache
+        local les rooms des autres workers, qui y resteraient figées.
+        """
+        peek = getattr(self.rooms, 'peek', self.rooms.get)
+        for room_code in list(self.rooms):
+            if owns is not None and not owns(room_code):
+                continue
+            room = peek(room_code)
+            if room is not None:
+                yield room_code, room
+
+    def snapshot(self, conn, owns=None):
+        """Écrit un instantané compressé de chaque room vivante dans SQLite.
+
+        owns(room_code) restreint l'écriture et le nettoyage aux rooms de ce
+        worker quand plusieurs processus partagent la base et le store : une
+        room d'un autre worker n'est ni relue ni réécrite.
+        """
+        now = time.time()
+        rows = []
+        for room_code, room in self.owned_rooms(owns):
+            payload = zlib.compress(encode_room(room).encode('utf-8'))
+            rows.append((room_code, payload, now))
+
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO room_snapshots (room_code, payload, updated_at)
+            VALUES (?, ?, ?)
+        ''', rows)
+        # Les rooms disparues n'ont plus besoin d'être réhydratées
+        if owns is None:
+            cursor.execute(
+                'DELETE FROM room_snapshots WHERE updated_at < ?', (now,))
+        else:
+            stale = [(row[0],) for row in cursor.execute(
+                'SELECT room_code FROM room_snapshots WHERE updated_at < ?', (now,)).fetchall()
+                if owns(row[0])]
+            cursor.executemany(
+                'DELETE FROM room_snapshots WHERE room_code = ?', stale)
+        conn.commit()
+        return len(rows)
+
+    def restore(self, conn, owns=None, replay=None):
+        """Réhydrate les rooms absentes du store depuis le dernier instantané.
+
+        replay(conn, room_code, room) complète ensuite chaque room avec ce
+        qui s'est passé après son instantané (journal des événements).
+        """
+        restored = 0
+        rows = conn.execute(
+            'SELECT room_code, payload FROM room_snapshots').fetchall()
+        for room_code, payload in rows:
+            if room_code in self.rooms or (owns is not None and not owns(room_code)):
+                continue
+            room = decode_room(zlib.decompress(payload))
+            if replay is not None:
+                replay(conn, room_code, room)
+            self.rooms[room_code] = room
+            restored += 1
+        return restored
+
+
+def _redis_client(url):
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError(
+            "ROOM_STORE_BACKEND=redis requires the 'redis' package")
+    return redis.Redis.from_url(url)
+
+
+def create_room_store(backend=None, url=None):
+    """Construit le store selon ROOM_STORE_BACKEND (memory, redis ou local)."""
+    backend = backend or os.environ.get('ROOM_STORE_BACKEND', 'memory')
+
+    if backend == 'memory':
+        return RoomStateStore({}, {}, {})
+
+    if backend == 'redis':
+        client = _redis_client(
+            url or os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+    elif backend == 'local':
+        client = LocalRedis()
+    else:
+        raise ValueError(f"Unknown room store backend: {backend}")
+
+    return RoomStateStore(
+        RedisHashMapping(client, f'{KEY_PREFIX}:rooms',
+                         encode=encode_room, decode=decode_room),
+        RedisHashMapping(client, f'{KEY_PREFIX}:user_rooms'),
+        RedisHashMapping(client, f'{KEY_PREFIX}:user_sessions'),
+    )
@@ -0,0 +1,55 @@
+from collections import deque
+
+
+class RoomDeltas:
+    """Version d'état d'une room et anneau des derniers changements diffusés.
+
+    Chaque événement diffusé à toute la room (arrivées/départs, question,
+    fin du temps...) incrémente la version et garde (version, event, data)
+    dans un anneau borné. Un client qui se reconnecte avec sa dernière
+    version reçoit seulement les événements manqués, ou un instantané s'ils
+    ne sont plus dans l'anneau.
+    """
+
+    __slots__ = ('version', 'ring')
+
+    def __init__(self, version=0, capacity=256):
+        self.version = version
+        self.ring = deque(maxlen=capacity)
+
+    def record(self, event, data):
+        self.version += 1
+        self.ring.append((self.version, event, data))
+        return self.version
+
+    def since(self, version):
+        """Événements postérieurs à version, ou None s'il faut un instantané"""
+        if version is None or version > self.version:
+            return None
+        if version == self.version:
+            return []
+        oldest = self.ring[0][0] if self.ring else self.version + 1
+        if version + 1 < oldest:
+            return None
+        return [[event, data, v] for v, event, data in self.ring if v > version]
+
+
+def parse_version(value):
+    """Version envoyée par un client : entier positif (ou sa forme texte),
+    None sinon, ce qui force un instantané"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    if isinstance(value, int) and value >= 0:
+        return value
+    return None
+
+
+def deltas_for(room, capacity=256):
+    """Anneau de la room (runtime, '_deltas' n'est pas sauvegardé) ; après une
+    restauration il repart vide à la version sauvegardée : instantané forcé"""
+    deltas = room.get('_deltas')
+    if deltas is None:
+        deltas = room['_deltas'] = RoomDeltas(room.get('version', 0), capacity)
+    return deltas
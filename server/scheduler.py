@@ -0,0 +1,78 @@
+import math
+import threading
+import time
+
+
+class TimerHandle:
+    __slots__ = ('target_tick', 'slot', 'callback', 'args', 'cancelled')
+
+    def __init__(self, target_tick, slot, callback, args):
+        self.target_tick = target_tick
+        self.slot = slot
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+class TimingWheel:
+    """Roue temporelle hachée partagée par toutes les rooms.
+
+    Une seule tâche de fond avance la roue d'un cran par tick ; planifier ou
+    annuler une échéance est en O(1) et ne bloque jamais un handler.
+    Les callbacks s'exécutent dans la tâche de la roue : ils doivent rester
+    courts (émettre un événement, replanifier...).
+    """
+
+    def __init__(self, tick=0.1, slots=512):
+        self.tick = tick
+        self.slots = [set() for _ in range(slots)]
+        self.current_tick = 0
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def __len__(self):
+        return self._pending
+
+    def schedule(self, delay, callback, *args):
+        ticks = max(1, math.ceil(delay / self.tick))
+        with self._lock:
+            target = self.current_tick + ticks
+            handle = TimerHandle(target, target % len(self.slots), callback, args)
+            self.slots[handle.slot].add(handle)
+            self._pending += 1
+        return handle
+
+    def cancel(self, handle):
+        if handle is None or handle.cancelled:
+            return
+        with self._lock:
+            handle.cancelled = True
+            if handle in self.slots[handle.slot]:
+                self.slots[handle.slot].discard(handle)
+                self._pending -= 1
+
+    def advance(self):
+        """Avance d'un tick et exécute les échéances arrivées à terme"""
+        with self._lock:
+            self.current_tick += 1
+            slot = self.slots[self.current_tick % len(self.slots)]
+            due = [h for h in slot if h.target_tick <= self.current_tick]
+            for handle in due:
+                slot.discard(handle)
+            self._pending -= len(due)
+
+        for handle in due:
+            handle.cancelled = True  # déjà exécuté : cancel() devient un no-op
+            try:
+                handle.callback(*handle.args)
+            except Exception as e:
+                print(f"Error in scheduled callback {handle.callback.__name__}: {str(e)}")
+
+    def run(self, sleep):
+        """Boucle de fond : rattrape les ticks manqués si un tour a pris du retard"""
+        next_deadline = time.monotonic() + self.tick
+        while True:
+            sleep(max(0, next_deadline - time.monotonic()))
+            while time.monotonic() >= next_deadline:
+                self.advance()
+                next_deadline += self.tick
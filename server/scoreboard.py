@@ -0,0 +1,105 @@
+from sortedcontainers import SortedList
+
+
+class Scoreboard:
+    """Classement incrémental d'une room.
+
+    Les joueurs sont rangés dans une SortedList par (-score, ordre d'arrivée),
+    ce qui donne une mise à jour, un rang et un top K en O(log n) au lieu de
+    reconstruire et trier toute la liste à chaque réponse.
+    """
+
+    def __init__(self):
+        self._entries = SortedList()
+        self._by_player = {}  # player_id -> (-score, seq, player_id)
+        self._names = {}
+        self._dirty = set()
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, player_id):
+        return player_id in self._by_player
+
+    def update(self, player_id, score, username=None):
+        old = self._by_player.get(player_id)
+        if old is not None:
+            self._entries.remove(old)
+            seq = old[1]
+        else:
+            seq = self._seq
+            self._seq += 1
+
+        entry = (-score, seq, player_id)
+        self._entries.add(entry)
+        self._by_player[player_id] = entry
+        if username is not None:
+            self._names[player_id] = username
+        self._dirty.add(player_id)
+
+    def remove(self, player_id):
+        entry = self._by_player.pop(player_id, None)
+        if entry is not None:
+            self._entries.remove(entry)
+        self._names.pop(player_id, None)
+        self._dirty.discard(player_id)
+
+    def rename(self, old_id, new_id):
+        """Le joueur change d'identifiant (reconnexion) sans perdre son rang"""
+        entry = self._by_player.pop(old_id, None)
+        if entry is None:
+            return
+        self._entries.remove(entry)
+        entry = (entry[0], entry[1], new_id)
+        self._entries.add(entry)
+        self._by_player[new_id] = entry
+        if old_id in self._names:
+            self._names[new_id] = self._names.pop(old_id)
+        self._dirty.discard(old_id)
+        self._dirty.add(new_id)
+
+    def score(self, player_id):
+        return -self._by_player[player_id][0]
+
+    def rank(self, player_id):
+        """Rang (à partir de 1) du joueur, ou None s'il n'est pas classé"""
+        entry = self._by_player.get(player_id)
+        if entry is None:
+            return None
+        return self._entries.index(entry) + 1
+
+    def _player(self, entry, rank):
+        return {
+            'id': entry[2],
+            'username': self._names.get(entry[2]),
+            'score': -entry[0],
+            'rank': rank
+        }
+
+    def top(self, k=None):
+        entries = self._entries if k is None else self._entries.islice(0, k)
+        return [self._player(entry, rank)
+                for rank, entry in enumerate(entries, 1)]
+
+    def pop_deltas(self):
+        """Joueurs modifiés depuis le dernier appel, avec leur nouveau rang"""
+        deltas = [
+            self._player(self._by_player[pid], self.rank(pid))
+            for pid in self._dirty
+        ]
+        self._dirty.clear()
+        return deltas
+
+
+def scoreboard_for(room):
+    """Retourne le classement de la room, reconstruit si besoin (réhydratation)"""
+    scoreboard = room.get('_scoreboard')
+    if scoreboard is None:
+        scoreboard = Scoreboard()
+        for pid, player in room['players'].items():
+            if not player.is_host:
+                scoreboard.update(pid, player.score, player.username)
+        scoreboard.pop_deltas()
+        room['_scoreboard'] = scoreboard
+    return scoreboard
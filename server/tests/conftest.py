@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# Les modules du serveur s'importent à plat (from db import ...), comme depuis server/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Base SQLite jetable, schéma et migrations appliqués"""
+    import db
+    previous = db.DB_PATH
+    db.use_database(str(tmp_path / 'quiz.db'))
+    db.init_db()
+    yield db
+    db.use_database(previous)
@@ -0,0 +1,85 @@
+def make_user(db, username='host'):
+    with db.connection() as conn:
+        return conn.execute(
+            "INSERT INTO users (username, password) VALUES (?, 'x')", (username,)).lastrowid
+
+
+def open_question(text, reference, **fields):
+    return {'question': text, 'type': 'open_question', 'correct_answer': reference, **fields}
+
+
+def test_update_quiz_keeps_open_question_reference(database):
+    user_id = make_user(database)
+    quiz_id = database.create_quiz('Quiz', '', user_id, [open_question('Capital?', 'Paris')])
+    question = database.get_quiz_by_id(quiz_id)['questions'][0]
+
+    database.update_quiz(quiz_id, 'Quiz', '', [
+        open_question('Capital of France?', 'Paris', id=question['id'])])
+
+    question = database.get_quiz_by_id(quiz_id)['questions'][0]
+    assert question['question'] == 'Capital of France?'
+    assert question['correct_answer'] == 'Paris'
+
+
+def qcm(text, **fields):
+    return {'question': text, 'type': 'qcm', 'option_a': 'A', 'option_b': 'B',
+            'option_c': 'C', 'option_d': 'D', 'correct_answer': 'A', **fields}
+
+
+def question_rows(db, quiz_id):
+    with db.connection() as conn:
+        return [tuple(row) for row in conn.execute(
+            'SELECT id, question, position, archived FROM questions WHERE quiz_id = ? ORDER BY id',
+            (quiz_id,))]
+
+
+def test_update_quiz_applies_only_the_differences(database):
+    user_id = make_user(database)
+    quiz_id = database.create_quiz('Quiz', '', user_id, [qcm('Q1'), qcm('Q2'), qcm('Q3')])
+    q1, q2, q3 = database.get_quiz_by_id(quiz_id)['questions']
+
+    # Q2 a déjà été jouée : elle est archivée au lieu d'être supprimée
+    with database.connection() as conn:
+        conn.execute(
+            'INSERT INTO answers (game_id, question_id, user_id, answer_text, is_correct) '
+            'VALUES (1, ?, ?, ?, 1)', (q2['id'], user_id, 'A'))
+
+    database.update_quiz(quiz_id, 'Quiz', '', [
+        {**q3, 'points': 20},
+        q1,
+        qcm('Q4'),
+    ])
+
+    questions = database.get_quiz_by_id(quiz_id)['questions']
+    assert [q['question'] for q in questions] == ['Q3', 'Q1', 'Q4']
+    assert questions[0]['id'] == q3['id'] and questions[0]['points'] == 20
+    assert questions[1]['id'] == q1['id']
+
+    rows = {row[1]: row for row in question_rows(database, quiz_id)}
+    assert rows['Q2'][3] == 1
+    assert (rows['Q3'][2], rows['Q1'][2], rows['Q4'][2]) == (0, 1, 2)
+
+
+def test_update_quiz_deletes_unplayed_questions(database):
+    user_id = make_user(database)
+    quiz_id = database.create_quiz('Quiz', '', user_id, [qcm('Q1'), qcm('Q2')])
+    q1, _ = database.get_quiz_by_id(quiz_id)['questions']
+
+    database.update_quiz(quiz_id, 'Quiz', '', [q1])
+    assert [row[1] for row in question_rows(database, quiz_id)] == ['Q1']
+
+
+def test_update_quiz_ignores_unknown_or_repeated_ids(database):
+    user_id = make_user(database)
+    quiz_id = database.create_quiz('Quiz', '', user_id, [qcm('Q1')])
+    other_id = database.create_quiz('Other', '', user_id, [qcm('R1')])
+    q1 = database.get_quiz_by_id(quiz_id)['questions'][0]
+    r1 = database.get_quiz_by_id(other_id)['questions'][0]
+
+    # Une question d'un autre quiz ou un id répété devient une nouvelle question
+    database.update_quiz(quiz_id, 'Quiz', '', [q1, {**q1, 'question': 'Copy'},
+                                                {**r1, 'question': 'Stolen'}])
+    questions = database.get_quiz_by_id(quiz_id)['questions']
+    assert [q['question'] for q in questions] == ['Q1', 'Copy', 'Stolen']
+    assert len({q['id'] for q in questions}) == 3
+    assert database.get_quiz_by_id(other_id)['questions'][0]['question'] == 'R1'
@@ -0,0 +1,75 @@
+import sqlite3
+
+import pytest
+
+from db_pool import ConnectionPool
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / 'pool.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)')
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_closed_connections_are_reused(path):
+    pool = ConnectionPool(path)
+    conn = pool.acquire()
+    conn.close()
+    assert pool.acquire() is conn
+    assert pool.stats() == {'opened': 1, 'reused': 1, 'idle': 0}
+
+
+def test_connections_use_wal_and_row_factory(path):
+    pool = ConnectionPool(path)
+    with pool.connection() as conn:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        conn.execute("INSERT INTO items (name) VALUES ('a')")
+        row = conn.execute('SELECT name FROM items').fetchone()
+        assert row['name'] == 'a'
+
+
+def test_open_transaction_is_rolled_back_on_release(path):
+    pool = ConnectionPool(path)
+    conn = pool.acquire()
+    conn.execute("INSERT INTO items (name) VALUES ('lost')")
+    conn.close()
+
+    with pool.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 0
+
+
+def test_context_manager_commits_or_rolls_back(path):
+    pool = ConnectionPool(path)
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO items (name) VALUES ('kept')")
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            conn.execute("INSERT INTO items (name) VALUES ('dropped')")
+            raise RuntimeError
+
+    with pool.connection() as conn:
+        assert [r['name'] for r in conn.execute('SELECT name FROM items')] == ['kept']
+
+
+def test_readonly_pool_rejects_writes(path):
+    ConnectionPool(path).acquire().close()  # passe la base en WAL
+    pool = ConnectionPool(path, readonly=True)
+    with pool.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 0
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO items (name) VALUES ('x')")
+
+
+def test_idle_connections_are_bounded(path):
+    pool = ConnectionPool(path, max_idle=1)
+    first, second = pool.acquire(), pool.acquire()
+    first.close()
+    second.close()
+    assert pool.stats()['idle'] == 1
+
+    pool.close_all()
+    assert pool.stats()['idle'] == 0
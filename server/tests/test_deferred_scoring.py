@@ -0,0 +1,57 @@
+import numpy as np
+
+from deferred_scoring import QuestionWindow
+from event_log import replay_events
+from player_state import NO_ANSWER, AnswerBitmap
+from room_store import decode_room, encode_room
+
+
+def immediate_points(points, time_limit, elapsed, bonus_coeff=1.0):
+    """Formule du score immédiat (handle_submit_answer)"""
+    time_left = max(0, time_limit - elapsed)
+    return round(points * (1 + time_left / time_limit * bonus_coeff))
+
+
+def test_window_scores_like_immediate_mode():
+    window = QuestionWindow(0, capacity=2)
+    window.record(0, 1, 2.5)   # bonne réponse
+    window.record(1, 3, 1.0)   # mauvaise réponse
+    window.record(4, 1, 25.0)  # hors délai : points de base, slot au-delà de la capacité
+
+    points, correct = window.score(1, 10, 20, bonus_coeff=1.0)
+    assert len(window.choices) >= 5
+    assert correct[:5].tolist() == [True, False, False, False, True]
+    assert points[0] == immediate_points(10, 20, 2.5)
+    assert points[1] == 0
+    assert points[4] == immediate_points(10, 20, 25.0) == 10
+    # Slots sans réponse : rien
+    assert window.choices[2] == NO_ANSWER and points[2] == 0
+
+
+def test_window_without_correct_answer_awards_nothing():
+    window = QuestionWindow(0)
+    window.record(0, 2, 1.0)
+    points, correct = window.score(None, 10, 20)
+    assert not correct.any() and not points.any()
+
+
+def test_pending_window_survives_a_snapshot():
+    window = QuestionWindow(3, capacity=4)
+    window.record(2, 1, 4.25)
+    room = {'players': {}, 'answered': AnswerBitmap(4), 'score_window': window}
+
+    restored = decode_room(encode_room(room))['score_window']
+    assert isinstance(restored, QuestionWindow)
+    assert restored.question_index == 3
+    assert np.array_equal(restored.choices, window.choices)
+    assert np.array_equal(restored.elapsed, window.elapsed)
+
+
+def test_replay_restores_closed_question():
+    room = {'questions': [{}, {}]}
+    replay_events([
+        (0, 0.0, 'question', {'index': 0}),
+        (1, 1.0, 'close', {'question': 0}),
+    ], room)
+    assert room['asked_question'] == 0
+    assert room['closed_question'] == 0
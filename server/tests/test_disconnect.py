@@ -0,0 +1,48 @@
+import time
+
+import pytest
+
+app = pytest.importorskip('app')
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            return False
+        app.socketio.sleep(0.01)
+    return True
+
+
+def test_disconnect_removes_waiting_player(database):
+    room_code = 'TESTDC'
+    app.active_rooms[room_code] = {
+        'game_id': 1,
+        'host': 'host',
+        'host_id': 'host-sid',
+        'quiz_id': 1,
+        'players': {},
+        'answered': app.AnswerBitmap(0),
+        'questions': [],
+        '_packets': [],
+        'current_question': 0,
+        'state': 'waiting',
+        'start_time': None,
+        'last_activity': time.time(),
+        'version': 0,
+        'sessions': {}
+    }
+    client = app.socketio.test_client(app.app)
+    try:
+        client.emit('join_room', {'room_code': room_code, 'username': 'alice'})
+        assert wait_for(lambda: app.active_rooms[room_code]['players'])
+        sid = next(iter(app.active_rooms[room_code]['players']))
+        assert app.user_rooms.get(sid) == room_code
+
+        client.disconnect()
+        # Dernier joueur parti : la room est supprimée avec lui
+        assert wait_for(lambda: room_code not in app.active_rooms)
+        assert sid not in app.user_rooms
+    finally:
+        app.active_rooms.pop(room_code, None)
+        app.room_actors.stop(room_code)
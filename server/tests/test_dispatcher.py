@@ -0,0 +1,87 @@
+from dispatcher import OutboundDispatcher
+
+
+class Recorder:
+    def __init__(self):
+        self.frames = []
+
+    def __call__(self, event, data, to=None):
+        self.frames.append((to, event, data))
+
+
+def test_deferred_frames_are_built_by_the_room_owner():
+    emit = Recorder()
+    queued = []
+    dispatcher = OutboundDispatcher(emit, defer=lambda target, send: queued.append((target, send)))
+    calls = []
+    dispatcher.push('ABCD:host', 'update_scores', lambda: calls.append(1) or {'top': []})
+
+    assert dispatcher.flush() == 1
+    # Rien n'est évalué ni envoyé dans la tâche du dispatcher
+    assert calls == [] and emit.frames == []
+
+    target, send = queued[0]
+    assert target == 'ABCD:host'
+    send()
+    assert calls == [1]
+    assert emit.frames == [('ABCD:host', 'batch', {'events': [['update_scores', {'top': []}]]})]
+
+
+def test_events_are_coalesced_into_one_frame_per_room():
+    emit = Recorder()
+    dispatcher = OutboundDispatcher(emit)
+    dispatcher.push('ABCD', 'player_answered', {'id': 1})
+    dispatcher.push('ABCD', 'player_answered', {'id': 2})
+    dispatcher.push('ABCD:host', 'open_answer', {'text': 'Paris'})
+
+    assert dispatcher.flush() == 2
+    assert sorted(emit.frames) == [
+        ('ABCD', 'batch', {'events': [['player_answered', {'id': 1}],
+                                      ['player_answered', {'id': 2}]]}),
+        ('ABCD:host', 'batch', {'events': [['open_answer', {'text': 'Paris'}]]}),
+    ]
+    assert dispatcher.stats() == {'frames_sent': 2, 'events_sent': 3, 'pending_rooms': 0}
+    assert dispatcher.flush() == 0
+
+
+def test_replace_keeps_only_the_latest_state_in_place():
+    emit = Recorder()
+    dispatcher = OutboundDispatcher(emit)
+    dispatcher.push('ABCD', 'update_scores', {'v': 1}, replace=True)
+    dispatcher.push('ABCD', 'player_answered', {'id': 1})
+    dispatcher.push('ABCD', 'update_scores', {'v': 2}, replace=True)
+    dispatcher.flush()
+
+    assert emit.frames == [('ABCD', 'batch', {'events': [
+        ['update_scores', {'v': 2}], ['player_answered', {'id': 1}]]})]
+
+    # Le remplacement ne vaut que jusqu'au flush suivant
+    dispatcher.push('ABCD', 'update_scores', {'v': 3}, replace=True)
+    dispatcher.flush()
+    assert emit.frames[-1] == ('ABCD', 'batch', {'events': [['update_scores', {'v': 3}]]})
+
+
+def test_callable_data_is_evaluated_once_at_send_time():
+    emit = Recorder()
+    dispatcher = OutboundDispatcher(emit)
+    calls = []
+    dispatcher.push('ABCD', 'update_scores', lambda: calls.append(1) or len(calls), replace=True)
+    dispatcher.push('ABCD', 'update_scores', lambda: calls.append(1) or len(calls), replace=True)
+    assert calls == []
+
+    dispatcher.flush()
+    assert calls == [1]
+    assert emit.frames == [('ABCD', 'batch', {'events': [['update_scores', 1]]})]
+
+
+def test_flush_and_discard_a_single_room():
+    emit = Recorder()
+    dispatcher = OutboundDispatcher(emit)
+    dispatcher.push('ABCD', 'a', 1)
+    dispatcher.push('EFGH', 'b', 2)
+    dispatcher.push('IJKL', 'c', 3)
+
+    assert dispatcher.flush('ABCD') == 1
+    dispatcher.discard('EFGH')
+    assert dispatcher.flush() == 1
+    assert [frame[0] for frame in emit.frames] == ['ABCD', 'IJKL']
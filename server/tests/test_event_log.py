@@ -0,0 +1,75 @@
+from event_log import EventLogWriter, replay_since_snapshot
+from player_state import AnswerBitmap, add_player
+from room_store import RoomStateStore
+
+
+def make_room(question_count=2):
+    return {
+        'game_id': 1,
+        'questions': [{}] * question_count,
+        'players': {},
+        'answered': AnswerBitmap(question_count),
+        'open_answers': {},
+        'current_question': 0,
+        'state': 'waiting',
+        'sessions': {}
+    }
+
+
+def log(writer, room, room_code, event_type, **payload):
+    entry = writer.get(room_code) or writer.open(room_code, room['game_id'])
+    room['log_seq'] = entry.append(event_type, **payload) + 1
+
+
+def test_restore_replays_events_after_snapshot(database):
+    writer = EventLogWriter(database.get_db_connection)
+    store = RoomStateStore({}, {}, {})
+    room = store.rooms['ABCD'] = make_room()
+
+    add_player(room, 'sid-a', 'alice')
+    room['sessions']['t-a'] = 'sid-a'
+    log(writer, room, 'ABCD', 'join', sid='sid-a', username='alice', token='t-a')
+    writer.flush()
+    conn = database.get_db_connection()
+    store.snapshot(conn)
+    conn.close()
+
+    # Après l'instantané : journalisé mais jamais resauvegardé avant le crash
+    log(writer, room, 'ABCD', 'join', sid='sid-b', username='bob', token='t-b')
+    log(writer, room, 'ABCD', 'question', index=0)
+    log(writer, room, 'ABCD', 'answer', sid='sid-b', question=0, answer=1)
+    log(writer, room, 'ABCD', 'score', sid='sid-b', score=850)
+    writer.flush()
+
+    restored = RoomStateStore({}, {}, {})
+    conn = database.get_db_connection()
+    assert restored.restore(conn, replay=replay_since_snapshot) == 1
+    conn.close()
+
+    room = restored.rooms['ABCD']
+    assert set(room['players']) == {'sid-a', 'sid-b'}
+    bob = room['players']['sid-b']
+    assert bob.score == 850
+    assert bob.answers[0] == 1
+    assert room['answered'].has_answered(0, bob.slot)
+    assert room['state'] == 'playing'
+    assert room['sessions'] == {'t-a': 'sid-a', 't-b': 'sid-b'}
+    assert room['log_seq'] == 5
+
+
+def test_flush_trims_persisted_events(database):
+    writer = EventLogWriter(database.get_db_connection)
+    entry = writer.open('ABCD', 1)
+    for index in range(3):
+        entry.append('question', index=index)
+
+    assert writer.flush() == 3
+    assert entry.events == []
+    entry.append('finish')
+    assert writer.flush() == 1
+    assert entry.events == []
+
+    conn = database.get_db_connection()
+    seqs = [row[0] for row in conn.execute('SELECT seq FROM game_events ORDER BY seq')]
+    conn.close()
+    assert seqs == [0, 1, 2, 3]
@@ -0,0 +1,84 @@
+import pytest
+
+from join_admission import JoinAdmission, RosterDeltas
+
+
+def test_pending_joins_are_written_in_one_batch():
+    batches = []
+    admission = JoinAdmission(batches.append)
+    admission.admit('ROOM1', 1, 'sid-a', 'alice')
+    admission.admit('ROOM1', 1, 'sid-b', 'bob')
+    admission.admit('ROOM2', 2, 'sid-c', 'carol')
+
+    assert admission.write_pending() == 3
+    assert batches == [[(1, 'alice'), (1, 'bob'), (2, 'carol')]]
+    assert admission.write_pending() == 0
+    assert len(batches) == 1
+
+
+def test_failed_write_is_retried_next_tick():
+    calls = []
+
+    def write(entries):
+        calls.append(list(entries))
+        if len(calls) == 1:
+            raise RuntimeError('database is locked')
+
+    admission = JoinAdmission(write)
+    admission.admit('ROOM1', 1, 'sid-a', 'alice')
+    with pytest.raises(RuntimeError):
+        admission.write_pending()
+
+    admission.admit('ROOM1', 1, 'sid-b', 'bob')
+    assert admission.write_pending() == 2
+    assert calls[-1] == [(1, 'alice'), (1, 'bob')]
+
+
+def test_deltas_are_grouped_per_room():
+    admission = JoinAdmission(lambda entries: None)
+    admission.admit('ROOM1', 1, 'sid-a', 'alice')
+    admission.admit('ROOM1', 1, 'sid-b', 'bob')
+    admission.greet('ROOM1', 'sid-host')
+    admission.leave('ROOM2', 'sid-z')
+
+    deltas = admission.take_deltas()
+    assert list(deltas['ROOM1'].added) == ['sid-a', 'sid-b']
+    assert deltas['ROOM1'].welcome == {'sid-host'}
+    assert deltas['ROOM2'].removed == {'sid-z'}
+    assert admission.take_deltas() == {}
+
+
+def test_join_then_leave_in_the_same_tick_cancels_out():
+    delta = RosterDeltas()
+    delta.add('sid-a')
+    delta.remove('sid-a')
+    assert not delta
+
+    admission = JoinAdmission(lambda entries: None)
+    admission.admit('ROOM1', 1, 'sid-a', 'alice')
+    admission.leave('ROOM1', 'sid-a')
+    assert admission.take_deltas() == {}
+
+
+def test_rejoin_after_leave_is_an_addition():
+    delta = RosterDeltas()
+    delta.remove('sid-a')
+    delta.add('sid-a')
+    assert list(delta.added) == ['sid-a'] and not delta.removed
+
+
+def test_discarded_room_sends_nothing():
+    admission = JoinAdmission(lambda entries: None)
+    admission.admit('ROOM1', 1, 'sid-a', 'alice')
+    admission.discard_room('ROOM1')
+    assert admission.take_deltas() == {}
+
+
+def test_admit_players_is_idempotent(database):
+    game_id = 1
+    assert database.admit_players([(game_id, 'alice'), (game_id, 'bob'), (game_id, 'alice')]) == 2
+    assert database.admit_players([(game_id, 'alice'), (game_id, 'carol')]) == 1
+    with database.connection() as conn:
+        rows = conn.execute(
+            'SELECT COUNT(*) FROM game_players WHERE game_id = ?', (game_id,)).fetchone()
+    assert rows[0] == 3
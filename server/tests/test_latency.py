@@ -0,0 +1,72 @@
+import pytest
+
+from latency import LatencyTracker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def measure(tracker, clock, sid, room_code, rtt):
+    ping_id = tracker.ping(room_code)['id']
+    clock.now += rtt
+    return tracker.pong(sid, room_code, ping_id)
+
+
+def test_compensation_is_the_median_rtt():
+    clock = FakeClock()
+    tracker = LatencyTracker(window=3, max_compensation=0.5, clock=clock)
+    assert tracker.compensation('sid-a') == 0.0
+
+    for rtt in (0.08, 0.3, 0.1):
+        assert measure(tracker, clock, 'sid-a', 'ROOM', rtt) == pytest.approx(rtt)
+    assert tracker.compensation('sid-a') == pytest.approx(0.1)
+
+    # Fenêtre glissante : 0.08 sort de la médiane
+    measure(tracker, clock, 'sid-a', 'ROOM', 0.2)
+    assert tracker.compensation('sid-a') == pytest.approx(0.2)
+
+
+def test_compensation_is_capped():
+    clock = FakeClock()
+    tracker = LatencyTracker(max_compensation=0.5, clock=clock)
+    measure(tracker, clock, 'sid-a', 'ROOM', 3.0)
+    assert tracker.rtt('sid-a') == pytest.approx(3.0)
+    assert tracker.compensation('sid-a') == 0.5
+
+
+def test_unknown_ping_ids_are_ignored():
+    clock = FakeClock()
+    tracker = LatencyTracker(clock=clock)
+    ping_id = tracker.ping('ROOM')['id']
+
+    # Un client ne peut pas inventer un ping plus ancien pour gonfler son RTT
+    assert tracker.pong('sid-a', 'ROOM', ping_id + 1) is None
+    assert tracker.pong('sid-a', 'OTHER', ping_id) is None
+    assert tracker.rtt('sid-a') is None
+
+    tracker.forget_room('ROOM')
+    assert tracker.pong('sid-a', 'ROOM', ping_id) is None
+
+
+def test_forget_drops_the_estimate():
+    clock = FakeClock()
+    tracker = LatencyTracker(clock=clock)
+    measure(tracker, clock, 'sid-a', 'ROOM', 0.1)
+    tracker.forget('sid-a')
+    assert tracker.compensation('sid-a') == 0.0
+
+
+def test_distribution():
+    clock = FakeClock()
+    tracker = LatencyTracker(clock=clock)
+    for sid, rtt in (('a', 0.05), ('b', 0.1), ('c', 0.2)):
+        measure(tracker, clock, sid, 'ROOM', rtt)
+
+    assert tracker.distribution(['a', 'b', 'c', 'unmeasured']) == {
+        'measured': 3, 'p50_ms': 100.0, 'p95_ms': 200.0, 'max_ms': 200.0}
+    assert tracker.distribution([]) == {'measured': 0}
@@ -0,0 +1,107 @@
+import sqlite3
+
+import pytest
+
+from migrations import MIGRATIONS, migrate, schema_version
+
+# Schéma d'avant les migrations (tables touchées par v1 à v3)
+OLD_SCHEMA = '''
+CREATE TABLE quizzes (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL,
+    description TEXT, user_id INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE questions (id INTEGER PRIMARY KEY AUTOINCREMENT, quiz_id INTEGER NOT NULL,
+    question TEXT NOT NULL, correct_answer TEXT, type TEXT NOT NULL);
+CREATE TABLE unsplash_photos (id TEXT PRIMARY KEY, question_id INTEGER NOT NULL,
+    regular_url TEXT NOT NULL, thumb_url TEXT NOT NULL);
+CREATE TABLE games (id INTEGER PRIMARY KEY AUTOINCREMENT, quiz_id INTEGER NOT NULL,
+    room_code TEXT NOT NULL, host_id INTEGER NOT NULL);
+CREATE TABLE game_players (id INTEGER PRIMARY KEY AUTOINCREMENT, game_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL, score INTEGER NOT NULL);
+CREATE TABLE answers (id INTEGER PRIMARY KEY AUTOINCREMENT, game_id INTEGER NOT NULL,
+    question_id INTEGER NOT NULL, user_id INTEGER NOT NULL, answer_text TEXT,
+    is_correct BOOLEAN);
+CREATE TABLE game_events (id INTEGER PRIMARY KEY AUTOINCREMENT, game_id INTEGER NOT NULL,
+    room_code TEXT NOT NULL, seq INTEGER NOT NULL, created_at REAL NOT NULL,
+    type TEXT NOT NULL, payload TEXT NOT NULL);
+'''
+
+
+@pytest.fixture
+def old_db(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'old.db'))
+    conn.executescript(OLD_SCHEMA)
+    conn.executescript('''
+        INSERT INTO quizzes (id, title, user_id) VALUES (1, 'Quiz', 1), (2, 'Other', 1);
+        INSERT INTO questions (id, quiz_id, question, type) VALUES
+            (10, 1, 'Q1', 'qcm'), (11, 2, 'R1', 'qcm'), (12, 1, 'Q2', 'qcm');
+        -- Deux parties pour la même room : la seconde est fusionnée dans la première
+        INSERT INTO games (id, quiz_id, room_code, host_id) VALUES
+            (1, 1, 'ABCD', 1), (2, 1, 'ABCD', 1);
+        INSERT INTO game_players (id, game_id, user_id, score) VALUES
+            (1, 1, 2, 10), (2, 2, 2, 20), (3, 2, 3, 5);
+        INSERT INTO answers (id, game_id, question_id, user_id, answer_text, is_correct) VALUES
+            (1, 1, 10, 2, 'A', 1),
+            (2, 1, 10, 2, 'B', 0),
+            (3, 2, 10, 3, 'B', 0),
+            (4, 1, 10, 1, 'A', 1),
+            (5, 1, 12, 3, 'A', 1);
+        INSERT INTO game_events (game_id, room_code, seq, created_at, type, payload)
+            VALUES (2, 'ABCD', 0, 0, 'join', '{}');
+    ''')
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_migrate_upgrades_an_existing_database(old_db):
+    assert migrate(old_db) == [version for version, _, _ in MIGRATIONS]
+    assert schema_version(old_db) == 3
+
+    # v1 : parties fusionnées, doublons supprimés (la plus ancienne ligne gagne)
+    assert old_db.execute('SELECT id FROM games').fetchall() == [(1,)]
+    assert old_db.execute(
+        'SELECT id, game_id, user_id FROM game_players ORDER BY id').fetchall() == [
+        (1, 1, 2), (3, 1, 3)]
+    assert old_db.execute(
+        'SELECT id FROM answers WHERE question_id = 10 ORDER BY id').fetchall() == [
+        (1,), (3,), (4,)]
+    assert old_db.execute('SELECT DISTINCT game_id FROM game_events').fetchall() == [(1,)]
+    with pytest.raises(sqlite3.IntegrityError):
+        old_db.execute("INSERT INTO games (quiz_id, room_code, host_id) VALUES (1, 'ABCD', 1)")
+
+    # v2 : positions rétablies dans l'ordre des id, par quiz
+    assert old_db.execute(
+        'SELECT id, position, archived FROM questions ORDER BY id').fetchall() == [
+        (10, 0, 0), (11, 0, 0), (12, 1, 0)]
+
+    # v3 : statistiques des parties passées, hôte (user 1) exclu
+    assert old_db.execute('''
+        SELECT game_id, question_id, total_answers, correct_count, incorrect_count
+        FROM game_question_stats ORDER BY question_id
+    ''').fetchall() == [(1, 10, 2, 1, 1), (1, 12, 1, 1, 0)]
+
+
+def test_migrate_is_idempotent(old_db):
+    migrate(old_db)
+    assert migrate(old_db) == []
+    assert old_db.execute('SELECT COUNT(*) FROM schema_version').fetchone()[0] == len(MIGRATIONS)
+
+
+def test_failed_migration_is_rolled_back(old_db, monkeypatch):
+    def broken(cursor):
+        cursor.execute('CREATE TABLE half_done (id INTEGER)')
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr('migrations.MIGRATIONS', MIGRATIONS[:1] + ((2, 'broken', broken),))
+    with pytest.raises(RuntimeError):
+        migrate(old_db)
+
+    assert schema_version(old_db) == 1
+    assert old_db.execute(
+        "SELECT name FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+
+
+def test_fresh_database_is_at_the_latest_version(database):
+    with database.connection() as conn:
+        assert schema_version(conn) == MIGRATIONS[-1][0]
@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+app = pytest.importorskip('app')
+
+
+def test_next_question_after_the_last_one_is_ignored(database, monkeypatch):
+    room_code = 'TESTNQ'
+    room = app.active_rooms[room_code] = {
+        'game_id': 1,
+        'host': 'host',
+        'host_id': '',
+        'quiz_id': 1,
+        'players': {},
+        'answered': app.AnswerBitmap(1),
+        'questions': [{'question': 'Q1'}],
+        '_packets': [],
+        'current_question': 0,
+        'state': 'waiting',
+        'start_time': None,
+        'last_activity': time.time(),
+        'version': 0,
+        'sessions': {}
+    }
+    saved = []
+    monkeypatch.setattr(app, 'save_finished_game', saved.append)
+    client = app.socketio.test_client(app.app)
+    try:
+        client.emit('join_room', {'room_code': room_code, 'username': 'host', 'is_host': True})
+        deadline = time.time() + 2
+        while room_code not in app.user_rooms.values() and time.time() < deadline:
+            app.socketio.sleep(0.01)
+
+        # Partie terminée : un next_question en double ne doit rien relancer
+        room['state'] = 'finished'
+        room['current_question'] = 1
+        client.emit('next_question', {})
+        app.socketio.sleep(0.2)
+
+        assert saved == []
+        assert room['current_question'] == 1
+        assert app.room_actors.actors[room_code].errors == 0
+    finally:
+        client.disconnect()
+        app.active_rooms.pop(room_code, None)
+        app.room_actors.stop(room_code)
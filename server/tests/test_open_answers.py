@@ -0,0 +1,52 @@
+from open_answers import normalize_answer, tally_for
+
+
+def submit(room, question_index, username, answer):
+    """Même ordre que handle_submit_open_answer : décompte, puis enregistrement"""
+    tally = tally_for(room, question_index)
+    room['open_answers'].setdefault(question_index, {})[username] = {
+        'username': username, 'answer': answer, 'timestamp': 0.0}
+    tally.add(answer)
+    return tally
+
+
+def counts(payload):
+    return {entry['key']: entry['count'] for entry in payload['answers']}
+
+
+def test_normalize_answer():
+    assert normalize_answer('  Paris,   FRANCE! ') == 'paris france'
+    assert normalize_answer('Élève') == 'eleve'
+    assert normalize_answer('?!') == ''
+
+
+def test_first_answer_counted_once():
+    room = {'open_answers': {}}
+    submit(room, 0, 'alice', 'Paris, France')
+    submit(room, 0, 'bob', 'paris france')
+    tally = submit(room, 0, 'carol', 'Lyon')
+
+    payload = tally.take_changes()
+    assert payload['total'] == 3
+    assert counts(payload) == {'paris france': 2, 'lyon': 1}
+    assert tally.entries['paris france'][0] == 'Paris, France'
+    # Rien de neuf depuis le dernier envoi
+    assert tally.take_changes()['answers'] == []
+
+
+def test_tally_rebuilt_after_restore():
+    room = {'open_answers': {}}
+    submit(room, 0, 'alice', 'Paris')
+    room.pop('_open_tally')  # room restaurée : le décompte n'est pas sauvegardé
+
+    tally = submit(room, 0, 'bob', 'paris')
+    assert tally.total == 2
+    assert counts(tally.snapshot()) == {'paris': 2}
+
+
+def test_new_question_starts_a_new_tally():
+    room = {'open_answers': {}}
+    submit(room, 0, 'alice', 'Paris')
+    tally = submit(room, 1, 'alice', 'Rome')
+    assert tally.question_index == 1
+    assert counts(tally.snapshot()) == {'rome': 1}
@@ -0,0 +1,66 @@
+import numpy as np
+
+from open_grading import cluster_duplicates, grade_answers
+
+
+class FakeModel:
+    """Embeddings fixés à la main ; compte les appels à encode"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = []
+
+    def encode(self, texts, normalize_embeddings=False, **kwargs):
+        self.calls.append(list(texts))
+        embeddings = np.array([self.vectors[text] for text in texts], dtype=float)
+        if normalize_embeddings:
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings
+
+
+MODEL_VECTORS = {
+    'Paris': [1.0, 0.0],
+    'paris': [0.99, 0.05],
+    'Paris, France': [0.95, 0.2],
+    'Lyon': [0.0, 1.0],
+}
+
+
+def test_answers_are_graded_in_one_batch():
+    model = FakeModel(MODEL_VECTORS)
+    grades = grade_answers(model, 'Paris', ['paris', 'Lyon', 'Paris, France'],
+                           threshold=0.7, duplicate_threshold=0.98)
+
+    assert model.calls == [['Paris', 'paris', 'Lyon', 'Paris, France']]
+    assert grades.correct == [True, False, True]
+    assert grades.similarities[1] == 0.0
+    assert grades.similarities[0] > grades.similarities[2] > 0.9
+    assert grades.clusters == [[0, 2], [1]]
+
+
+def test_without_reference_only_clusters_are_computed():
+    model = FakeModel(MODEL_VECTORS)
+    grades = grade_answers(model, None, ['paris', 'Lyon', 'Paris'], duplicate_threshold=0.9)
+    assert model.calls == [['paris', 'Lyon', 'Paris']]
+    assert grades.similarities is None and grades.correct is None
+    assert grades.clusters == [[0, 2], [1]]
+
+
+def test_no_answers_skips_the_model():
+    model = FakeModel(MODEL_VECTORS)
+    grades = grade_answers(model, 'Paris', [])
+    assert model.calls == []
+    assert (grades.similarities, grades.correct, grades.clusters) == ([], [], [])
+
+
+def test_cluster_duplicates_is_greedy_in_arrival_order():
+    pairwise = np.array([
+        [1.0, 0.95, 0.2, 0.0],
+        [0.95, 1.0, 0.95, 0.0],
+        [0.2, 0.95, 1.0, 0.0],
+        [0.0, 0.0, 0.0, 1.0],
+    ])
+    # 2 est proche de 1 mais pas de 0 : il ouvre son propre groupe
+    assert cluster_duplicates(pairwise, 0.9) == [[0, 1], [2], [3]]
+    # Chaque réponse appartient à son propre groupe même si la diagonale est basse
+    assert cluster_duplicates(np.zeros((2, 2)), 0.9) == [[0], [1]]
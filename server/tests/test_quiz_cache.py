@@ -0,0 +1,77 @@
+from quiz_cache import QuizCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entry_is_tied_to_updated_at():
+    cache = QuizCache()
+    cache.put(1, '2024-01-01 10:00:00', {'id': 1})
+    assert cache.get(1, '2024-01-01 10:00:00') == {'id': 1}
+    # Quiz modifié ailleurs : l'entrée périmée est écartée
+    assert cache.get(1, '2024-01-01 10:00:05') is None
+    assert cache.get(1, '2024-01-01 10:00:00') is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = QuizCache(ttl=10, clock=clock)
+    cache.put(1, 'v1', {'id': 1})
+    clock.now = 9.9
+    assert cache.get(1, 'v1') is not None
+    clock.now = 10
+    assert cache.get(1, 'v1') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QuizCache(maxsize=2)
+    cache.put(1, 'v', 'one')
+    cache.put(2, 'v', 'two')
+    cache.get(1, 'v')
+    cache.put(3, 'v', 'three')
+
+    assert cache.get(2, 'v') is None
+    assert cache.get(1, 'v') == 'one' and cache.get(3, 'v') == 'three'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_invalidate_and_disabled_cache():
+    cache = QuizCache()
+    cache.put(1, 'v', 'one')
+    cache.invalidate(1)
+    assert cache.get(1, 'v') is None
+
+    disabled = QuizCache(maxsize=0)
+    disabled.put(1, 'v', 'one')
+    assert disabled.get(1, 'v') is None
+
+
+def test_get_quiz_by_id_is_cached_and_invalidated(database):
+    with database.connection() as conn:
+        user_id = conn.execute(
+            "INSERT INTO users (username, password) VALUES ('host', 'x')").lastrowid
+    quiz_id = database.create_quiz('Quiz', '', user_id, [
+        {'question': 'Q1', 'type': 'qcm', 'option_a': 'A', 'option_b': 'B',
+         'correct_answer': 'A'}])
+
+    first = database.get_quiz_by_id(quiz_id)
+    misses = database.quiz_cache.stats()['misses']
+    # Copie rendue à l'appelant : la modifier ne touche pas le cache
+    first['questions'][0]['question'] = 'changed'
+    second = database.get_quiz_by_id(quiz_id)
+    assert second['questions'][0]['question'] == 'Q1'
+    assert database.quiz_cache.stats()['misses'] == misses
+
+    database.update_quiz(quiz_id, 'Quiz', '', [
+        {**second['questions'][0], 'question': 'Q1 bis'}])
+    assert database.get_quiz_by_id(quiz_id)['questions'][0]['question'] == 'Q1 bis'
+
+    database.delete_quiz(quiz_id)
+    assert database.get_quiz_by_id(quiz_id) is None
@@ -0,0 +1,24 @@
+import pytest
+
+app = pytest.importorskip('app')
+
+GENERATED = """1. What is the capital of France?
+Answer: Paris
+2. Who wrote Hamlet?
+Answer: William Shakespeare
+"""
+
+
+def test_ai_route_keeps_open_question_reference(database, monkeypatch):
+    monkeypatch.setattr(app, 'generate_quiz_from_wikipedia', lambda *args: GENERATED)
+    client = app.app.test_client()
+
+    response = client.post('/api/quizzes/ai', json={
+        'theme': 'geography', 'difficulty': 'easy', 'count': 2,
+        'qtype': 'Open', 'user_id': 1})
+    assert response.status_code == 201
+
+    quiz = database.get_quiz_by_id(response.get_json()['quiz_id'])
+    assert [(q['type'], q['correct_answer']) for q in quiz['questions']] == [
+        ('open_question', 'Paris'),
+        ('open_question', 'William Shakespeare')]
@@ -0,0 +1,44 @@
+from rate_limit import SocketRateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_then_steady_rate():
+    clock = FakeClock()
+    limiter = SocketRateLimiter(rate=1, burst=3, clock=clock)
+
+    assert [limiter.allow('sid-a') for _ in range(4)] == [True, True, True, False]
+    clock.now = 0.5
+    assert not limiter.allow('sid-a')
+    clock.now = 1.0
+    assert limiter.allow('sid-a')
+    assert not limiter.allow('sid-a')
+    assert limiter.stats() == {'sockets': 1, 'rejected': 3}
+
+
+def test_tokens_refill_up_to_the_burst():
+    clock = FakeClock()
+    limiter = SocketRateLimiter(rate=2, burst=2, clock=clock)
+    limiter.allow('sid-a')
+    limiter.allow('sid-a')
+
+    clock.now = 60
+    assert [limiter.allow('sid-a') for _ in range(3)] == [True, True, False]
+
+
+def test_sockets_have_separate_buckets():
+    clock = FakeClock()
+    limiter = SocketRateLimiter(rate=1, burst=1, clock=clock)
+    assert limiter.allow('sid-a')
+    assert not limiter.allow('sid-a')
+    assert limiter.allow('sid-b')
+
+    # Un socket oublié repart avec un seau plein
+    limiter.forget('sid-a')
+    assert limiter.allow('sid-a')
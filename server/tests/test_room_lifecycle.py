@@ -0,0 +1,43 @@
+from room_lifecycle import RoomReaper
+from room_store import LocalRedis, RedisHashMapping, RoomStateStore, decode_room, encode_room
+
+
+def make_store(rooms):
+    store = RoomStateStore(rooms, {}, {})
+    store.user_rooms.update({'sid-old': 'OLD', 'sid-new': 'NEW'})
+    store.user_sessions.update({'sid-old': 'alice', 'sid-new': 'bob'})
+    return store
+
+
+def test_sweep_evicts_idle_and_finished_rooms():
+    now = 10_000.0
+    store = make_store({
+        'OLD': {'state': 'waiting', 'last_activity': now - 2000},
+        'DONE': {'state': 'finished', 'finished_at': now - 400, 'last_activity': now - 400},
+        'NEW': {'state': 'playing', 'last_activity': now - 10},
+    })
+    evicted_rooms = []
+    reaper = RoomReaper(store, idle_ttl=1800, finished_ttl=300, on_evict=evicted_rooms.append)
+
+    assert reaper.sweep(now) == ['DONE', 'OLD']
+    assert sorted(evicted_rooms) == ['DONE', 'OLD']
+    assert list(store.rooms) == ['NEW']
+    assert store.user_rooms == {'sid-new': 'NEW'}
+    assert store.user_sessions == {'sid-new': 'bob'}
+    assert reaper.gauges()['rooms_by_state'] == {'playing': 1}
+
+
+def test_reaper_only_reads_owned_rooms():
+    client = LocalRedis()
+    shared = RedisHashMapping(client, 'rooms', encode=encode_room, decode=decode_room)
+    shared['MINE'] = {'state': 'playing', 'last_activity': 0}
+    shared['THEIRS'] = {'state': 'playing', 'last_activity': 0}
+
+    rooms = RedisHashMapping(client, 'rooms', encode=encode_room, decode=decode_room)
+    reaper = RoomReaper(RoomStateStore(rooms, {}, {}), idle_ttl=60,
+                        owns=lambda code: code == 'MINE')
+
+    assert reaper.gauges()['live_rooms'] == 1
+    assert reaper.sweep(now=1000) == ['MINE']
+    assert client.hexists('rooms', 'THEIRS') and not client.hexists('rooms', 'MINE')
+    assert rooms._cache == {}
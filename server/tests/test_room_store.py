@@ -0,0 +1,102 @@
+import sqlite3
+
+from player_state import AnswerBitmap, add_player
+from room_store import LocalRedis, RedisHashMapping, RoomStateStore, decode_room, encode_room
+from scoreboard import scoreboard_for
+
+
+def make_room():
+    room = {
+        'game_id': 7,
+        'host': 'host',
+        'questions': [{'question_text': 'Q1'}, {'question_text': 'Q2'}],
+        'players': {},
+        'answered': AnswerBitmap(2),
+        'open_answers': {1: {'bob': {'username': 'bob', 'answer': 'Paris', 'timestamp': 1.0}}},
+        'current_question': 1,
+        'state': 'playing'
+    }
+    alice = add_player(room, 'sid-a', 'alice')
+    bob = add_player(room, 'sid-b', 'bob')
+    alice.answers[0], alice.score = 2, 900
+    bob.answers[0], bob.score = 0, 0
+    room['answered'].mark(0, alice.slot)
+    room['answered'].mark(0, bob.slot)
+    scoreboard = scoreboard_for(room)
+    scoreboard.update('sid-a', alice.score)
+    scoreboard.update('sid-b', bob.score)
+    return room
+
+
+def snapshot_db():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('''
+        CREATE TABLE room_snapshots (
+            room_code TEXT PRIMARY KEY,
+            payload BLOB NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    ''')
+    return conn
+
+
+def assert_same_room(restored, room):
+    assert set(restored['players']) == {'sid-a', 'sid-b'}
+    for sid, player in room['players'].items():
+        assert restored['players'][sid].to_dict() == player.to_dict()
+    assert restored['answered'].to_dict() == room['answered'].to_dict()
+    assert restored['open_answers'] == room['open_answers']
+    assert restored['current_question'] == 1
+    # Le classement n'est pas sérialisé : il est reconstruit à l'identique
+    assert '_scoreboard' not in restored
+    assert scoreboard_for(restored).top() == scoreboard_for(room).top()
+
+
+def test_encode_decode_round_trip():
+    room = make_room()
+    assert_same_room(decode_room(encode_room(room).encode('utf-8')), room)
+
+
+def test_snapshot_restore_cycle():
+    room = make_room()
+    conn = snapshot_db()
+    assert RoomStateStore({'ABCD': room}, {}, {}).snapshot(conn) == 1
+
+    store = RoomStateStore({}, {}, {})
+    assert store.restore(conn) == 1
+    assert_same_room(store.rooms['ABCD'], room)
+
+    # Une room disparue est retirée au prochain instantané
+    RoomStateStore({}, {}, {}).snapshot(conn)
+    assert conn.execute('SELECT COUNT(*) FROM room_snapshots').fetchone()[0] == 0
+
+
+def test_snapshot_skips_rooms_of_other_workers():
+    client = LocalRedis()
+    owner = RedisHashMapping(client, 'rooms', encode=encode_room, decode=decode_room)
+    owner['MINE'] = make_room()
+    owner['THEIRS'] = make_room()
+
+    rooms = RedisHashMapping(client, 'rooms', encode=encode_room, decode=decode_room)
+    conn = snapshot_db()
+    RoomStateStore(rooms, {}, {}).snapshot(conn, owns=lambda code: code == 'MINE')
+
+    codes = [row[0] for row in conn.execute('SELECT room_code FROM room_snapshots')]
+    assert codes == ['MINE']
+    # Relue pour l'instantané seulement : pas gardée dans le cache du worker
+    assert rooms._cache == {}
+
+
+def test_owned_rooms_does_not_cache_other_workers_rooms():
+    client = LocalRedis()
+    owner = RedisHashMapping(client, 'rooms', encode=encode_room, decode=decode_room)
+    owner['MINE'] = make_room()
+    owner['THEIRS'] = make_room()
+
+    rooms = RedisHashMapping(client, 'rooms', encode=encode_room, decode=decode_room)
+    store = RoomStateStore(rooms, {}, {})
+    owned = dict(store.owned_rooms(owns=lambda code: code == 'MINE'))
+
+    assert list(owned) == ['MINE']
+    assert set(owned['MINE']['players']) == {'sid-a', 'sid-b'}
+    assert rooms._cache == {}
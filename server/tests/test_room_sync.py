@@ -0,0 +1,50 @@
+import pytest
+
+from room_sync import RoomDeltas, deltas_for, parse_version
+
+
+def test_since_returns_missed_events():
+    deltas = RoomDeltas()
+    deltas.record('player_joined', {'added': ['a']})
+    deltas.record('new_question', {'index': 0})
+
+    assert deltas.since(2) == []
+    assert deltas.since(1) == [['new_question', {'index': 0}, 2]]
+    assert deltas.since(0) == [['player_joined', {'added': ['a']}, 1],
+                               ['new_question', {'index': 0}, 2]]
+
+
+def test_since_asks_for_a_snapshot_when_out_of_range():
+    deltas = RoomDeltas(capacity=2)
+    for index in range(4):
+        deltas.record('new_question', {'index': index})
+
+    assert deltas.since(1) is None  # sortie de l'anneau
+    assert deltas.since(2) == [['new_question', {'index': 2}, 3],
+                               ['new_question', {'index': 3}, 4]]
+    assert deltas.since(5) is None  # version inconnue du serveur
+    assert deltas.since(None) is None
+
+
+@pytest.mark.parametrize('value, expected', [
+    (3, 3), ('3', 3), (' 12 ', 12), (0, 0),
+    ('3.5', None), (3.5, None), ('abc', None), (-1, None), (True, None),
+    (None, None), ([1], None), ({}, None),
+])
+def test_parse_version(value, expected):
+    assert parse_version(value) == expected
+
+
+def test_invalid_client_version_falls_back_to_snapshot():
+    deltas = RoomDeltas()
+    deltas.record('time_up', None)
+    assert deltas.since(parse_version('not-a-version')) is None
+    assert deltas.since(parse_version('1')) == []
+
+
+def test_restored_room_resumes_at_saved_version():
+    room = {'version': 7}
+    deltas = deltas_for(room, capacity=4)
+    assert deltas.version == 7
+    assert deltas.since(7) == []
+    assert deltas.since(6) is None
@@ -0,0 +1,75 @@
+from scheduler import TimingWheel
+
+
+def test_callback_fires_on_its_tick():
+    wheel = TimingWheel(tick=0.1, slots=8)
+    fired = []
+    wheel.schedule(0.3, fired.append, 'q1')
+    assert len(wheel) == 1
+
+    wheel.advance()
+    wheel.advance()
+    assert fired == []
+    wheel.advance()
+    assert fired == ['q1']
+    assert len(wheel) == 0
+
+
+def test_delay_longer_than_one_turn():
+    wheel = TimingWheel(tick=0.1, slots=4)
+    fired = []
+    # 10 ticks sur une roue de 4 cases : le slot est visité deux fois avant l'échéance
+    wheel.schedule(1.0, fired.append, 'late')
+    for _ in range(9):
+        wheel.advance()
+    assert fired == []
+    wheel.advance()
+    assert fired == ['late']
+
+
+def test_short_delay_waits_at_least_one_tick():
+    wheel = TimingWheel(tick=0.1, slots=8)
+    fired = []
+    wheel.schedule(0, fired.append, 'now')
+    assert fired == []
+    wheel.advance()
+    assert fired == ['now']
+
+
+def test_cancelled_timer_never_fires():
+    wheel = TimingWheel(tick=0.1, slots=8)
+    fired = []
+    handle = wheel.schedule(0.2, fired.append, 'q1')
+    wheel.cancel(handle)
+    wheel.cancel(handle)
+    wheel.cancel(None)
+    assert len(wheel) == 0
+
+    for _ in range(3):
+        wheel.advance()
+    assert fired == []
+
+
+def test_cancel_after_firing_is_a_noop():
+    wheel = TimingWheel(tick=0.1, slots=8)
+    fired = []
+    handle = wheel.schedule(0.1, fired.append, 'q1')
+    other = wheel.schedule(0.5, fired.append, 'q2')
+    wheel.advance()
+    wheel.cancel(handle)
+    assert len(wheel) == 1
+    wheel.cancel(other)
+    assert len(wheel) == 0
+
+
+def test_failing_callback_does_not_stop_the_others():
+    wheel = TimingWheel(tick=0.1, slots=8)
+    fired = []
+
+    def boom():
+        raise RuntimeError('boom')
+
+    wheel.schedule(0.1, boom)
+    wheel.schedule(0.1, fired.append, 'ok')
+    wheel.advance()
+    assert fired == ['ok']
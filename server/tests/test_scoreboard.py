@@ -0,0 +1,85 @@
+import random
+
+from player_state import AnswerBitmap, add_player
+from scoreboard import Scoreboard, scoreboard_for
+
+
+def test_ranks_follow_score_then_arrival_order():
+    scoreboard = Scoreboard()
+    scoreboard.update('a', 10, 'alice')
+    scoreboard.update('b', 30, 'bob')
+    scoreboard.update('c', 10, 'carol')
+
+    assert [p['id'] for p in scoreboard.top()] == ['b', 'a', 'c']
+    assert scoreboard.rank('b') == 1
+    # À score égal, le premier arrivé reste devant
+    assert scoreboard.rank('a') == 2 and scoreboard.rank('c') == 3
+    assert scoreboard.top(1) == [{'id': 'b', 'username': 'bob', 'score': 30, 'rank': 1}]
+
+
+def test_update_moves_player_without_duplicating_it():
+    scoreboard = Scoreboard()
+    scoreboard.update('a', 10)
+    scoreboard.update('b', 20)
+    scoreboard.update('a', 50)
+
+    assert len(scoreboard) == 2
+    assert scoreboard.score('a') == 50
+    assert [p['id'] for p in scoreboard.top()] == ['a', 'b']
+
+
+def test_matches_a_full_sort():
+    rng = random.Random(0)
+    scoreboard = Scoreboard()
+    scores = {}
+    for _ in range(500):
+        pid = f'p{rng.randrange(60)}'
+        scores[pid] = rng.randrange(2000)
+        scoreboard.update(pid, scores[pid])
+        if rng.random() < 0.05:
+            scoreboard.remove(pid)
+            del scores[pid]
+
+    expected = sorted(scores.values(), reverse=True)
+    assert [p['score'] for p in scoreboard.top()] == expected
+    for pid in scores:
+        assert scoreboard.top()[scoreboard.rank(pid) - 1]['id'] == pid
+
+
+def test_pop_deltas_returns_changed_players_once():
+    scoreboard = Scoreboard()
+    scoreboard.update('a', 10, 'alice')
+    scoreboard.update('b', 20, 'bob')
+    scoreboard.pop_deltas()
+
+    scoreboard.update('a', 40)
+    assert scoreboard.pop_deltas() == [{'id': 'a', 'username': 'alice', 'score': 40, 'rank': 1}]
+    assert scoreboard.pop_deltas() == []
+
+
+def test_remove_and_rename():
+    scoreboard = Scoreboard()
+    scoreboard.update('old', 20, 'alice')
+    scoreboard.update('b', 10, 'bob')
+
+    scoreboard.rename('old', 'new')
+    assert 'old' not in scoreboard
+    assert scoreboard.rank('new') == 1
+    assert scoreboard.top(1)[0]['username'] == 'alice'
+
+    scoreboard.remove('new')
+    assert scoreboard.rank('new') is None
+    assert [p['id'] for p in scoreboard.top()] == ['b']
+
+
+def test_scoreboard_for_rebuilds_from_players_without_host():
+    room = {'questions': [{}], 'players': {}, 'answered': AnswerBitmap(1)}
+    host = add_player(room, 'sid-h', 'host')
+    host.is_host = True
+    add_player(room, 'sid-a', 'alice').score = 5
+    add_player(room, 'sid-b', 'bob').score = 7
+
+    scoreboard = scoreboard_for(room)
+    assert scoreboard is room['_scoreboard'] is scoreboard_for(room)
+    assert [p['id'] for p in scoreboard.top()] == ['sid-b', 'sid-a']
+    assert scoreboard.pop_deltas() == []
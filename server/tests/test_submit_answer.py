@@ -0,0 +1,48 @@
+import time
+
+import pytest
+
+app = pytest.importorskip('app')
+
+
+def test_answer_after_time_up_is_rejected(database, monkeypatch):
+    room_code = 'TESTSA'
+    room = app.active_rooms[room_code] = {
+        'game_id': 1,
+        'host': 'host',
+        'host_id': '',
+        'quiz_id': 1,
+        'players': {},
+        'answered': app.AnswerBitmap(1),
+        'questions': [{'question': 'Q1'}],
+        '_packets': [],
+        'current_question': 0,
+        'state': 'waiting',
+        'start_time': None,
+        'last_activity': time.time(),
+        'version': 0,
+        'sessions': {}
+    }
+    client = app.socketio.test_client(app.app)
+    try:
+        client.emit('join_room', {'room_code': room_code, 'username': 'alice'})
+        deadline = time.time() + 2
+        while not room['players'] and time.time() < deadline:
+            app.socketio.sleep(0.01)
+
+        # Question envoyée puis close (time_up)
+        room['state'] = 'playing'
+        room['asked_question'] = 0
+        room['closed_question'] = 0
+        client.get_received()
+        client.emit('submit_answer', {'answer': 1})
+        app.socketio.sleep(0.2)
+
+        errors = [msg['args'][0]['message'] for msg in client.get_received()
+                  if msg['name'] == 'error']
+        assert errors == ['Time has elapsed, cannot submit answer']
+        assert 'score_window' not in room
+    finally:
+        client.disconnect()
+        app.active_rooms.pop(room_code, None)
+        app.room_actors.stop(room_code)
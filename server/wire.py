@@ -0,0 +1,134 @@
+import json
+import threading
+
+from socketio import packet
+
+
+class PreEncoded:
+    """Payload Socket.IO sérialisé une seule fois.
+
+    Le texte JSON est calculé à la construction et recopié tel quel dans
+    chaque paquet émis, sans re-sérialiser le dictionnaire.
+    """
+
+    __slots__ = ('data', 'text')
+
+    def __init__(self, data):
+        self.data = data
+        self.text = json.dumps(data, separators=(',', ':'))
+
+    def __len__(self):
+        return len(self.text)
+
+
+def _default(obj):
+    if isinstance(obj, PreEncoded):
+        return obj.data
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj, **kwargs):
+    """Module JSON de python-socketio : insère les PreEncoded sans les ré-encoder"""
+    kwargs.setdefault('default', _default)
+    # Un paquet d'événement est la liste [event, arg1, arg2...]
+    if isinstance(obj, list) and any(isinstance(item, PreEncoded) for item in obj):
+        return '[' + ','.join(
+            item.text if isinstance(item, PreEncoded) else json.dumps(item, **kwargs)
+            for item in obj
+        ) + ']'
+    return json.dumps(obj, **kwargs)
+
+
+def loads(s, **kwargs):
+    return json.loads(s, **kwargs)
+
+
+class PayloadStats:
+    """Taille des paquets encodés, par type d'événement.
+
+    Un paquet diffusé à une room n'est encodé qu'une fois : les tailles sont
+    donc par trame, pas multipliées par le nombre de destinataires.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = {}
+
+    def record(self, event, size):
+        with self._lock:
+            stats = self._events.get(event)
+            if stats is None:
+                stats = self._events[event] = {
+                    'frames': 0, 'total_bytes': 0, 'max_bytes': 0}
+            stats['frames'] += 1
+            stats['total_bytes'] += size
+            stats['max_bytes'] = max(stats['max_bytes'], size)
+
+    def report(self):
+        with self._lock:
+            return {
+                event: dict(stats, avg_bytes=round(
+                    stats['total_bytes'] / stats['frames']))
+                for event, stats in sorted(self._events.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+
+
+payload_stats = PayloadStats()
+
+
+def _record(pkt, encoded):
+    if pkt.packet_type not in (packet.EVENT, packet.BINARY_EVENT) or not pkt.data:
+        return
+    if isinstance(encoded, list):  # paquet binaire : en-tête + pièces jointes
+        size = sum(len(part) for part in encoded)
+    elif isinstance(encoded, str) and not encoded.isascii():
+        size = len(encoded.encode('utf-8'))
+    else:
+        size = len(encoded)
+    payload_stats.record(pkt.data[0], size)
+
+
+class MeteredPacket(packet.Packet):
+    """Paquet JSON standard qui comptabilise la taille de chaque événement"""
+
+    def encode(self):
+        encoded = super().encode()
+        _record(self, encoded)
+        return encoded
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, PreEncoded):
+        return obj.data
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def packet_class(serializer='json'):
+    """Classe de paquet python-socketio pour SOCKETIO_SERIALIZER (json ou msgpack).
+
+    msgpack est optionnel ; les clients doivent alors utiliser
+    socket.io-msgpack-parser.
+    """
+    if serializer == 'json':
+        return MeteredPacket
+    if serializer != 'msgpack':
+        raise ValueError(f"Unknown Socket.IO serializer: {serializer}")
+
+    try:
+        import msgpack
+        from socketio.msgpack_packet import MsgPackPacket
+    except ImportError:
+        raise RuntimeError(
+            "SOCKETIO_SERIALIZER=msgpack requires the 'msgpack' package")
+
+    class MeteredMsgPackPacket(MsgPackPacket):
+        def encode(self):
+            encoded = msgpack.dumps(self._to_dict(), default=_msgpack_default)
+            _record(self, encoded)
+            return encoded
+
+    return MeteredMsgPackPacket
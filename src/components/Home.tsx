@@ -4,6 +4,7 @@ import { useAuth } from '../context/AuthContext';
 import axios from 'axios';
 import { LogOut, Users, Trophy, Play, Plus, BookOpen, FileText } from 'lucide-react';
 import { io } from "socket.io-client";
+import { resolveRoomSocketUrl } from '../roomSocket';
 import AIQuizModal from '../components/AIQuizModal';
 import { motion, AnimatePresence } from 'framer-motion';
 import { useInView } from 'react-intersection-observer';
@@ -102,7 +103,7 @@ const Home: React.FC = () => {
       });
 
       const roomData = roomResponse.data.room;
-      const socket = io('http://localhost:5000');
+      const socket = io(await resolveRoomSocketUrl(roomData.room_code));
 
       socket.on('connect', () => {
         socket.emit('create_room', {
@@ -1,7 +1,8 @@
-import React, { useEffect, useState, useMemo } from 'react';
+import React, { useEffect, useState, useMemo, useRef } from 'react';
 import { useParams, useNavigate, useLocation } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
 import { io, Socket } from 'socket.io-client';
+import { resolveRoomSocketUrl } from '../roomSocket';
 import { Clock, Users, Award, QrCode, ArrowRight, Check, X } from 'lucide-react';
 import { QRCodeSVG } from 'qrcode.react';
 import Confetti from 'react-confetti';
@@ -143,12 +144,23 @@ const Quiz: React.FC = () => {
   const [openAnswer, setOpenAnswer] = useState('');
   const [debouncedOpenAnswer, setDebouncedOpenAnswer] = useState('');
   const [currentQuestionIndex, setCurrentQuestionIndex] = useState<number>(0);
+  // Réponses ouvertes distinctes (clé normalisée côté serveur) et leur nombre
   const [openAnswersList, setOpenAnswersList] = useState<Array<{
-    username: string;
+    key: string;
     answer: string;
-    questionNumber?: number;
+    count: number;
   }>>([]);
+  const [openAnswerTotal, setOpenAnswerTotal] = useState(0);
+  const openAnswerTotalRef = useRef(0);
+  // Dernière version d'état reçue : présentée au serveur pour reprendre après une coupure
+  const roomVersionRef = useRef<number | null>(null);
   const [newAnswerCount, setNewAnswerCount] = useState(0);
+  const [openClusters, setOpenClusters] = useState<Array<{
+    answer: string;
+    count: number;
+    answers: string[];
+    is_correct: boolean | null;
+  }> | null>(null);
   const [searchTerm, setSearchTerm] = useState('');
   const [showConfetti, setShowConfetti] = useState(false);
   const [showScores, setShowScores] = useState(false);
@@ -156,7 +168,9 @@ const Quiz: React.FC = () => {
   const [showOpenAnswers, setShowOpenAnswers] = useState(false);
   const [isPreparing, setIsPreparing] = useState(false);
   const [preparationCountdown, setPreparationCountdown] = useState(5);
-  const [nextQuestion, setNextQuestion] = useState<Question | null>(null);
+  const [nextQuestion, setNextQuestion] = useState<{ type: Question['type']; time_limit: number } | null>(null);
+  const [myRank, setMyRank] = useState<{ rank: number; score: number } | null>(null);
+  const [histogram, setHistogram] = useState<{ counts: number[]; no_answer: number; total_answers: number } | null>(null);
 
   const username = location.state?.username || user?.username;
 
@@ -179,131 +193,245 @@ const Quiz: React.FC = () => {
 
   const filteredAnswers = useMemo(() => {
     return openAnswersList.filter(answer =>
-      answer.answer.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      answer.username.toLowerCase().includes(searchTerm.toLowerCase())
+      answer.answer.toLowerCase().includes(searchTerm.toLowerCase())
     );
   }, [openAnswersList, searchTerm]);
 
   useEffect(() => {
     if (!username || !roomCode) return;
 
-    const newSocket = io('http://localhost:5000', {
-      autoConnect: true,
-      reconnectionAttempts: 5,
-      reconnectionDelay: 1000,
-    });
+    const connectToRoom = (socketUrl: string) => {
+      const newSocket = io(socketUrl, {
+        autoConnect: true,
+        reconnectionAttempts: 5,
+        reconnectionDelay: 1000,
+      });
 
-    console.log('[SOCKET] Creating new socket:', newSocket.id);
-    setSocket(newSocket);
-    setQrCodeData(`http://localhost:5173/quiz/${roomCode}`);
+      console.log('[SOCKET] Creating new socket:', newSocket.id);
+      setSocket(newSocket);
+      setQrCodeData(`http://localhost:5173/quiz/${roomCode}`);
 
-    const handleConnect = () => {
-      console.log('[SOCKET] Connected with ID:', newSocket.id);
-      newSocket.emit('join_room', {
-        username: username,
-        room_code: roomCode,
-        is_host: user !== null
+      const sessionKey = `quiz-session:${roomCode}:${username}`;
+
+      const joinRoom = () => {
+        newSocket.emit('join_room', {
+          username: username,
+          room_code: roomCode,
+          is_host: user !== null
+        });
+      };
+
+      const handleConnect = () => {
+        console.log('[SOCKET] Connected with ID:', newSocket.id);
+        // Reconnexion : reprendre sa place (score, réponses) plutôt que rejoindre
+        const token = sessionStorage.getItem(sessionKey);
+        if (token) {
+          newSocket.emit('resume_room', {
+            room_code: roomCode,
+            token,
+            version: roomVersionRef.current
+          });
+        } else {
+          joinRoom();
+        }
+      };
+
+      const handleOpenAnswerTally = (data: any) => {
+        if (user !== null) {
+          // Seules les réponses modifiées depuis la trame précédente sont envoyées
+          setOpenAnswersList(prev => {
+            const byKey = new Map(prev.map(entry => [entry.key, entry]));
+            data.answers.forEach((entry: { key: string; answer: string; count: number }) => {
+              byKey.set(entry.key, entry);
+            });
+            return Array.from(byKey.values()).sort((a, b) => b.count - a.count);
+          });
+          setNewAnswerCount(prev => prev + Math.max(0, data.total - openAnswerTotalRef.current));
+          openAnswerTotalRef.current = data.total;
+          setOpenAnswerTotal(data.total);
+        }
+      };
+
+      newSocket.on('connect', handleConnect);
+      newSocket.on('room_session', (data) => {
+        sessionStorage.setItem(sessionKey, data.token);
+        roomVersionRef.current = data.version;
+      });
+      newSocket.on('resume_failed', () => {
+        sessionStorage.removeItem(sessionKey);
+        roomVersionRef.current = null;
+        joinRoom();
+      });
+      // Les événements diffusés à toute la room portent la version en second argument
+      newSocket.onAny((_event, _data, version) => {
+        if (typeof version === 'number') roomVersionRef.current = version;
+      });
+      newSocket.on('room_sync', (data) => {
+        if (data.deltas) {
+          // Seulement les événements manqués, rejoués dans l'ordre
+          data.deltas.forEach(([event, payload, version]: [string, any, number]) => {
+            newSocket.listeners(event).forEach(listener => listener(payload, version));
+          });
+        } else {
+          const snapshot = data.snapshot;
+          setPlayers(snapshot.players.map((player: Player) => ({ ...player, isHost: false })));
+          setGameState(snapshot.state);
+          if (snapshot.question) {
+            setIsPreparing(false);
+            setCurrentQuestion(snapshot.question);
+            setCurrentQuestionIndex(snapshot.question.question_number - 1);
+            setTimeLeft(snapshot.time_left);
+            setCanAnswer(!snapshot.time_up);
+            setShowNextButton(snapshot.time_up && user !== null);
+          }
+        }
+        if (data.me) {
+          setMyRank({ rank: data.me.rank, score: data.me.score });
+          setAnswerSubmitted(data.me.answered);
+          if (data.me.answered) setCanAnswer(false);
+        }
+        roomVersionRef.current = data.version;
+      });
+      // Mesure du RTT par le serveur (compensation de latence dans le score)
+      newSocket.on('rtt_ping', (data) => newSocket.emit('rtt_pong', data));
+      // Trame groupée par le serveur (une par room et par tick) : rejouée vers les handlers habituels
+      newSocket.on('batch', (data) => {
+        data.events.forEach(([event, payload]: [string, any]) => {
+          newSocket.listeners(event).forEach(listener => listener(payload));
+        });
+      });
+      newSocket.on('open_answer_tally', handleOpenAnswerTally);
+      // Correction automatique à la clôture : réponses quasi identiques regroupées
+      newSocket.on('open_answer_clusters', (data) => {
+        if (user !== null) setOpenClusters(data.clusters);
+      });
+      newSocket.on('room_joined', () => setIsHost(user !== null));
+      newSocket.on('room_created', () => setIsHost(user !== null));
+      // Liste complète à l'arrivée, puis arrivées/départs regroupés par le serveur
+      newSocket.on('player_joined', (data) => {
+        if (data.players) {
+          const playersWithHostFlag = data.players.map((player: Player) => ({
+            ...player,
+            isHost: player.id === newSocket.id && user !== null
+          }));
+          setPlayers(playersWithHostFlag);
+          return;
+        }
+        setPlayers(prev => {
+          const removed = new Set<string>(data.removed);
+          const byId = new Map(prev
+            .filter(player => !removed.has(player.id))
+            .map(player => [player.id, player]));
+          data.added.forEach((player: Player) => {
+            byId.set(player.id, { ...byId.get(player.id), ...player, isHost: false });
+          });
+          return Array.from(byId.values());
+        });
+      });
+      newSocket.on('game_started', () => {
+        setGameState('playing');
+        setOpenAnswersList([]);
+        // Ajouter la préparation pour la première question
+        setIsPreparing(true);
+        setPreparationCountdown(5);
+      });
+      newSocket.on('preparing_next', (data) => {
+        setIsPreparing(true);
+        setPreparationCountdown(5);
+        setCurrentQuestionIndex(data.question_number - 1);
+        setCanAnswer(false);
+        setAnswerSubmitted(false);
+        setSelectedAnswer(null);
+        setOpenAnswer('');
+        setNextQuestion(data.preload ?? null);
+
+        // Précharger l'image de la prochaine question pendant le compte à rebours
+        if (data.preload?.image_url) {
+          new Image().src = data.preload.image_url;
+        }
       });
-    };
 
-    const handleNewOpenAnswer = (data: any) => {
-      if (user !== null) {
-        setOpenAnswersList(prev => [...prev, {
-          username: data.username,
-          answer: data.answer,
-          questionNumber: data.question_index + 1
-        }]);
-        setNewAnswerCount(prev => prev + 1);
-      }
-    };
+      newSocket.on('new_question', (data) => {
+        setIsPreparing(false);
+        setCurrentQuestion(data);
+        setSelectedAnswer(null);
+        setCurrentQuestionIndex(data.question_number - 1);
+        setAnswerSubmitted(false);
+        setTimeLeft(data.time_limit || 15);
+        setCanAnswer(true);
+        setShowNextButton(false);
+        setOpenAnswersList([]);
+        setOpenAnswerTotal(0);
+        openAnswerTotalRef.current = 0;
+        setOpenAnswer('');
+        setNewAnswerCount(0);
+        setSearchTerm('');
+        setShowScoresModal(false);
+        setShowOpenAnswers(false);
+        setOpenClusters(null);
+        setHistogram(null);
+      });
 
-    newSocket.on('connect', handleConnect);
-    newSocket.on('new_open_answer', handleNewOpenAnswer);
-    newSocket.on('room_joined', () => setIsHost(user !== null));
-    newSocket.on('room_created', () => setIsHost(user !== null));
-    newSocket.on('player_joined', (data) => {
-      const playersWithHostFlag = data.players.map((player: Player) => ({
-        ...player,
-        isHost: player.id === newSocket.id && user !== null
-      }));
-      setPlayers(playersWithHostFlag);
-    });
-    newSocket.on('player_left', (data) =>
-      setPlayers(prev => prev.filter(player => player.id !== data.user_id))
-    );
-    newSocket.on('game_started', () => {
-      setGameState('playing');
-      setOpenAnswersList([]);
-      // Ajouter la préparation pour la première question
-      setIsPreparing(true);
-      setPreparationCountdown(5);
-    });
-    newSocket.on('preparing_next', (data) => {
-      setIsPreparing(true);
-      setPreparationCountdown(5);
-      setCurrentQuestionIndex(data.question_number - 1);
-      setCanAnswer(false);
-      setAnswerSubmitted(false);
-      setSelectedAnswer(null);
-      setOpenAnswer('');
-      setNextQuestion(null); // reset
+      newSocket.on('time_up', () => {
+        setCanAnswer(false);
+        if (user !== null) {
+          setShowNextButton(true);
+        }
+      });
 
-      // Anticiper la prochaine question (à index `question_number - 1`)
-      const targetIndex = data.question_number - 1;
-      if (Array.isArray(data.questions) && data.questions[targetIndex]) {
-        setNextQuestion(data.questions[targetIndex]);
-      }
-    });
+      // Hôte : top K + joueurs modifiés depuis la dernière mise à jour
+      newSocket.on('update_scores', (data) => {
+        setPlayers(prev => {
+          const byId = new Map(prev.map(player => [player.id, player]));
+          [...data.top, ...data.deltas].forEach((player: Player) => {
+            byId.set(player.id, { ...byId.get(player.id), ...player, isHost: false });
+          });
+          return Array.from(byId.values());
+        });
+      });
 
-    newSocket.on('new_question', (data) => {
-      setIsPreparing(false);
-      setCurrentQuestion(data);
-      setSelectedAnswer(null);
-      setCurrentQuestionIndex(data.question_number - 1);
-      setAnswerSubmitted(false);
-      setTimeLeft(data.time_limit || 15);
-      setCanAnswer(true);
-      setShowNextButton(false);
-      setOpenAnswersList([]);
-      setOpenAnswer('');
-      setNewAnswerCount(0);
-      setSearchTerm('');
-      setShowScoresModal(false);
-      setShowOpenAnswers(false);
-    });
+      // Hôte : répartition des réponses, au plus une mise à jour par intervalle
+      newSocket.on('answer_histogram', (data) => {
+        setHistogram(data);
+      });
 
-    newSocket.on('time_up', () => {
-      setCanAnswer(false);
-      if (user !== null) {
-        setShowNextButton(true);
-      }
-    });
+      // Joueur : uniquement son propre rang
+      newSocket.on('player_rank', (data) => {
+        setMyRank({ rank: data.rank, score: data.score });
+      });
 
-    newSocket.on('update_scores', (data) => {
-      const playersWithHostFlag = data.players.map((player: Player) => ({
-        ...player,
-        isHost: player.id === newSocket.id && user !== null
-      }));
-      setPlayers(playersWithHostFlag);
-    });
+      newSocket.on('game_over', (data) => {
+        const playersWithHostFlag = data.players.map((player: Player) => ({
+          ...player,
+          isHost: player.id === newSocket.id && user !== null
+        }));
+        setGameState('finished');
+        setPlayers(playersWithHostFlag);
+        setShowConfetti(true);
+        setTimeout(() => setShowConfetti(false), 8000);
+        setShowScores(false);
+      });
+      newSocket.on('error', (data) => setError(data.message));
+
+      return () => {
+        newSocket.off('connect', handleConnect);
+        newSocket.offAny();
+        newSocket.off('open_answer_tally', handleOpenAnswerTally);
+        newSocket.off('open_answer_clusters');
+        newSocket.disconnect();
+      };
+    };
 
-    newSocket.on('game_over', (data) => {
-      const playersWithHostFlag = data.players.map((player: Player) => ({
-        ...player,
-        isHost: player.id === newSocket.id && user !== null
-      }));
-      setGameState('finished');
-      setPlayers(playersWithHostFlag);
-      setShowConfetti(true);
-      setTimeout(() => setShowConfetti(false), 8000);
-      setShowScores(false);
+    // La room peut être servie par un autre worker que l'API
+    let cancelled = false;
+    let disconnect: (() => void) | undefined;
+    resolveRoomSocketUrl(roomCode).then((socketUrl) => {
+      if (!cancelled) disconnect = connectToRoom(socketUrl);
     });
-    newSocket.on('error', (data) => setError(data.message));
 
     return () => {
-      newSocket.off('connect', handleConnect);
-      newSocket.off('new_open_answer', handleNewOpenAnswer);
-      newSocket.disconnect();
+      cancelled = true;
+      disconnect?.();
     };
   }, [roomCode, username, user?.id]);
 
@@ -536,7 +664,11 @@ const Quiz: React.FC = () => {
 
           <div className="mb-6">
             <div className="bg-gray-100 text-gray-800 p-6 rounded-lg shadow-lg">
-              <h3 className="text-2xl font-semibold text-center">{nextQuestion?.question || "Chargement..."}</h3>
+              <h3 className="text-2xl font-semibold text-center">
+                {nextQuestion
+                  ? `${nextQuestion.type === 'open_question' ? 'Question ouverte' : nextQuestion.type === 'true_false' ? 'Vrai ou faux' : 'QCM'} · ${nextQuestion.time_limit}s`
+                  : "Chargement..."}
+              </h3>
 
             </div>
           </div>
@@ -660,6 +792,11 @@ const Quiz: React.FC = () => {
                         className={`${trueFalseColors[index]} text-white p-6 rounded-lg flex flex-col items-center justify-center shadow-lg relative transition-all ${!canAnswer && isCorrect ? 'ring-4 ring-green-400' : ''}`}
                       >
                         <div className="text-4xl font-bold mb-2">{option}</div>
+                        {histogram && (
+                          <div className="absolute bottom-2 left-2 bg-black bg-opacity-30 rounded-full px-3 py-1 text-sm font-bold">
+                            {histogram.counts[index] ?? 0}
+                          </div>
+                        )}
                         {!canAnswer && isCorrect && (
                           <div className="absolute top-2 right-2 bg-green-500 rounded-full p-1">
                             <Check size={24} />
@@ -680,6 +817,11 @@ const Quiz: React.FC = () => {
                       >
                         <div className="text-4xl font-bold mb-2">{shapes[index]}</div>
                         <div className="text-lg text-center">{option}</div>
+                        {histogram && (
+                          <div className="absolute bottom-2 left-2 bg-black bg-opacity-30 rounded-full px-3 py-1 text-sm font-bold">
+                            {histogram.counts[index] ?? 0}
+                          </div>
+                        )}
                         {!canAnswer && isCorrect && (
                           <div className="absolute top-2 right-2 bg-green-500 rounded-full p-1">
                             <Check size={24} />
@@ -699,7 +841,7 @@ const Quiz: React.FC = () => {
                   <>
                     <div className="flex justify-between items-center mb-4">
                       <h3 className="text-xl font-bold text-gray-800">
-                        Réponses anonymes ({openAnswersList.length}/{getRegularPlayers.length})
+                        Réponses anonymes ({openAnswerTotal}/{getRegularPlayers.length})
                       </h3>
                       <div className="flex space-x-2">
                         <button
@@ -721,13 +863,28 @@ const Quiz: React.FC = () => {
                     </div>
 
                     <div className="max-h-96 overflow-y-auto space-y-2">
-                      {filteredAnswers.length > 0 ? (
-                        filteredAnswers.map((response, index) => (
+                      {openClusters ? (
+                        openClusters.map((cluster, index) => (
+                          <div
+                            key={`cluster-${index}`}
+                            className={`bg-white p-3 rounded-lg text-gray-800 flex justify-between items-start border-l-4 ${cluster.is_correct === true ? 'border-green-500' : cluster.is_correct === false ? 'border-red-500' : 'border-gray-300'}`}
+                          >
+                            <p className="whitespace-pre-wrap">{cluster.answer}</p>
+                            {cluster.count > 1 && (
+                              <span className="ml-3 bg-gray-200 rounded-full px-2 text-sm font-bold">×{cluster.count}</span>
+                            )}
+                          </div>
+                        ))
+                      ) : filteredAnswers.length > 0 ? (
+                        filteredAnswers.map((response) => (
                           <div
-                            key={`${response.username}-${index}`}
-                            className="bg-white p-3 rounded-lg text-gray-800"
+                            key={response.key}
+                            className="bg-white p-3 rounded-lg text-gray-800 flex justify-between items-start"
                           >
                             <p className="whitespace-pre-wrap">{response.answer}</p>
+                            {response.count > 1 && (
+                              <span className="ml-3 bg-gray-200 rounded-full px-2 text-sm font-bold">×{response.count}</span>
+                            )}
                           </div>
                         ))
                       ) : (
@@ -740,7 +897,7 @@ const Quiz: React.FC = () => {
                 ) : (
                   <div className="text-center">
                     <h3 className="text-xl font-bold text-gray-800 mb-4">
-                      Réponses reçues: {openAnswersList.length}/{getRegularPlayers.length}
+                      Réponses reçues: {openAnswerTotal}/{getRegularPlayers.length}
                     </h3>
                     <button
                       onClick={() => setShowOpenAnswers(true)}
@@ -852,11 +1009,11 @@ const Quiz: React.FC = () => {
           <div className="flex justify-center">
             <div className="bg-gray-100 rounded-lg p-3 flex items-center min-w-[200px] justify-center">
               <div className="w-8 h-8 rounded-full bg-[#E71722] text-white flex items-center justify-center mr-3">
-                {getRegularPlayers.findIndex(p => p.id === socket?.id) + 1}
+                {myRank?.rank ?? getRegularPlayers.findIndex(p => p.id === socket?.id) + 1}
               </div>
               <span className="font-bold">{username}</span>
               <span className="ml-4 text-[#E71722] font-bold text-xl">
-                {players.find((p) => p.id === socket?.id)?.score || 0} pts
+                {myRank?.score ?? players.find((p) => p.id === socket?.id)?.score ?? 0} pts
               </span>
             </div>
           </div>
@@ -272,6 +272,9 @@ const QuizEditor: React.FC = () => {
             option_b: 'Faux',
             correct_answer: q.correct_answer
           }),
+          ...(q.type === 'open_question' && {
+            correct_answer: q.correct_answer?.trim() || null
+          }),
           image: q.image
         }))
       ));
@@ -297,6 +300,9 @@ const QuizEditor: React.FC = () => {
             option_b: 'Faux',
             correct_answer: q.correct_answer
           }),
+          ...(q.type === 'open_question' && {
+            correct_answer: q.correct_answer?.trim() || null
+          }),
           image: q.image
         })),
       });
@@ -515,6 +521,21 @@ const QuizEditor: React.FC = () => {
               </div>
             </div>
 
+            {questions[currentQuestion].type === 'open_question' && (
+              <div className="mb-4">
+                <label className="block text-gray-700 text-sm font-bold mb-2">
+                  Reference Answer
+                </label>
+                <input
+                  type="text"
+                  value={questions[currentQuestion].correct_answer || ''}
+                  onChange={(e) => updateQuestion('correct_answer', e.target.value)}
+                  className="bg-gray-50 ring-1 ring-gray-300 rounded w-full py-2 px-3 text-gray-700 focus:outline-none focus:ring-2 focus:ring-[#E71722] transition-shadow"
+                  placeholder="Expected answer, used to grade free-text answers (optional)"
+                />
+              </div>
+            )}
+
             {questions[currentQuestion].type !== 'open_question' && (
               <>
                 <div className="grid grid-cols-1 md:grid-cols-2 gap-4 mb-4">
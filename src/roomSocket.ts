@@ -0,0 +1,14 @@
+import axios from 'axios';
+
+const API_URL = 'http://localhost:5000';
+
+// En mode multi-worker, chaque room est servie par un seul worker : le serveur
+// indique lequel (hachage du code de la room). Mono-processus : l'API elle-même.
+export async function resolveRoomSocketUrl(roomCode: string): Promise<string> {
+  try {
+    const response = await axios.get(`${API_URL}/api/rooms/${roomCode}/worker`);
+    return response.data.url || API_URL;
+  } catch {
+    return API_URL;
+  }
+}